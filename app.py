@@ -2,16 +2,26 @@
 Aplicación de Análisis de Sentimiento para Comentarios de Clientes
 Punto de entrada principal de la aplicación.
 """
+import time
+import uuid
+from datetime import datetime
 import streamlit as st
 from dotenv import load_dotenv
 import logging
-from config.settings import configure_app, initialize_logging
-from ui.pages import render_main_page
+from config.settings import configure_app, initialize_logging, PROFILING_ENABLED, JOB_POLL_INTERVAL
+from ui.pages import render_main_page, render_search_page
+from utils.profiling import profile_run
 
 # Configurar logging
 initialize_logging()
 logger = logging.getLogger(__name__)
 
+# Secciones de la aplicación
+PAGES = {
+    "📊 Análisis": render_main_page,
+    "🔎 Búsqueda": render_search_page
+}
+
 def main():
     """Función principal que inicializa y ejecuta la aplicación Streamlit."""
     try:
@@ -21,8 +31,20 @@ def main():
         # Configurar la aplicación
         configure_app()
         
-        # Renderizar la página principal
-        render_main_page()
+        # Renderizar la sección elegida (perfilada si se ha activado el modo de perfilado); los
+        # renderizados que solo consultan el estado de un trabajo en curso no se perfilan
+        page = st.sidebar.radio("Sección", list(PAGES), horizontal=True)
+        polling = st.session_state.pop("polling_rerun", False)
+        profiling = (PROFILING_ENABLED or st.session_state.get("profile_runs", False)) and not polling
+        run_id = f"render-{datetime.now().strftime('%Y%m%d_%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        with profile_run(run_id, enabled=profiling):
+            PAGES[page]()
+        
+        # Esperar fuera del perfil antes de volver a consultar el trabajo en curso
+        if st.session_state.pop("poll_job", False):
+            st.session_state.polling_rerun = True
+            time.sleep(JOB_POLL_INTERVAL)
+            st.rerun()
         
     except Exception as e:
         logger.error(f"Error en la aplicación: {str(e)}", exc_info=True)
@@ -0,0 +1,75 @@
+"""
+Comparación de rendimiento entre motores de análisis.
+Mide, para cada motor disponible, la clasificación de sentimiento y el análisis por chunks
+(comentarios por segundo) sobre el mismo corpus sintético, y la concordancia de etiquetas
+entre motores. Los motores no disponibles (sin API Key o sin modelo local) se omiten.
+
+Uso:
+    python benchmarks/bench_backends.py --comments 2000 --chunk-size 50
+    python benchmarks/bench_backends.py --backends local --comments 100000
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+
+from config.settings import ANALYSIS_BACKENDS, DEFAULT_MAX_CONCURRENT_REQUESTS, DEFAULT_SYSTEM_PROMPT
+from services.analysis_backend import get_backend
+from bench_utils import generate_reviews
+
+def bench_classify(backend, comments):
+    """Clasifica todos los comentarios y devuelve (etiquetas, segundos)."""
+    start = time.perf_counter()
+    labels = backend.classify_comments(comments)
+    return labels, time.perf_counter() - start
+
+def bench_chunks(backend, comments, chunk_size: int):
+    """Analiza los comentarios por chunks en paralelo, como el pipeline, y devuelve (errores, segundos)."""
+    chunks = [comments[i:i + chunk_size] for i in range(0, len(comments), chunk_size)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=DEFAULT_MAX_CONCURRENT_REQUESTS) as executor:
+        results = list(executor.map(lambda chunk: backend.analyze_comments_chunk(chunk, DEFAULT_SYSTEM_PROMPT), chunks))
+    return sum(1 for result in results if result.get("error", False)), time.perf_counter() - start
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--comments", type=int, default=2000, help="Número de comentarios sintéticos")
+    parser.add_argument("--chunk-size", type=int, default=50, help="Comentarios por chunk")
+    parser.add_argument("--backends", default=",".join(ANALYSIS_BACKENDS.values()), help="Motores separados por comas")
+    parser.add_argument("--skip-chunks", action="store_true", help="Mide solo la clasificación")
+    args = parser.parse_args()
+
+    load_dotenv()
+    comments = generate_reviews(args.comments)["Cuerpo"].astype(str).tolist()
+
+    print(f"{'Motor':<10}{'Operación':<16}{'Total (s)':>12}{'Coment./s':>14}{'Errores':>10}")
+    labels_by_backend = {}
+    for name in [name.strip() for name in args.backends.split(",") if name.strip()]:
+        backend = get_backend(name)
+        if not backend.is_available():
+            print(f"{name:<10}{'-':<16}{'no disponible':>12}")
+            continue
+
+        labels, elapsed = bench_classify(backend, comments)
+        labels_by_backend[name] = labels
+        print(f"{name:<10}{'clasificación':<16}{elapsed:>12.2f}{len(comments) / elapsed:>14.1f}{'':>10}")
+
+        if not args.skip_chunks:
+            errors, elapsed = bench_chunks(backend, comments, args.chunk_size)
+            print(f"{name:<10}{'chunks':<16}{elapsed:>12.2f}{len(comments) / elapsed:>14.1f}{errors:>10}")
+
+    # Concordancia de etiquetas entre cada par de motores
+    names = list(labels_by_backend)
+    for i, first in enumerate(names):
+        for second in names[i + 1:]:
+            agreement = sum(a == b for a, b in zip(labels_by_backend[first], labels_by_backend[second])) / len(comments)
+            print(f"Concordancia {first} / {second}: {agreement:.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Memoria de la fase map: división en chunks y construcción de los prompts.
+Compara la división anterior (lista de comentarios y listas por chunk) con las vistas de
+CommentChunks, recorriendo todos los chunks y construyendo el prompt de cada uno como lo
+haría el pipeline. El pico se mide por encima del DataFrame ya preparado, así que un pico
+pequeño frente al tamaño del texto indica que el texto no se copia.
+
+Cada modo se ejecuta en un proceso propio para que los picos de memoria no se mezclen.
+
+Uso:
+    python benchmarks/bench_chunking.py --rows 1000000
+    python benchmarks/bench_chunking.py --rows 100000,1000000 --chunk-size 100
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import multiprocessing
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+from utils.data_processing import split_dataframe_into_chunks
+from utils.text_normalization import build_chunk_prompt
+from bench_utils import _prepare_rows
+
+def _list_chunks(df, chunk_size: int):
+    """División anterior: todos los comentarios como lista y un slice por chunk."""
+    comments = df["Cuerpo"].tolist()
+    return [comments[i:i + chunk_size] for i in range(0, len(comments), chunk_size)]
+
+def _view_chunks(df, chunk_size: int):
+    """División actual: vistas sobre la columna del DataFrame."""
+    return split_dataframe_into_chunks(df, "Cuerpo", chunk_size)[0]
+
+MODES: Dict[str, Callable[[Any, int], Any]] = {
+    "listas": _list_chunks,
+    "vistas": _view_chunks
+}
+
+def _run_map_phase(split: Callable[[Any, int], Any], df, chunk_size: int) -> int:
+    """Divide el corpus y construye el prompt de cada chunk, descartándolo tras usarlo."""
+    chunks = split(df, chunk_size)
+    prompt_chars = 0
+    for chunk in chunks:
+        prompt, _, _ = build_chunk_prompt(chunk)
+        prompt_chars += len(prompt)
+    return prompt_chars
+
+def _measure(mode: str, rows: int, chunk_size: int, queue: multiprocessing.Queue) -> None:
+    """Mide un modo en un proceso propio (tracemalloc más el pool de Arrow, como bench_utils)."""
+    df = _prepare_rows(rows)
+    text_bytes = int(df["Cuerpo"].memory_usage(deep=True))
+    arrow_before = pa.default_memory_pool().max_memory() if pa else 0
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    _run_map_phase(MODES[mode], df, chunk_size)
+    elapsed = time.perf_counter() - start
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow_peak = (pa.default_memory_pool().max_memory() - arrow_before) if pa else 0
+
+    queue.put({
+        "seconds": elapsed,
+        "text_mb": text_bytes / (1024 * 1024),
+        "peak_mb": (python_peak + max(0, arrow_peak)) / (1024 * 1024)
+    })
+
+def run_mode(context: Any, mode: str, rows: int, chunk_size: int) -> Dict[str, float]:
+    """Lanza la medición de un modo en un proceso nuevo y devuelve su resultado."""
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(mode, rows, chunk_size, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="1000000", help="Tamaños de corpus separados por comas")
+    parser.add_argument("--chunk-size", type=int, default=50, help="Comentarios por chunk")
+    parser.add_argument("--modes", default=",".join(MODES), help="Modos separados por comas")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'Modo':<10}{'Filas':>12}{'Texto (MB)':>12}{'Pico (MB)':>12}{'Pico/texto':>12}{'Tiempo (s)':>12}")
+    for rows in [int(value) for value in args.rows.split(",") if value]:
+        for mode in [name.strip() for name in args.modes.split(",") if name.strip()]:
+            result = run_mode(context, mode, rows, args.chunk_size)
+            print(
+                f"{mode:<10}{rows:>12,}{result['text_mb']:>12.1f}{result['peak_mb']:>12.1f}"
+                f"{result['peak_mb'] / result['text_mb']:>12.2f}{result['seconds']:>12.2f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Micro-benchmark de la limpieza de comentarios.
+Compara la implementación anterior (objetos de Python) con la limpieza vectorizada sobre
+`string[pyarrow]` y muestra filas por segundo, pico de memoria adicional y memoria que ocupa
+la columna resultante, tanto con una columna `object` (como la de un CSV) como con una
+columna ya en Arrow (como la de un Parquet).
+
+Uso:
+    python benchmarks/bench_cleaning.py --rows 1000000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+import multiprocessing
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.data_processing import clean_comments, STRING_DTYPE
+
+SAMPLE_COMMENTS = [
+    "Muy buena calidad, llegó antes de lo previsto",
+    "El producto no funciona   como esperaba\n\ny el soporte tardó días",
+    "   ",
+    "",
+    "ok",
+    "Precio excelente pero el envío fue lento",
+    "The product is very good and I like it",
+]
+
+def generate_dataframe(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Genera comentarios sintéticos con espacios, vacíos, nulos y valores numéricos."""
+    rng = random.Random(seed)
+    values = []
+    for _ in range(rows):
+        roll = rng.random()
+        if roll < 0.05:
+            values.append(None)
+        elif roll < 0.08:
+            values.append(rng.randint(0, 10_000))
+        else:
+            values.append(rng.choice(SAMPLE_COMMENTS) * rng.randint(1, 4))
+    return pd.DataFrame({"Cuerpo": values})
+
+def legacy_cleaning(df: pd.DataFrame) -> pd.DataFrame:
+    """Implementación anterior de validate_and_prepare_dataframe."""
+    df_cleaned = df.dropna(subset=["Cuerpo"])
+    return df_cleaned[df_cleaned["Cuerpo"].str.strip() != '']
+
+def vectorized_cleaning(df: pd.DataFrame) -> pd.DataFrame:
+    """Limpieza vectorizada actual."""
+    return clean_comments(df, "Cuerpo")[0]
+
+IMPLEMENTATIONS = {
+    "anterior (object)": legacy_cleaning,
+    f"vectorizada ({STRING_DTYPE})": vectorized_cleaning,
+}
+
+def _setup_pool():
+    """Pool de Arrow distinto del predeterminado para preparar la entrada sin alterar sus estadísticas."""
+    if pa.default_memory_pool().backend_name != "system":
+        return pa.system_memory_pool()
+    return pa.mimalloc_memory_pool()
+
+def _measure(name: str, rows: int, input_dtype: str, queue: multiprocessing.Queue) -> None:
+    """
+    Mide una implementación en un proceso propio para aislar su pico de memoria.
+
+    La memoria se mide primero como el pico de Python (tracemalloc, incluye numpy) más el pico
+    del pool de Arrow predeterminado, que hasta ese momento no se ha usado: la entrada en Arrow
+    se prepara con otro pool. El tiempo se mide después, en una pasada sin instrumentar.
+    """
+    implementation = IMPLEMENTATIONS[name]
+    df = generate_dataframe(rows)
+    if input_dtype != "object":
+        values = [None if value is None else str(value) for value in df["Cuerpo"]]
+        array = pa.array(values, type=pa.string(), memory_pool=_setup_pool())
+        df["Cuerpo"] = pd.Series(pd.arrays.ArrowStringArray(array))
+
+    tracemalloc.start()
+    implementation(df)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow_peak = pa.default_memory_pool().max_memory() if pa else 0
+
+    start = time.perf_counter()
+    result = implementation(df)
+    elapsed = time.perf_counter() - start
+    result_memory = result["Cuerpo"].memory_usage(deep=True)
+
+    queue.put((len(result), rows / elapsed, (python_peak + arrow_peak) / (1024 * 1024), result_memory / (1024 * 1024)))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Número de filas sintéticas")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(
+        f"{'Entrada':<18}{'Implementación':<32}{'Filas válidas':>14}{'Filas/s':>14}"
+        f"{'Pico extra (MB)':>17}{'Resultado (MB)':>16}"
+    )
+    input_dtypes = ["object", STRING_DTYPE] if pa else ["object"]
+    for input_dtype in input_dtypes:
+        for name in IMPLEMENTATIONS:
+            queue = context.Queue()
+            process = context.Process(target=_measure, args=(name, args.rows, input_dtype, queue))
+            process.start()
+            kept, rate, peak, result_memory = queue.get()
+            process.join()
+            print(f"{input_dtype:<18}{name:<32}{kept:>14,}{rate:>14,.0f}{peak:>17.1f}{result_memory:>16.1f}")
+
+if __name__ == "__main__":
+    main()
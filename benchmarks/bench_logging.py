@@ -0,0 +1,94 @@
+"""
+Micro-benchmark del coste de logging por chunk.
+Compara la configuración anterior (handlers de archivo y consola síncronos en el hilo que
+registra) con la configuración por cola de `initialize_logging`, emitiendo las mismas líneas
+que se registran al analizar cada chunk.
+
+Uso:
+    python benchmarks/bench_logging.py --chunks 20000
+"""
+import os
+import sys
+import time
+import queue
+import logging
+import argparse
+import tempfile
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import LOG_FORMAT, LOG_MAX_BYTES, LOG_BACKUP_COUNT
+
+def _handlers(log_dir: str):
+    """Crea los handlers de archivo y consola; la consola escribe a /dev/null para no medir la terminal."""
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = RotatingFileHandler(
+        os.path.join(log_dir, "bench.log"), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT
+    )
+    console_handler = logging.StreamHandler(open(os.devnull, "w"))
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+    return [file_handler, console_handler]
+
+def _emit_chunks(logger: logging.Logger, chunks: int) -> float:
+    """Registra las líneas de cada chunk y devuelve los segundos empleados por el hilo llamante."""
+    start = time.perf_counter()
+    for i in range(chunks):
+        logger.info(f"Analizando chunk de {50} comentarios")
+        logger.info(f"Análisis completado: {1200 + i} tokens utilizados")
+    return time.perf_counter() - start
+
+def bench_direct(chunks: int, log_dir: str) -> float:
+    """Handlers síncronos añadidos directamente al logger."""
+    logger = logging.getLogger("bench.direct")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handlers = _handlers(log_dir)
+    for handler in handlers:
+        logger.addHandler(handler)
+    elapsed = _emit_chunks(logger, chunks)
+    for handler in handlers:
+        handler.close()
+    return elapsed
+
+def bench_queue(chunks: int, log_dir: str) -> float:
+    """QueueHandler en el hilo llamante y QueueListener escribiendo en segundo plano."""
+    logger = logging.getLogger("bench.queue")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handlers = _handlers(log_dir)
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    logger.addHandler(QueueHandler(log_queue))
+    listener.start()
+    elapsed = _emit_chunks(logger, chunks)
+    listener.stop()
+    for handler in handlers:
+        handler.close()
+    return elapsed
+
+def bench_filtered(chunks: int, log_dir: str) -> float:
+    """Módulo silenciado con un nivel por módulo (LOG_LEVELS=...=WARNING)."""
+    logger = logging.getLogger("bench.filtered")
+    logger.propagate = False
+    logger.setLevel(logging.WARNING)
+    return _emit_chunks(logger, chunks)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20_000, help="Número de chunks simulados")
+    args = parser.parse_args()
+
+    print(f"{'Configuración':<28}{'Total (s)':>12}{'µs por chunk':>16}")
+    with tempfile.TemporaryDirectory() as log_dir:
+        for name, bench in (
+            ("handlers síncronos", bench_direct),
+            ("cola + listener", bench_queue),
+            ("nivel por módulo", bench_filtered),
+        ):
+            elapsed = bench(args.chunks, log_dir)
+            print(f"{name:<28}{elapsed:>12.3f}{elapsed / args.chunks * 1e6:>16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Suite de micro-benchmarks de las funciones críticas de `utils`.
+Mide tiempo (mejor de varias repeticiones) y pico de memoria de cada función sobre corpus
+sintéticos de reseñas en español (de 1k a 5M filas) y sobre informes de tamaño creciente
+construidos a partir de los informes de ejemplo de `benchmarks/fixtures/`, y compara el resultado con una línea base
+guardada. Termina con código 1 si alguna medición empeora más allá del umbral.
+
+Cada medición se ejecuta en un proceso propio para que los picos de memoria no se mezclen.
+
+Uso:
+    python benchmarks/bench_utils.py                      # compara con benchmarks/baseline.json
+    python benchmarks/bench_utils.py --update-baseline    # guarda las mediciones como nueva línea base
+    python benchmarks/bench_utils.py --rows 1000,10000 --reports 10,30 --only format_full_report
+"""
+import os
+import re
+import sys
+import json
+import glob
+import time
+import argparse
+import platform
+import tracemalloc
+import multiprocessing
+from queue import Empty
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from utils.data_processing import validate_and_prepare_dataframe, split_dataframe_into_chunks
+from utils.metrics_extraction import extract_metrics_from_analysis, extract_key_sections, format_key_points
+from utils.visualization import format_full_report
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DEFAULT_ROWS = [1_000, 10_000, 100_000, 1_000_000, 5_000_000]
+DEFAULT_REPORT_KB = [10, 30, 100, 300]
+
+# Tolerancias frente a la línea base: relativa y absoluta (para mediciones muy pequeñas)
+TIME_THRESHOLD = 0.3
+MEMORY_THRESHOLD = 0.2
+TIME_SLACK_SECONDS = 0.002
+MEMORY_SLACK_MB = 1.0
+
+# Tiempo mínimo acumulado y número máximo de repeticiones de la pasada de tiempo
+MIN_TIMING_SECONDS = 0.5
+MAX_REPEATS = 7
+
+# Piezas del corpus sintético
+OPENINGS = [
+    "Compré este producto hace un mes y", "Lo pedí para mi madre y", "Tras varias semanas de uso",
+    "Es la segunda vez que lo compro y", "Lo recomiendo porque", "No lo recomiendo:", "Sinceramente,",
+    "Llegó en dos días y", "Me lo regalaron y", "Después de leer las opiniones,"
+]
+ASPECTS = [
+    "el sabor", "la textura", "el envío", "el embalaje", "la relación calidad-precio", "la atención al cliente",
+    "el tamaño", "la batería", "la calidad de los materiales", "el etiquetado", "la facilidad de uso", "el olor"
+]
+OPINIONS = [
+    "es excelente", "me ha decepcionado bastante", "está bien sin más", "supera lo que esperaba",
+    "deja mucho que desear", "es justo lo que buscaba", "no corresponde con la descripción",
+    "es mejorable", "es perfecto para el día a día", "llegó dañado y tuve que devolverlo"
+]
+CLOSINGS = [
+    "", "", "", " Volveré a comprar.", " No repetiré.", " ¡¡Muy contento!!", " 😍😍", " Cinco estrellas.",
+    " El vendedor respondió rápido a mis dudas.", " Ojalá lo mejoren en la próxima versión."
+]
+
+def generate_reviews(rows: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Genera un corpus sintético de reseñas en español con nulos, vacíos y valores numéricos.
+
+    Args:
+        rows: Número de filas
+        seed: Semilla del generador
+
+    Returns:
+        DataFrame con las columnas 'Cuerpo' y 'SKU'
+    """
+    rng = np.random.default_rng(seed)
+    parts = [np.array(pieces, dtype=object)[rng.integers(0, len(pieces), rows)] for pieces in (OPENINGS, ASPECTS, OPINIONS)]
+    closings = np.array(CLOSINGS, dtype=object)[rng.integers(0, len(CLOSINGS), rows)]
+    comments = pd.Series(parts[0]) + " " + pd.Series(parts[1]) + " " + pd.Series(parts[2]) + "." + pd.Series(closings)
+
+    # Comentarios largos repitiendo la reseña, más nulos, vacíos y numéricos como en las exportaciones reales
+    roll = rng.random(rows)
+    comments = comments.where(roll >= 0.1, comments + " " + comments + " " + comments)
+    comments = comments.astype(object)
+    comments[roll > 0.97] = None
+    comments[(roll > 0.95) & (roll <= 0.97)] = "   "
+    comments[(roll > 0.94) & (roll <= 0.95)] = 5
+    return pd.DataFrame({"Cuerpo": comments, "SKU": rng.integers(1000, 1100, rows)})
+
+def _load_samples() -> List[str]:
+    """Lee los informes de ejemplo fijos (no los de outputs/, que cambian con cada análisis)."""
+    samples = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.txt"))):
+        with open(path, "r", encoding="utf-8") as f:
+            samples.append(f.read())
+    return samples
+
+def generate_report(target_kb: int) -> str:
+    """
+    Construye un informe de aproximadamente `target_kb` KB a partir de los informes de ejemplo de `benchmarks/fixtures/`.
+
+    Conserva la estructura de secciones del informe más largo y alarga el cuerpo de cada sección
+    con el cuerpo de la misma sección en los demás ejemplos, repitiéndolos si hace falta.
+
+    Args:
+        target_kb: Tamaño aproximado del informe en KB
+
+    Returns:
+        Texto del informe
+    """
+    header = re.compile(r'(─{10,}\s*\n\s*\d+\..*\n\s*─{10,}\s*\n)')
+    samples = _load_samples()
+    template = max(samples, key=len)
+    parts = header.split(template)
+    bodies_by_section: Dict[int, List[str]] = {}
+    for sample in samples:
+        sample_parts = header.split(sample)
+        for i in range(2, len(sample_parts), 2):
+            bodies_by_section.setdefault(i, []).append(sample_parts[i].strip("\n"))
+
+    target = target_kb * 1024
+    result = list(parts)
+    repeat = 1
+    while len("".join(result).encode("utf-8")) < target:
+        repeat += 1
+        for i in range(2, len(parts), 2):
+            bodies = bodies_by_section.get(i, [parts[i]])
+            result[i] = "\n\n".join(bodies[j % len(bodies)] for j in range(repeat)) + "\n\n"
+    return "".join(result)
+
+def _prepare_rows(rows: int) -> pd.DataFrame:
+    """Corpus ya validado, como el que recibe la división en chunks."""
+    _, _, df = validate_and_prepare_dataframe(generate_reviews(rows), "Cuerpo")
+    return df
+
+# Cada caso: (preparación de la entrada a partir del tamaño, función medida)
+CASES: Dict[str, Tuple[str, Callable[[int], Any], Callable[[Any], Any]]] = {
+    "validate_and_prepare_dataframe": ("rows", generate_reviews, lambda df: validate_and_prepare_dataframe(df, "Cuerpo")),
+    # Los chunks son vistas: se recorren uno a uno, como en el pipeline, para medir también su materialización
+    "split_dataframe_into_chunks": ("rows", _prepare_rows, lambda df: sum(
+        len(chunk.tolist()) for chunk in split_dataframe_into_chunks(df, "Cuerpo", 50)[0]
+    )),
+    "extract_metrics_from_analysis": ("report_kb", generate_report, extract_metrics_from_analysis),
+    "extract_key_sections": ("report_kb", generate_report, extract_key_sections),
+    "format_full_report": ("report_kb", generate_report, format_full_report),
+    "format_key_points": ("report_kb", generate_report, lambda report: [
+        format_key_points(section) for section in extract_key_sections(report).values()
+    ]),
+}
+
+def _measure(case: str, size: int, queue: multiprocessing.Queue) -> None:
+    """
+    Mide un caso en un proceso propio.
+
+    El pico de memoria es el de Python (tracemalloc, incluye numpy) más el del pool de Arrow
+    predeterminado durante la primera llamada; el tiempo es el mejor de varias llamadas posteriores.
+    """
+    _, prepare, function = CASES[case]
+    data = prepare(size)
+    arrow_before = pa.default_memory_pool().max_memory() if pa else 0
+
+    tracemalloc.start()
+    function(data)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow_peak = (pa.default_memory_pool().max_memory() - arrow_before) if pa else 0
+
+    timings = []
+    while len(timings) < MAX_REPEATS and sum(timings) < MIN_TIMING_SECONDS:
+        start = time.perf_counter()
+        function(data)
+        timings.append(time.perf_counter() - start)
+
+    queue.put({"seconds": min(timings), "peak_mb": (python_peak + max(0, arrow_peak)) / (1024 * 1024)})
+
+def run_case(context: Any, case: str, size: int) -> Dict[str, float]:
+    """
+    Lanza la medición de un caso en un proceso nuevo y devuelve su resultado.
+
+    Raises:
+        RuntimeError: Si el proceso termina sin resultado (por ejemplo, lo mata el sistema por falta de memoria)
+    """
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(case, size, queue))
+    process.start()
+    while True:
+        try:
+            result = queue.get(timeout=1)
+            break
+        except Empty:
+            if not process.is_alive() and queue.empty():
+                raise RuntimeError(f"el proceso de medición terminó sin resultado (código {process.exitcode})")
+    process.join()
+    return result
+
+def compare(name: str, result: Dict[str, float], baseline: Dict[str, Dict[str, float]], thresholds: Tuple[float, float]) -> List[str]:
+    """
+    Compara una medición con la línea base.
+
+    Returns:
+        Lista de regresiones detectadas (vacía si no hay)
+    """
+    reference = baseline.get(name)
+    if reference is None:
+        return []
+    time_threshold, memory_threshold = thresholds
+    regressions = []
+    if result["seconds"] > reference["seconds"] * (1 + time_threshold) + TIME_SLACK_SECONDS:
+        regressions.append(f"{name}: tiempo {result['seconds']:.4f}s frente a {reference['seconds']:.4f}s")
+    if result["peak_mb"] > reference["peak_mb"] * (1 + memory_threshold) + MEMORY_SLACK_MB:
+        regressions.append(f"{name}: memoria {result['peak_mb']:.1f}MB frente a {reference['peak_mb']:.1f}MB")
+    return regressions
+
+def machine_info() -> Dict[str, str]:
+    """Entorno de la medición: las líneas base solo son comparables con las mismas versiones."""
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "pyarrow": pa.__version__ if pa else "",
+        "platform": platform.platform()
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default=",".join(map(str, DEFAULT_ROWS)), help="Tamaños de corpus separados por comas")
+    parser.add_argument("--reports", default=",".join(map(str, DEFAULT_REPORT_KB)), help="Tamaños de informe en KB separados por comas")
+    parser.add_argument("--only", default="", help="Funciones a medir separadas por comas (por defecto todas)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Archivo de línea base")
+    parser.add_argument("--update-baseline", action="store_true", help="Guarda las mediciones como línea base")
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD, help="Empeoramiento relativo de tiempo tolerado")
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD, help="Empeoramiento relativo de memoria tolerado")
+    args = parser.parse_args()
+
+    sizes = {
+        "rows": [int(value) for value in args.rows.split(",") if value],
+        "report_kb": [int(value) for value in args.reports.split(",") if value]
+    }
+    selected = [case for case in CASES if not args.only or case in args.only.split(",")]
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        baseline = stored["results"]
+        current = machine_info()
+        for library in ("python", "pandas", "numpy", "pyarrow"):
+            recorded = stored.get("machine", {}).get(library)
+            if recorded != current[library]:
+                print(f"Aviso: la línea base se generó con {library} {recorded} y ahora se usa {current[library]}")
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    regressions = []
+    print(f"{'Función':<34}{'Tamaño':>14}{'Tiempo (s)':>14}{'Pico (MB)':>12}{'Base (s)':>12}{'Base (MB)':>12}")
+    for case in selected:
+        unit = CASES[case][0]
+        for size in sizes[unit]:
+            name = f"{case}@{size}{'kb' if unit == 'report_kb' else ''}"
+            try:
+                result = run_case(context, case, size)
+            except RuntimeError as e:
+                print(f"{case:<34}{size:>14,}  no medido: {e}")
+                continue
+            results[name] = result
+            reference = baseline.get(name, {})
+            print(
+                f"{case:<34}{size:>14,}{result['seconds']:>14.4f}{result['peak_mb']:>12.1f}"
+                f"{reference.get('seconds', float('nan')):>12.4f}{reference.get('peak_mb', float('nan')):>12.1f}"
+            )
+            regressions.extend(compare(name, result, baseline, (args.time_threshold, args.memory_threshold)))
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "machine": machine_info(),
+                "results": results
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nLínea base guardada en {args.baseline}")
+        return 0
+
+    if regressions:
+        print("\nRegresiones frente a la línea base:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+
+    print("\nSin regresiones frente a la línea base" if baseline else "\nNo hay línea base; usa --update-baseline para crearla")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
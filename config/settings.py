@@ -3,9 +3,12 @@ Configuraciones generales de la aplicación.
 Contiene las configuraciones y constantes utilizadas en toda la aplicación.
 """
 import os
+import queue
+import atexit
+import threading
 import streamlit as st
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from config.styles import CUSTOM_CSS
 
 # Constantes de la aplicación
@@ -18,12 +21,110 @@ DEFAULT_MODEL = "o1"
 DEFAULT_REASONING_EFFORT = "high"
 DEFAULT_MAX_TOKENS_CHUNK = 4000
 DEFAULT_MAX_TOKENS_FINAL = 8000
+DEFAULT_MAX_TOKENS_INTERMEDIATE = 4000
+
+# Motores de análisis disponibles
+ANALYSIS_BACKENDS = {
+    "OpenAI": "openai",
+    "Modelo local (CPU)": "local"
+}
+DEFAULT_BACKEND = os.getenv("ANALYSIS_BACKEND", "openai")
+
+# Modelo local de clasificación de sentimiento (ONNX o transformers, sin conexión)
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "models/sentiment")
+LOCAL_MODEL_BATCH_SIZE = int(os.getenv("LOCAL_MODEL_BATCH_SIZE", "32"))
+LOCAL_MODEL_THREADS = int(os.getenv("LOCAL_MODEL_THREADS", str(max(1, min(4, os.cpu_count() or 1)))))
+LOCAL_MODEL_MAX_LENGTH = 256
+LOCAL_REPORT_EXAMPLES = 5
+LOCAL_THEME_MIN_MENTIONS = 5
+CLASSIFY_BATCH_SIZE = 200
+
+# Compactación de prompts
+CHARS_PER_TOKEN = 4
+MAX_COMMENT_TOKENS = 300
+
+# Presupuesto de peticiones compartido por todo el proceso
+DEFAULT_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "50"))
+DEFAULT_MAX_CONCURRENT_REQUESTS = int(os.getenv("OPENAI_MAX_CONCURRENT_REQUESTS", "4"))
+
+# Peticiones duplicadas (hedging) para los chunks más lentos
+HEDGE_PERCENTILE = 0.9
+HEDGE_MIN_SAMPLES = 10
+HEDGE_MAX_EXTRA_FRACTION = 0.1
+
+# Reintentos de chunks fallidos al terminar la fase map
+CHUNK_RETRY_ROUNDS = 1
+
+# Formatos de archivo aceptados
+SUPPORTED_INPUT_FORMATS = ["csv", "parquet", "feather", "arrow", "xlsx"]
+
+# Limpieza de comentarios
+MIN_COMMENT_LENGTH = 1
+LANGUAGE_FILTERS = {"Todos": None, "Español": "es", "Inglés": "en"}
 
 # Configuraciones de procesamiento
 DEFAULT_CHUNK_SIZE = 50
 MIN_CHUNK_SIZE = 10
 MAX_CHUNK_SIZE = 200
 
+# Reducción incremental: se pliegan los insights en resúmenes intermedios mientras continúa el análisis
+ROLLING_REDUCE_BATCH = 10
+ROLLING_REDUCE_MIN_CHUNKS = 20
+
+# Configuraciones de agrupación temática local
+MAX_TOPIC_CLUSTERS = 50
+TOPIC_MAX_FEATURES = 20000
+
+# Memoria máxima del almacén compartido de resultados, DataFrames e índices (MB)
+RESULT_STORE_MAX_BYTES = int(os.getenv("RESULT_STORE_MAX_MB", "1024")) * 2**20
+
+# Informes formateados y gráficos que se conservan en memoria para volver a mostrarlos
+RENDER_CACHE_ENTRIES = 64
+
+# Desglose de temas: sinónimos (sin tildes) que amplían las palabras clave de un tema
+THEME_SYNONYMS = {
+    "envio": ["entrega", "reparto", "paquete", "llego", "tardo", "retraso"],
+    "embalaje": ["packaging", "caja", "envase", "empaque"],
+    "precio": ["caro", "barato", "coste", "cuesta", "calidad-precio"],
+    "sabor": ["gusto", "rico", "dulce", "amargo", "regusto"],
+    "azucar": ["dulce", "edulcorante", "glucosa", "keto", "sin azucar"],
+    "textura": ["arenosa", "cremosa", "derretir", "fundir"],
+    "atencion": ["soporte", "servicio", "vendedor", "devolucion"],
+    "calidad": ["material", "materiales", "duradero", "resistente"],
+    "salud": ["dieta", "glucosa", "calorias", "nutricional"],
+    "etiquetado": ["etiqueta", "ingredientes", "claims", "vegano"]
+}
+THEME_DRILLDOWN_LIMIT = 50
+
+# Índice de búsqueda de texto completo
+SEARCH_INDEX_PATH = "cache/search.db"
+SEARCH_RESULTS_LIMIT = 50
+SEARCH_INSERT_BATCH = 10000
+
+# Configuraciones de ejecución en segundo plano
+JOBS_DIR = "jobs"
+MAX_CONCURRENT_JOBS = 8
+JOB_POLL_INTERVAL = 2.0
+JOB_SAVE_INTERVAL = 2.0
+JOB_PRIORITIES = {
+    "Normal": 2,
+    "Alta": 4,
+    "Baja": 1
+}
+DEFAULT_USER = "anonimo"
+
+# Configuraciones de análisis temporal
+DEFAULT_DATE_COLUMN = "Fecha"
+PERIOD_FREQUENCIES = {
+    "Mensual": "M",
+    "Semanal": "W"
+}
+PERIOD_CACHE_DIR = "cache/periodos"
+
+# Configuraciones de análisis por producto
+DEFAULT_GROUP_COLUMN = "SKU"
+MAX_PARALLEL_GROUPS = 4
+
 # Prompt por defecto para el sistema
 DEFAULT_SYSTEM_PROMPT = """
 Eres un modelo especializado en analizar el sentimiento de los comentarios de clientes a cerca de nuestros productos.
@@ -42,6 +143,32 @@ Para el análisis general de comentarios, debes:
 Proporciona un análisis estructurado, detallado y accionable basado en todos los comentarios.
 """
 
+# Configuración de logging
+LOG_DIR = "logs"
+LOG_FILE = "app.log"
+LOG_MAX_BYTES = 10485760
+LOG_BACKUP_COUNT = 5
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Niveles por módulo, p. ej. LOG_LEVELS="services.openai_service=WARNING,httpx=WARNING"
+LOG_LEVELS = {
+    "httpx": "WARNING",
+    **{
+        name.strip(): level.strip().upper()
+        for name, level in (
+            item.split("=", 1) for item in os.getenv("LOG_LEVELS", "").split(",") if "=" in item
+        )
+    }
+}
+
+# Perfilado por muestreo (opcional): PROFILE_RUNS=1 o el interruptor oculto de la barra lateral (?debug=1)
+PROFILING_ENABLED = os.getenv("PROFILE_RUNS", "0") == "1"
+PROFILE_DIR = os.path.join(LOG_DIR, "profiles")
+PROFILE_INTERVAL = 0.005
+PROFILE_TOP_FUNCTIONS = 60
+# Perfiles que se conservan en PROFILE_DIR; los más antiguos se eliminan
+PROFILE_MAX_RUNS = 100
+
 # Colores para visualizaciones
 SENTIMENT_COLORS = {
     'Positivo': '#4CAF50',  # Verde
@@ -49,30 +176,59 @@ SENTIMENT_COLORS = {
     'Negativo': '#F44336'   # Rojo
 }
 
+# Listener que escribe los registros en archivo y consola desde su propio hilo
+_log_listener = None
+_log_lock = threading.Lock()
+
 def initialize_logging():
-    """Configura el sistema de logging de la aplicación."""
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    
-    log_file = os.path.join(log_dir, "app.log")
-    
-    # Configurar logger root
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    
-    # Formateo de logs
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
-    # Handler para archivo con rotación
-    file_handler = RotatingFileHandler(log_file, maxBytes=10485760, backupCount=5)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    
-    # Handler para consola
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    """
+    Configura el sistema de logging de la aplicación una sola vez por proceso.
+
+    Los hilos de la aplicación solo encolan los registros (QueueHandler); el formateo y la
+    escritura en archivo y consola se hacen en el hilo del QueueListener. Las llamadas
+    repetidas (reruns o recargas de Streamlit) no añaden handlers nuevos.
+
+    Returns:
+        QueueListener activo
+    """
+    global _log_listener
+    with _log_lock:
+        root = logging.getLogger()
+        # Una recarga del módulo pierde la variable global pero no los handlers del logger root
+        for handler in root.handlers:
+            if getattr(handler, "_app_listener", None) is not None:
+                _log_listener = handler._app_listener
+                return _log_listener
+
+        os.makedirs(LOG_DIR, exist_ok=True)
+
+        # Formateo de logs
+        formatter = logging.Formatter(LOG_FORMAT)
+
+        # Handler para archivo con rotación
+        file_handler = RotatingFileHandler(
+            os.path.join(LOG_DIR, LOG_FILE), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT
+        )
+        file_handler.setFormatter(formatter)
+
+        # Handler para consola
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        queue_handler = QueueHandler(log_queue)
+        queue_handler._app_listener = listener
+
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(queue_handler)
+        for name, level in LOG_LEVELS.items():
+            logging.getLogger(name).setLevel(level)
+
+        listener.start()
+        atexit.register(listener.stop)
+        _log_listener = listener
+        return listener
 
 def configure_app():
     """Configura la página de Streamlit y aplica estilos personalizados."""
@@ -0,0 +1,135 @@
+"""
+Interfaz común de los motores de análisis.
+El pipeline solo depende de esta interfaz; cada proveedor (API de OpenAI, modelo local) la implementa.
+"""
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from config.settings import DEFAULT_BACKEND
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Etiquetas de sentimiento que devuelve la clasificación
+SENTIMENT_LABELS = ("Positivo", "Neutral", "Negativo")
+
+class AnalysisBackend(ABC):
+    """
+    Motor de análisis: análisis por chunks, resúmenes intermedios, análisis final y clasificación.
+
+    Los métodos de análisis devuelven un diccionario con la clave 'analysis' y los recuentos de
+    tokens; si fallan, no lanzan la excepción sino que devuelven 'error': True y 'error_type'.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def analyze_comments_chunk(self, comments: List[str], system_prompt: str, **options: Any) -> Dict[str, Any]:
+        """
+        Analiza un chunk de comentarios.
+
+        Args:
+            comments: Lista de comentarios para analizar
+            system_prompt: Prompt del sistema
+            **options: Opciones del proveedor (modelo, esfuerzo de razonamiento, duplicado...)
+
+        Returns:
+            Dict con el análisis, las estadísticas del chunk ('statistics') y los recuentos de tokens
+        """
+
+    @abstractmethod
+    def generate_intermediate_summary(
+        self,
+        analyses: List[Dict[str, Any]],
+        comments_count: int,
+        system_prompt: str,
+        **options: Any
+    ) -> Dict[str, Any]:
+        """
+        Combina varios análisis preliminares en un único resumen intermedio.
+
+        Args:
+            analyses: Lista de análisis preliminares (de chunks o resúmenes anteriores)
+            comments_count: Número de comentarios que cubren en conjunto
+            system_prompt: Prompt del sistema
+            **options: Opciones del proveedor
+
+        Returns:
+            Dict con el resumen intermedio
+        """
+
+    @abstractmethod
+    def generate_final_analysis(
+        self,
+        chunk_analyses: List[Dict[str, Any]],
+        total_comments: int,
+        chunks_count: int,
+        system_prompt: str,
+        theme_frequencies: Optional[List[Dict[str, Any]]] = None,
+        statistics: Optional[Dict[str, Any]] = None,
+        coverage: Optional[Dict[str, int]] = None,
+        **options: Any
+    ) -> Dict[str, Any]:
+        """
+        Genera el informe final a partir de los análisis por chunks.
+
+        Args:
+            chunk_analyses: Lista de resultados de análisis por chunks o resúmenes intermedios
+            total_comments: Número total de comentarios analizados
+            chunks_count: Número de chunks procesados
+            system_prompt: Prompt del sistema
+            theme_frequencies: Clusters temáticos calculados localmente
+            statistics: Recuentos de sentimiento y temas sumados localmente
+            coverage: Comentarios y chunks realmente analizados frente a los totales
+            **options: Opciones del proveedor
+
+        Returns:
+            Dict con el informe final
+        """
+
+    @abstractmethod
+    def classify_comments(self, comments: List[str]) -> List[str]:
+        """
+        Clasifica el sentimiento de cada comentario.
+
+        Args:
+            comments: Lista de comentarios
+
+        Returns:
+            Una etiqueta de SENTIMENT_LABELS por comentario, en el mismo orden
+        """
+
+    def is_available(self) -> bool:
+        """Indica si el proveedor puede atender peticiones en este entorno."""
+        return True
+
+    def instructions_signature(self) -> str:
+        """
+        Instrucciones fijas que el proveedor añade a sus peticiones.
+
+        Forman parte de la huella de configuración, de modo que cambiarlas invalida los resultados en caché.
+        """
+        return ""
+
+def get_backend(name: Optional[str] = None) -> AnalysisBackend:
+    """
+    Obtiene la instancia global del motor de análisis indicado.
+
+    Los proveedores se importan bajo demanda para no cargar el modelo local (ni sus dependencias)
+    si no se utiliza.
+
+    Args:
+        name: Nombre del motor ('openai' o 'local'); por defecto, DEFAULT_BACKEND
+
+    Returns:
+        Motor de análisis
+    """
+    name = name or DEFAULT_BACKEND
+    if name == "local":
+        from services.local_model_service import local_model_service
+        return local_model_service
+    if name != "openai":
+        logger.warning(f"Motor de análisis desconocido '{name}'; se usa OpenAI")
+    from services.openai_service import openai_service
+    return openai_service
@@ -0,0 +1,862 @@
+"""
+Orquestación del pipeline de análisis de comentarios.
+Encadena el análisis por chunks (map) y el análisis final (reduce), de forma global, por periodos o por grupos de producto.
+"""
+import logging
+import contextvars
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED, Future
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.settings import (
+    DEFAULT_MAX_CONCURRENT_REQUESTS, MAX_PARALLEL_GROUPS, ROLLING_REDUCE_BATCH, ROLLING_REDUCE_MIN_CHUNKS,
+    CHUNK_RETRY_ROUNDS
+)
+from services.analysis_backend import get_backend
+from services.cache_service import period_cache
+from services.file_service import file_service
+from utils.data_processing import (
+    CommentChunks,
+    split_dataframe_into_chunks,
+    split_dataframe_into_topic_chunks,
+    split_dataframe_by_period,
+    split_dataframe_by_group,
+    calculate_total_tokens,
+    fingerprint_comments,
+    fingerprint_report,
+    build_config_fingerprint
+)
+from utils.metrics_extraction import (
+    extract_metrics_from_analysis, extract_key_sections, aggregate_chunk_statistics, format_coverage_note
+)
+from utils.profiling import run_in_profile
+from utils.visualization import format_analysis_sections
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[int, str], None]
+ErrorCallback = Callable[[int, Dict[str, Any]], None]
+ResultCallback = Callable[[str, int, Dict[str, Any]], None]
+
+# Errores que no se resuelven reintentando la misma petición
+NON_RETRYABLE_ERRORS = {"AuthenticationError", "PermissionDeniedError", "BadRequestError", "NotFoundError"}
+
+def _notify(callback: Optional[Callable], *args: Any) -> None:
+    """Invoca un callback opcional."""
+    if callback is not None:
+        callback(*args)
+
+def _submit(executor: ThreadPoolExecutor, fn: Callable, *args: Any, **kwargs: Any):
+    """Envía una tarea al executor propagando el contexto (trabajo y usuario) del hilo actual."""
+    context = contextvars.copy_context()
+    return executor.submit(context.run, run_in_profile, fn, *args, **kwargs)
+
+def _full_coverage(chunks_count: int, comments_count: int) -> Dict[str, int]:
+    """Cobertura de un resultado en el que se analizaron todos los chunks."""
+    return {
+        "chunks_analyzed": chunks_count,
+        "chunks_total": chunks_count,
+        "comments_analyzed": comments_count,
+        "comments_total": comments_count
+    }
+
+def _merge_coverage(coverages: List[Dict[str, int]]) -> Dict[str, int]:
+    """Suma la cobertura de varios resultados parciales (periodos o grupos)."""
+    keys = ("chunks_analyzed", "chunks_total", "comments_analyzed", "comments_total")
+    return {key: sum(c[key] for c in coverages) for key in keys}
+
+class RollingReducer:
+    """
+    Pliega los insights de los chunks en resúmenes intermedios mientras la fase map sigue en curso.
+
+    Cada vez que se acumulan `batch_size` elementos en un nivel, se envía una petición que los
+    resume en un único elemento del nivel siguiente. Al terminar el map solo quedan unos pocos
+    resúmenes y restos sin plegar, de modo que el análisis final recibe una entrada pequeña.
+    Todos los métodos deben llamarse desde el mismo hilo.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, config: Dict[str, Any], batch_size: int = ROLLING_REDUCE_BATCH):
+        """
+        Inicializa el reductor.
+
+        Args:
+            executor: Executor en el que se ejecutan los plegados
+            config: Configuración seleccionada en la barra lateral
+            batch_size: Número de elementos que se pliegan en cada resumen intermedio
+        """
+        self._executor = executor
+        self._config = config
+        self._batch_size = batch_size
+        self._pending: Dict[int, List[Dict[str, Any]]] = {}
+        self._folds: Dict[Future, Tuple[int, List[Dict[str, Any]]]] = {}
+        self.summaries: List[Dict[str, Any]] = []
+
+    def add(self, item: Dict[str, Any], level: int = 0) -> None:
+        """
+        Añade un elemento (insight de chunk o resumen) y lanza un plegado si el nivel está completo.
+
+        Args:
+            item: Resultado con las claves 'analysis' y 'comments_count'
+            level: Nivel de plegado del elemento (0 para insights de chunks)
+        """
+        items = self._pending.setdefault(level, [])
+        items.append(item)
+        if len(items) < self._batch_size:
+            return
+
+        self._pending[level] = []
+        future = _submit(
+            self._executor,
+            get_backend(self._config.get('backend')).generate_intermediate_summary,
+            items,
+            comments_count=sum(i["comments_count"] for i in items),
+            system_prompt=self._config['system_prompt'],
+            model=self._config['model'],
+            reasoning_effort=self._config['reasoning_effort']
+        )
+        self._folds[future] = (level, items)
+
+    def poll(self) -> None:
+        """Recoge los plegados terminados y los añade al nivel siguiente."""
+        for future in [f for f in self._folds if f.done()]:
+            level, items = self._folds.pop(future)
+            summary = future.result()
+            self.summaries.append(summary)
+            comments_count = sum(i["comments_count"] for i in items)
+
+            if summary.get("error", False):
+                # Conservar los elementos originales para el análisis final
+                logger.warning(f"Falló un resumen intermedio de nivel {level+1}; se conservan sus {len(items)} elementos")
+                self._pending.setdefault(level, []).extend(items)
+                continue
+
+            self.add(
+                dict(
+                    summary,
+                    comments_count=comments_count,
+                    label=f"RESUMEN INTERMEDIO ({len(items)} análisis, {comments_count} comentarios)"
+                ),
+                level + 1
+            )
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """
+        Espera a los plegados en curso y devuelve los elementos que deben pasar al análisis final.
+
+        Returns:
+            Resúmenes intermedios y restos sin plegar, de mayor a menor nivel
+        """
+        while self._folds:
+            wait(list(self._folds), return_when=FIRST_COMPLETED)
+            self.poll()
+
+        return [item for level in sorted(self._pending, reverse=True) for item in self._pending[level]]
+
+def prepare_chunks(
+    df: pd.DataFrame,
+    config: Dict[str, Any],
+    comment_column: str = 'Cuerpo',
+    max_comments: int = 0
+) -> Tuple[CommentChunks, int, List[Dict[str, Any]]]:
+    """
+    Divide los comentarios en chunks según la configuración (orden del archivo o agrupación temática).
+
+    Args:
+        df: DataFrame con los comentarios
+        config: Configuración seleccionada en la barra lateral
+        comment_column: Nombre de la columna que contiene los comentarios
+        max_comments: Máximo número de comentarios a procesar (0 para todos)
+
+    Returns:
+        Tupla con (chunks, total_comentarios, clusters_temáticos)
+    """
+    if config.get('topic_clustering', False):
+        return split_dataframe_into_topic_chunks(
+            df,
+            comment_column=comment_column,
+            chunk_size=config['chunk_size'],
+            max_comments=max_comments
+        )
+
+    chunks, total_comments = split_dataframe_into_chunks(
+        df,
+        comment_column=comment_column,
+        chunk_size=config['chunk_size'],
+        max_comments=max_comments
+    )
+    return chunks, total_comments, []
+
+def run_chunk_pipeline(
+    chunks: Sequence[Sequence[str]],
+    total_comments: int,
+    config: Dict[str, Any],
+    progress_callback: Optional[ProgressCallback] = None,
+    error_callback: Optional[ErrorCallback] = None,
+    theme_frequencies: Optional[List[Dict[str, Any]]] = None,
+    result_callback: Optional[ResultCallback] = None,
+    previous_results: Optional[Dict[int, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Analiza una lista de chunks y genera el análisis final.
+
+    Los chunks se envían en paralelo; el limitador global de peticiones reparte el
+    presupuesto entre todos los análisis en curso. En ejecuciones grandes, los insights se
+    pliegan en resúmenes intermedios mientras continúa la fase map (ver RollingReducer).
+    Los chunks fallidos pasan a una cola de reintentos que se atiende al terminar el resto
+    del map; los que siguen fallando quedan fuera del informe y se reflejan en su cobertura.
+    Los callbacks se invocan siempre desde el hilo que llama a esta función.
+
+    Args:
+        chunks: Chunks de comentarios (CommentChunks o lista de listas)
+        total_comments: Número total de comentarios
+        config: Configuración seleccionada en la barra lateral
+        progress_callback: Función (paso, mensaje) para informar del progreso
+        error_callback: Función (índice_chunk, resultado) invocada cuando falla un chunk
+        theme_frequencies: Clusters temáticos calculados localmente para el análisis final
+        result_callback: Función (etiqueta, comentarios, resultado) invocada con cada chunk completado
+        previous_results: Resultados correctos de una ejecución anterior, por índice de chunk, que se reutilizan
+
+    Returns:
+        Diccionario con los análisis por chunk, el análisis final, la cobertura y el consumo de tokens
+    """
+    results: Dict[int, Dict[str, Any]] = {}
+    failed: Dict[int, Dict[str, Any]] = {}
+    completed = 0
+    _notify(progress_callback, 0, f"Analizando {len(chunks)} grupos de comentarios...")
+
+    # En ejecuciones grandes, la reducción se solapa con la fase map
+    reduce_executor = ThreadPoolExecutor(max_workers=2) if len(chunks) >= ROLLING_REDUCE_MIN_CHUNKS else None
+    reducer = RollingReducer(reduce_executor, config) if reduce_executor else None
+
+    def accept(i: int, chunk_result: Dict[str, Any]) -> None:
+        """Incorpora el resultado correcto de un chunk."""
+        results[i] = chunk_result
+        if reducer:
+            reducer.poll()
+            reducer.add(dict(chunk_result, comments_count=len(chunks[i])))
+        _notify(result_callback, f"Grupo {i+1}", len(chunks[i]), chunk_result)
+
+    for i, chunk_result in sorted((previous_results or {}).items()):
+        accept(i, chunk_result)
+        completed += 1
+    if previous_results:
+        _notify(progress_callback, completed, f"{completed} grupos reutilizados de la ejecución anterior")
+
+    pending = [i for i in range(len(chunks)) if i not in results]
+    backend = get_backend(config.get('backend'))
+
+    with ThreadPoolExecutor(max_workers=DEFAULT_MAX_CONCURRENT_REQUESTS) as executor:
+        for attempt in range(CHUNK_RETRY_ROUNDS + 1):
+            if attempt:
+                logger.info(f"Reintentando {len(pending)} grupos fallidos (ronda {attempt} de {CHUNK_RETRY_ROUNDS})")
+                _notify(progress_callback, completed, f"Reintentando {len(pending)} grupos fallidos...")
+
+            futures = {
+                _submit(
+                    executor,
+                    backend.analyze_comments_chunk,
+                    chunks[i],
+                    system_prompt=config['system_prompt'],
+                    model=config['model'],
+                    reasoning_effort=config['reasoning_effort'],
+                    hedge=config.get('hedge_requests', False)
+                ): i
+                for i in pending
+            }
+
+            for future in as_completed(futures):
+                i = futures[future]
+                chunk_result = future.result()
+
+                if chunk_result.get("error", False):
+                    failed[i] = chunk_result
+                    continue
+
+                failed.pop(i, None)
+                completed += 1
+                accept(i, chunk_result)
+                _notify(progress_callback, completed, f"Grupo {i+1} completado ({completed} de {len(chunks)})")
+
+            # Solo se reintentan los errores que pueden ser transitorios
+            pending = sorted(i for i, r in failed.items() if r.get("error_type") not in NON_RETRYABLE_ERRORS)
+            if not pending:
+                break
+
+    for i in sorted(failed):
+        _notify(error_callback, i, failed[i])
+
+    # Mantener el orden original de los chunks
+    chunk_analyses = [results[i] for i in sorted(results)]
+    final_inputs = chunk_analyses
+    intermediate_summaries: List[Dict[str, Any]] = []
+
+    if reducer:
+        _notify(progress_callback, len(chunks), "Completando resúmenes intermedios...")
+        final_inputs = reducer.finish()
+        intermediate_summaries = reducer.summaries
+        reduce_executor.shutdown()
+        logger.info(f"Reducción incremental: {len(chunk_analyses)} insights plegados en {len(final_inputs)} entradas finales")
+
+    # Recuentos exactos sumados localmente a partir de las estadísticas de cada chunk
+    statistics = aggregate_chunk_statistics([r.get("statistics") for r in chunk_analyses])
+
+    failed_chunks = [
+        {
+            "index": i,
+            "comments_count": len(chunks[i]),
+            "error_type": failed[i].get("error_type", "Error"),
+            "error": failed[i].get("analysis", "")
+        }
+        for i in sorted(failed)
+    ]
+    coverage = {
+        "chunks_analyzed": len(results),
+        "chunks_total": len(chunks),
+        "comments_analyzed": sum(len(chunks[i]) for i in results),
+        "comments_total": total_comments
+    }
+    if failed_chunks:
+        logger.warning(
+            f"Cobertura incompleta: {coverage['comments_analyzed']} de {total_comments} comentarios "
+            f"({len(failed_chunks)} grupos fallidos)"
+        )
+
+    _notify(progress_callback, len(chunks), "Generando análisis final...")
+
+    final_analysis = backend.generate_final_analysis(
+        final_inputs,
+        total_comments=total_comments,
+        chunks_count=len(chunks),
+        system_prompt=config['system_prompt'],
+        model=config['model'],
+        reasoning_effort=config['reasoning_effort'],
+        theme_frequencies=theme_frequencies,
+        statistics=statistics,
+        coverage=coverage
+    )
+
+    token_counts = calculate_total_tokens(chunk_analyses + intermediate_summaries + [final_analysis])
+    logger.info(f"Compactación de prompts: ~{token_counts['input_tokens_saved']} tokens de entrada ahorrados")
+    logger.info(f"Caché de prefijos: {token_counts['cached_tokens']} de {token_counts['input_tokens']} tokens de entrada")
+    if token_counts['hedged_requests']:
+        logger.info(f"Peticiones duplicadas: {token_counts['hedged_requests']} ({token_counts['hedge_wins']} respondieron antes)")
+
+    return {
+        "chunk_analyses": chunk_analyses,
+        "final_analysis": final_analysis,
+        "total_comments": total_comments,
+        "chunks_count": len(chunks),
+        "theme_frequencies": theme_frequencies or [],
+        "statistics": statistics,
+        "coverage": coverage,
+        "failed_chunks": failed_chunks,
+        "chunks": chunks,
+        "chunk_results": results,
+        "token_counts": token_counts
+    }
+
+def run_period_pipeline(
+    df: pd.DataFrame,
+    config: Dict[str, Any],
+    comment_column: str = 'Cuerpo',
+    progress_callback: Optional[ProgressCallback] = None,
+    error_callback: Optional[ErrorCallback] = None,
+    result_callback: Optional[ResultCallback] = None
+) -> Dict[str, Any]:
+    """
+    Analiza los comentarios por periodos, reutilizando de la caché los periodos ya analizados,
+    y combina los análisis de cada periodo en un informe global.
+
+    Args:
+        df: DataFrame validado con las columnas de comentario y fecha
+        config: Configuración seleccionada en la barra lateral
+        comment_column: Nombre de la columna que contiene los comentarios
+        progress_callback: Función (paso, mensaje) para informar del progreso
+        error_callback: Función (índice_periodo, resultado) invocada cuando falla un periodo
+        result_callback: Función (etiqueta, comentarios, resultado) invocada con cada periodo completado
+
+    Returns:
+        Diccionario con los resultados por periodo, el análisis final y el consumo de tokens
+    """
+    # Periodos recortados por el límite de comentarios: se analizan, pero no se guardan en caché
+    truncated_periods = set()
+    if config.get('max_comments', 0) > 0:
+        if len(df) > config['max_comments']:
+            truncated_periods = {
+                label for label, _, _ in split_dataframe_by_period(
+                    df.iloc[config['max_comments']:], config['date_column'], config['period_frequency']
+                )
+            }
+        df = df.head(config['max_comments'])
+
+    periods = split_dataframe_by_period(df, config['date_column'], config['period_frequency'])
+    config_key = build_config_fingerprint(config, get_backend(config.get('backend')).instructions_signature())
+    period_results = []
+    new_analyses = []
+    coverages = []
+
+    for idx, (label, df_period, closed) in enumerate(periods):
+        fingerprint = fingerprint_comments(df_period[comment_column])
+
+        cached = period_cache.get(label, config_key, fingerprint, closed)
+        if cached is not None:
+            period_results.append(dict(cached, from_cache=True))
+            coverages.append(cached.get("coverage") or _full_coverage(cached["chunks_count"], cached["total_comments"]))
+            _notify(result_callback, f"Periodo {label}", cached["total_comments"], cached)
+            _notify(progress_callback, idx + 1, f"Periodo {label} recuperado de caché")
+            continue
+
+        chunks, period_total, clusters = prepare_chunks(df_period, config, comment_column)
+        result = run_chunk_pipeline(
+            chunks,
+            period_total,
+            config,
+            progress_callback=lambda step, message: _notify(progress_callback, idx, f"[{label}] {message}"),
+            theme_frequencies=clusters
+        )
+        final_analysis = result["final_analysis"]
+
+        if final_analysis.get("error", False):
+            coverages.append(dict(result["coverage"], chunks_analyzed=0, comments_analyzed=0))
+            _notify(error_callback, idx, final_analysis)
+            continue
+
+        coverages.append(result["coverage"])
+        new_analyses.extend(result["chunk_analyses"] + [final_analysis])
+
+        entry = {
+            "period": label,
+            "closed": closed,
+            "fingerprint": fingerprint,
+            "total_comments": period_total,
+            "chunks_count": result["chunks_count"],
+            "analysis": final_analysis["analysis"],
+            "metrics": _apply_statistics(
+                extract_metrics_from_analysis(final_analysis["analysis"]), result["statistics"], result["coverage"]
+            ),
+            "statistics": result["statistics"],
+            "coverage": result["coverage"],
+            "token_counts": result["token_counts"]
+        }
+        # Un periodo con chunks fallidos o incompleto por el límite no se guarda, para completarlo en la próxima ejecución
+        if label in truncated_periods:
+            logger.info(f"Periodo {label} recortado por el límite de comentarios; no se guarda en caché")
+        elif not result["failed_chunks"]:
+            period_cache.set(label, config_key, entry)
+        period_results.append(dict(entry, from_cache=False))
+        _notify(result_callback, f"Periodo {label}", period_total, entry)
+        _notify(progress_callback, idx + 1, f"Periodo {label} completado")
+
+    total_comments = sum(r["total_comments"] for r in period_results)
+    _notify(progress_callback, len(periods), "Generando análisis final...")
+
+    # Los análisis de cada periodo actúan como insights preliminares del informe global
+    period_insights = [
+        {"analysis": f"PERIODO {r['period']} ({r['total_comments']} comentarios):\n{r['analysis']}"}
+        for r in period_results
+    ]
+    statistics = aggregate_chunk_statistics([r.get("statistics") for r in period_results])
+    coverage = _merge_coverage(coverages)
+    final_analysis = get_backend(config.get('backend')).generate_final_analysis(
+        period_insights,
+        total_comments=total_comments,
+        chunks_count=len(period_results),
+        system_prompt=config['system_prompt'],
+        model=config['model'],
+        reasoning_effort=config['reasoning_effort'],
+        statistics=statistics,
+        coverage=coverage
+    )
+
+    cached_count = sum(1 for r in period_results if r["from_cache"])
+    logger.info(f"Análisis por periodos completado: {len(period_results)} periodos ({cached_count} desde caché)")
+
+    return {
+        "period_results": period_results,
+        "chunk_analyses": new_analyses,
+        "final_analysis": final_analysis,
+        "total_comments": total_comments,
+        "chunks_count": len(period_results),
+        "statistics": statistics,
+        "coverage": coverage,
+        "token_counts": calculate_total_tokens(new_analyses + [final_analysis])
+    }
+
+def _analyze_group(
+    name: str,
+    df_group: pd.DataFrame,
+    config: Dict[str, Any],
+    comment_column: str,
+    run_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Ejecuta el pipeline completo para un grupo y guarda su informe.
+
+    Args:
+        name: Nombre del grupo
+        df_group: DataFrame con los comentarios del grupo
+        config: Configuración seleccionada en la barra lateral
+        comment_column: Nombre de la columna que contiene los comentarios
+        run_id: Identificador de la ejecución, que se incluye en el nombre del informe
+
+    Returns:
+        Diccionario con el resultado del grupo
+    """
+    chunks, group_total, clusters = prepare_chunks(df_group, config, comment_column)
+    result = run_chunk_pipeline(chunks, group_total, config, theme_frequencies=clusters)
+    final_analysis = result["final_analysis"]
+
+    group_result = {
+        "group": name,
+        "total_comments": group_total,
+        "chunks_count": result["chunks_count"],
+        "failed_chunks": len(result["failed_chunks"]),
+        "final_analysis": final_analysis,
+        "statistics": result["statistics"],
+        "coverage": result["coverage"],
+        "token_counts": result["token_counts"],
+        "error": final_analysis.get("error", False)
+    }
+
+    if group_result["error"]:
+        group_result["coverage"] = dict(result["coverage"], chunks_analyzed=0, comments_analyzed=0)
+    else:
+        group_result["analysis"] = final_analysis["analysis"]
+        group_result["metrics"] = _apply_statistics(
+            extract_metrics_from_analysis(final_analysis["analysis"]), result["statistics"], result["coverage"]
+        )
+        group_result["filepath"] = file_service.save_analysis_to_file(
+            final_analysis["analysis"], label=str(name), run_id=run_id
+        )
+        group_result["report_hash"] = fingerprint_report(final_analysis["analysis"])
+
+        # El informe del producto se indexa sin sus comentarios: ya se indexan con el análisis global
+        sections = extract_key_sections(final_analysis["analysis"])
+        indexed_sections = sections if any(sections.values()) else {"informe": final_analysis["analysis"]}
+        file_service.index_report(group_result["filepath"], indexed_sections, total_comments=group_total)
+
+    return group_result
+
+def run_group_pipeline(
+    df: pd.DataFrame,
+    config: Dict[str, Any],
+    comment_column: str = 'Cuerpo',
+    progress_callback: Optional[ProgressCallback] = None,
+    error_callback: Optional[ErrorCallback] = None,
+    result_callback: Optional[ResultCallback] = None,
+    run_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Analiza cada grupo (por ejemplo, cada producto) con un pipeline independiente y en paralelo,
+    y genera un resumen comparativo entre grupos.
+
+    Todos los grupos comparten el limitador global de peticiones, por lo que el paralelismo
+    entre grupos no aumenta el consumo por minuto permitido.
+
+    Args:
+        df: DataFrame validado con las columnas de comentario y grupo
+        config: Configuración seleccionada en la barra lateral
+        comment_column: Nombre de la columna que contiene los comentarios
+        progress_callback: Función (paso, mensaje) para informar del progreso
+        error_callback: Función (índice_grupo, resultado) invocada cuando falla un grupo
+        result_callback: Función (etiqueta, comentarios, resultado) invocada con cada grupo completado
+        run_id: Identificador de la ejecución (el del trabajo), que se incluye en el nombre de cada informe
+
+    Returns:
+        Diccionario con los resultados por grupo, el resumen final y el consumo de tokens
+    """
+    if config.get('max_comments', 0) > 0:
+        df = df.head(config['max_comments'])
+
+    groups = split_dataframe_by_group(df, config['group_column'])
+    results: Dict[int, Dict[str, Any]] = {}
+    coverages = []
+    completed = 0
+
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_GROUPS) as executor:
+        futures = {
+            _submit(executor, _analyze_group, name, df_group, config, comment_column, run_id): idx
+            for idx, (name, df_group) in enumerate(groups)
+        }
+
+        for future in as_completed(futures):
+            idx = futures[future]
+            group_result = future.result()
+            completed += 1
+            coverages.append(group_result["coverage"])
+
+            if group_result["error"]:
+                _notify(error_callback, idx, group_result["final_analysis"])
+                continue
+
+            results[idx] = group_result
+            _notify(result_callback, f"Producto {group_result['group']}", group_result["total_comments"], group_result)
+            _notify(progress_callback, completed, f"Producto {group_result['group']} completado ({completed} de {len(groups)})")
+
+    group_results = [results[idx] for idx in sorted(results)]
+    total_comments = sum(r["total_comments"] for r in group_results)
+    _notify(progress_callback, len(groups), "Generando resumen entre productos...")
+
+    # Los informes de cada grupo actúan como insights preliminares del resumen comparativo
+    group_insights = [
+        {"analysis": f"PRODUCTO {r['group']} ({r['total_comments']} comentarios):\n{r['analysis']}"}
+        for r in group_results
+    ]
+    statistics = aggregate_chunk_statistics([r.get("statistics") for r in group_results])
+    coverage = _merge_coverage(coverages)
+    final_analysis = get_backend(config.get('backend')).generate_final_analysis(
+        group_insights,
+        total_comments=total_comments,
+        chunks_count=len(group_results),
+        system_prompt=config['system_prompt'],
+        model=config['model'],
+        reasoning_effort=config['reasoning_effort'],
+        statistics=statistics,
+        coverage=coverage
+    )
+
+    group_token_counts = [r["token_counts"] for r in group_results]
+    final_token_counts = calculate_total_tokens([final_analysis])
+    logger.info(f"Análisis por grupos completado: {len(group_results)} de {len(groups)} grupos")
+
+    return {
+        "group_results": group_results,
+        "final_analysis": final_analysis,
+        "total_comments": total_comments,
+        "chunks_count": len(group_results),
+        "statistics": statistics,
+        "coverage": coverage,
+        "token_counts": {
+            key: sum(tc.get(key, 0) for tc in group_token_counts) + final_token_counts[key]
+            for key in final_token_counts
+        }
+    }
+
+def _apply_statistics(
+    metrics: Dict[str, Any],
+    statistics: Optional[Dict[str, Any]],
+    coverage: Optional[Dict[str, int]] = None
+) -> Dict[str, Any]:
+    """
+    Sustituye las métricas extraídas del texto por los recuentos exactos cuando están disponibles.
+
+    Solo se sustituyen si las estadísticas cubren todos los comentarios analizados; si algunos
+    chunks no las devolvieron, sus porcentajes serían los de una muestra y se mantienen las
+    métricas extraídas del texto.
+
+    Args:
+        metrics: Métricas extraídas del texto del análisis
+        statistics: Estadísticas agregadas localmente
+        coverage: Cobertura del análisis (comentarios analizados y totales)
+
+    Returns:
+        Métricas actualizadas
+    """
+    if not statistics:
+        return metrics
+    if coverage and statistics["comments"] != coverage["comments_analyzed"]:
+        logger.info(
+            f"Estadísticas de {statistics['comments']} de {coverage['comments_analyzed']} comentarios analizados; "
+            "se mantienen las métricas del texto"
+        )
+        return metrics
+
+    metrics["sentiment_distribution"] = dict(statistics["sentiment_percentages"])
+    metrics["top_themes"] = [
+        {"name": name, "percentage": 100 * count / statistics["comments"]}
+        for name, count in list(statistics["themes"].items())[:10]
+    ]
+    return metrics
+
+def _chunk_row(index: int, comments_count: int, chunk_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Fila de la tabla de chunks de la exportación estructurada."""
+    sentiment = (chunk_result.get("statistics") or {}).get("sentiment", {})
+    return {
+        "chunk": index + 1,
+        "comments": comments_count,
+        "status": "error" if chunk_result.get("error", False) else "ok",
+        "error_type": chunk_result.get("error_type"),
+        "positive": sentiment.get("Positivo"),
+        "neutral": sentiment.get("Neutral"),
+        "negative": sentiment.get("Negativo"),
+        "total_tokens": chunk_result.get("total_tokens", 0),
+        "cached_tokens": chunk_result.get("cached_tokens", 0),
+        "analysis": chunk_result.get("analysis", "")
+    }
+
+def build_export_bundle(
+    result: Dict[str, Any],
+    metrics: Dict[str, Any],
+    sections: Dict[str, Any],
+    report_path: str
+) -> Tuple[Dict[str, Any], Dict[str, pd.DataFrame]]:
+    """
+    Reúne los resultados de un análisis en una exportación estructurada.
+
+    Args:
+        result: Resultado devuelto por cualquiera de los pipelines
+        metrics: Métricas del análisis final
+        sections: Secciones extraídas del análisis final
+        report_path: Ruta del informe de texto
+
+    Returns:
+        Tupla con (contenido_json, tablas_parquet_por_nombre)
+    """
+    tables: Dict[str, pd.DataFrame] = {}
+    bundle: Dict[str, Any] = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "report_file": report_path,
+        "analysis_text": result["final_analysis"]["analysis"],
+        "metrics": metrics,
+        "sections": sections,
+        "statistics": result.get("statistics"),
+        "coverage": result.get("coverage"),
+        "token_counts": result["token_counts"],
+        "total_comments": result["total_comments"],
+        "theme_frequencies": result.get("theme_frequencies", [])
+    }
+
+    # Análisis global: una fila por chunk y una etiqueta de chunk por comentario
+    chunks = result.get("chunks")
+    if chunks is not None:
+        failed = {chunk["index"]: chunk for chunk in result.get("failed_chunks", [])}
+        chunk_results = result.get("chunk_results", {})
+        rows = []
+        for i, chunk in enumerate(chunks):
+            if i in chunk_results:
+                rows.append(_chunk_row(i, len(chunk), chunk_results[i]))
+            else:
+                failure = failed.get(i, {})
+                rows.append(_chunk_row(i, len(chunk), {
+                    "error": True, "error_type": failure.get("error_type"), "analysis": failure.get("error", "")
+                }))
+        bundle["chunks"] = rows
+        tables["chunks"] = pd.DataFrame(rows)
+        if isinstance(chunks, CommentChunks):
+            # Se reutiliza la columna original en lugar de copiar cada comentario
+            sizes = chunks.sizes()
+            tables["comments"] = pd.DataFrame({
+                "comment": chunks.ordered_comments(),
+                "chunk": np.repeat(np.arange(1, len(chunks) + 1), sizes),
+                "status": np.repeat([row["status"] for row in rows], sizes)
+            })
+        else:
+            tables["comments"] = pd.DataFrame({
+                "comment": [str(comment) for chunk in chunks for comment in chunk],
+                "chunk": [i + 1 for i, chunk in enumerate(chunks) for _ in chunk],
+                "status": [rows[i]["status"] for i, chunk in enumerate(chunks) for _ in chunk]
+            })
+
+    if result.get("period_results"):
+        bundle["periods"] = [
+            {key: r.get(key) for key in (
+                "period", "closed", "from_cache", "total_comments", "chunks_count",
+                "metrics", "statistics", "coverage", "token_counts"
+            )}
+            for r in result["period_results"]
+        ]
+        tables["periods"] = pd.DataFrame([
+            {
+                "period": r["period"],
+                "comments": r["total_comments"],
+                "positive_pct": r["metrics"]["sentiment_distribution"].get("Positivo"),
+                "neutral_pct": r["metrics"]["sentiment_distribution"].get("Neutral"),
+                "negative_pct": r["metrics"]["sentiment_distribution"].get("Negativo"),
+                "closed": r["closed"],
+                "from_cache": r["from_cache"]
+            }
+            for r in result["period_results"]
+        ])
+
+    if result.get("group_results"):
+        bundle["groups"] = [
+            {key: r.get(key) for key in (
+                "group", "total_comments", "chunks_count", "failed_chunks",
+                "metrics", "statistics", "coverage", "token_counts", "filepath"
+            )}
+            for r in result["group_results"]
+        ]
+        tables["groups"] = pd.DataFrame([
+            {
+                "group": r["group"],
+                "comments": r["total_comments"],
+                "positive_pct": r["metrics"]["sentiment_distribution"].get("Positivo"),
+                "neutral_pct": r["metrics"]["sentiment_distribution"].get("Neutral"),
+                "negative_pct": r["metrics"]["sentiment_distribution"].get("Negativo"),
+                "failed_chunks": r["failed_chunks"],
+                "total_tokens": r["token_counts"]["total_tokens"]
+            }
+            for r in result["group_results"]
+        ])
+
+    statistics = result.get("statistics")
+    if statistics and statistics["themes"]:
+        tables["themes"] = pd.DataFrame([
+            {"theme": name, "mentions": count, "percentage": 100 * count / statistics["comments"]}
+            for name, count in statistics["themes"].items()
+        ])
+
+    return bundle, tables
+
+def finalize_analysis(
+    result: Dict[str, Any],
+    comments: Optional[Iterable[Any]] = None,
+    run_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Extrae métricas y secciones del análisis final, guarda el informe y lo añade al índice de búsqueda.
+
+    Args:
+        result: Resultado devuelto por cualquiera de los pipelines
+        comments: Comentarios analizados, que se indexan junto al informe
+        run_id: Identificador de la ejecución (el del trabajo), que hace único el nombre del informe
+
+    Returns:
+        Diccionario serializable con todo lo necesario para mostrar los resultados
+    """
+    analysis_text = result["final_analysis"]["analysis"]
+    sections = extract_key_sections(analysis_text)
+    coverage = result.get("coverage")
+
+    metrics = _apply_statistics(extract_metrics_from_analysis(analysis_text), result.get("statistics"), coverage)
+
+    # El informe guardado indica la cobertura real cuando faltan comentarios por analizar
+    report_text = analysis_text
+    if coverage and coverage["comments_analyzed"] < coverage["comments_total"]:
+        report_text = f"{format_coverage_note(coverage)}\n\n{analysis_text}"
+    filepath = file_service.save_analysis_to_file(report_text, run_id=run_id)
+
+    # Exportación estructurada junto al informe, para cargarla sin analizar el texto
+    try:
+        bundle, tables = build_export_bundle(result, metrics, sections, filepath)
+        export_files = file_service.save_export_bundle(bundle, tables, filepath)
+    except Exception as e:
+        logger.error(f"Error al generar la exportación estructurada: {str(e)}", exc_info=True)
+        export_files = {}
+
+    # Índice de búsqueda: secciones del informe (o el informe completo) y comentarios
+    indexed_sections = sections if any(sections.values()) else {"informe": report_text}
+    file_service.index_report(filepath, indexed_sections, comments, result["total_comments"])
+
+    return {
+        "analysis_text": analysis_text,
+        "report_text": report_text,
+        "report_hash": fingerprint_report(report_text, metrics),
+        "metrics": metrics,
+        "statistics": result.get("statistics"),
+        "formatted_sections": format_analysis_sections(sections),
+        "filepath": filepath,
+        "export_files": export_files,
+        "token_counts": result["token_counts"],
+        "total_comments": result["total_comments"],
+        "chunks_count": result["chunks_count"],
+        "coverage": coverage,
+        "failed_chunks": result.get("failed_chunks", []),
+        "theme_frequencies": result.get("theme_frequencies", []),
+        "period_results": result.get("period_results"),
+        "group_results": result.get("group_results")
+    }
@@ -0,0 +1,86 @@
+"""
+Servicios de caché para resultados de análisis.
+Permite reutilizar el análisis de periodos ya procesados sin volver a llamar al modelo.
+Las entradas se separan por configuración y se validan con la huella de los comentarios.
+"""
+import os
+import re
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config.settings import PERIOD_CACHE_DIR
+from services.file_service import file_service
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+class PeriodCache:
+    """Caché en disco de los análisis agregados por periodo."""
+
+    def __init__(self, cache_dir: str = PERIOD_CACHE_DIR):
+        """
+        Inicializa la caché de periodos.
+
+        Args:
+            cache_dir: Directorio donde se guardan las entradas de la caché
+        """
+        self.cache_dir = cache_dir
+
+    def _entry_path(self, period: str, config_key: str) -> str:
+        """Construye la ruta del archivo de caché para un periodo y configuración."""
+        safe_period = re.sub(r'[^0-9A-Za-z\-]', '_', period)
+        return os.path.join(self.cache_dir, config_key, f"{safe_period}.json")
+
+    def get(self, period: str, config_key: str, fingerprint: str, closed: bool) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el análisis en caché de un periodo.
+
+        Un periodo solo se reutiliza si sus comentarios son exactamente los del análisis guardado,
+        esté cerrado o no: un periodo cerrado con otros comentarios (otro conjunto de datos que
+        cubre las mismas fechas, o una exportación corregida) se recalcula. El nombre del archivo
+        no forma parte de la clave, así que una nueva exportación del mismo histórico reutiliza
+        todos sus periodos anteriores.
+
+        Args:
+            period: Etiqueta del periodo
+            config_key: Huella de la configuración del análisis
+            fingerprint: Huella del contenido actual del periodo
+            closed: Si el periodo ya ha terminado
+
+        Returns:
+            Entrada de la caché o None si hay que recalcular el periodo
+        """
+        entry = file_service.load_json(self._entry_path(period, config_key))
+        if entry is None:
+            return None
+
+        if entry.get("fingerprint") == fingerprint:
+            state = "cerrado" if entry.get("closed") and closed else "sin cambios"
+            logger.info(f"Periodo '{period}' {state} recuperado de caché")
+            return entry
+
+        if entry.get("closed") and closed:
+            logger.warning(f"Periodo cerrado '{period}' con comentarios distintos a los de la caché, se recalculará")
+        else:
+            logger.info(f"Periodo '{period}' modificado desde el último análisis, se recalculará")
+        return None
+
+    def set(self, period: str, config_key: str, entry: Dict[str, Any]) -> None:
+        """
+        Guarda el análisis de un periodo en la caché.
+
+        Args:
+            period: Etiqueta del periodo
+            config_key: Huella de la configuración del análisis
+            entry: Datos del análisis del periodo
+        """
+        entry = dict(entry, cached_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        try:
+            file_service.save_json(entry, self._entry_path(period, config_key))
+        except Exception as e:
+            # Un fallo de caché no debe interrumpir el análisis
+            logger.error(f"No se pudo guardar el periodo '{period}' en caché: {str(e)}")
+
+# Instancia global de la caché
+period_cache = PeriodCache()
@@ -3,9 +3,26 @@ Servicios para el manejo de archivos.
 Proporciona funciones para guardar y cargar archivos.
 """
 import os
+import re
+import json
+import uuid
+import hashlib
+import tempfile
 import logging
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, TextIO
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+
+import pandas as pd
+
+from services.search_service import search_index
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -14,36 +31,212 @@ class FileService:
     """Clase para gestionar operaciones con archivos."""
     
     @staticmethod
-    def save_analysis_to_file(analysis: str, output_dir: str = "outputs") -> str:
+    @contextmanager
+    def _atomic_target(filepath: str, overwrite: bool = True) -> Iterator[str]:
+        """
+        Proporciona una ruta temporal en el mismo directorio que sustituye al archivo de destino
+        solo si la escritura termina sin errores, de modo que nunca se lee un archivo a medias.
+        
+        Args:
+            filepath: Ruta completa del archivo de destino
+            overwrite: Si es False y el destino ya existe, se lanza FileExistsError sin tocarlo
+            
+        Yields:
+            Ruta temporal donde escribir el contenido
+        """
+        directory = os.path.dirname(filepath)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+            logger.info(f"Directorio '{directory}' creado")
+        
+        fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=".tmp_", suffix=os.path.basename(filepath))
+        os.close(fd)
+        try:
+            yield tmp_path
+            if overwrite:
+                os.replace(tmp_path, filepath)
+            else:
+                # link() falla si el destino existe, sin la ventana de carrera de comprobar antes de escribir
+                os.link(tmp_path, filepath)
+                os.remove(tmp_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    @staticmethod
+    def report_filename(label: Optional[str] = None, run_id: Optional[str] = None) -> str:
+        """
+        Genera un nombre de informe único aunque varios trabajos terminen en el mismo segundo.
+        
+        Args:
+            label: Etiqueta opcional (por ejemplo, el producto) para incluir en el nombre del archivo
+            run_id: Identificador de la ejecución (el del trabajo); si no se indica, se genera uno aleatorio
+            
+        Returns:
+            Nombre del archivo del informe
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        suffix = run_id or uuid.uuid4().hex[:12]
+        if label:
+            # El hash de la etiqueta original distingue etiquetas que se sanean igual ("A/B" y "A B")
+            safe_label = re.sub(r'[^0-9A-Za-z\-]+', '_', label).strip('_')
+            label_hash = hashlib.sha256(label.encode("utf-8")).hexdigest()[:8]
+            return f"analisis_sentimiento_{safe_label}_{label_hash}_{timestamp}_{suffix}.txt"
+        return f"analisis_sentimiento_{timestamp}_{suffix}.txt"
+    
+    @staticmethod
+    def save_analysis_to_file(
+        analysis: str,
+        output_dir: str = "outputs",
+        label: Optional[str] = None,
+        run_id: Optional[str] = None
+    ) -> str:
         """
-        Guarda el análisis en un archivo de texto.
+        Guarda el análisis en un archivo de texto nuevo; nunca sustituye un informe existente.
         
         Args:
             analysis: Texto del análisis a guardar
             output_dir: Directorio donde guardar el archivo
+            label: Etiqueta opcional (por ejemplo, el producto) para incluir en el nombre del archivo
+            run_id: Identificador de la ejecución que se incluye en el nombre del archivo
             
         Returns:
             Ruta completa al archivo guardado
         """
-        # Crear directorio si no existe
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-            logger.info(f"Directorio '{output_dir}' creado")
-        
-        # Generar nombre de archivo con timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"analisis_sentimiento_{timestamp}.txt"
-        filepath = os.path.join(output_dir, filename)
+        filepath = os.path.join(output_dir, FileService.report_filename(label, run_id))
         
         try:
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(analysis)
+            with FileService._atomic_target(filepath, overwrite=False) as tmp_path:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(analysis)
             logger.info(f"Análisis guardado en '{filepath}'")
             return filepath
         except Exception as e:
             logger.error(f"Error al guardar el análisis: {str(e)}")
             raise
     
+    @staticmethod
+    def save_json(data: Dict[str, Any], filepath: str, overwrite: bool = True) -> str:
+        """
+        Guarda un diccionario serializable en un archivo JSON.
+        
+        Args:
+            data: Datos a guardar
+            filepath: Ruta completa del archivo de destino
+            overwrite: Si es False y el archivo ya existe, se lanza FileExistsError
+            
+        Returns:
+            Ruta completa al archivo guardado
+        """
+        try:
+            with FileService._atomic_target(filepath, overwrite) as tmp_path:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            logger.info(f"Datos guardados en '{filepath}'")
+            return filepath
+        except Exception as e:
+            logger.error(f"Error al guardar JSON en '{filepath}': {str(e)}")
+            raise
+    
+    @staticmethod
+    def save_parquet(df: pd.DataFrame, filepath: str, overwrite: bool = True) -> Optional[str]:
+        """
+        Guarda un DataFrame en un archivo Parquet.
+        
+        Args:
+            df: Datos a guardar
+            filepath: Ruta completa del archivo de destino
+            overwrite: Si es False y el archivo ya existe, se lanza FileExistsError
+            
+        Returns:
+            Ruta completa al archivo guardado o None si pyarrow no está instalado
+        """
+        if not PYARROW_AVAILABLE:
+            logger.warning(f"pyarrow no está instalado; no se genera '{filepath}'")
+            return None
+        
+        try:
+            with FileService._atomic_target(filepath, overwrite) as tmp_path:
+                pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+            logger.info(f"Datos guardados en '{filepath}'")
+            return filepath
+        except Exception as e:
+            logger.error(f"Error al guardar Parquet en '{filepath}': {str(e)}")
+            raise
+    
+    @staticmethod
+    def save_export_bundle(
+        bundle: Dict[str, Any],
+        tables: Dict[str, pd.DataFrame],
+        report_path: str
+    ) -> Dict[str, str]:
+        """
+        Guarda la exportación estructurada de un análisis junto a su informe de texto.
+        
+        Genera `<informe>.json` con el contenido completo y un `<informe>_<tabla>.parquet` por
+        cada tabla, para que los cuadros de mando carguen los resultados sin analizar el texto.
+        El nombre del informe incluye el identificador de la ejecución, así que los archivos de
+        trabajos simultáneos no se mezclan; por si acaso, ninguno sustituye a uno existente.
+        
+        Args:
+            bundle: Contenido serializable de la exportación
+            tables: Tablas a exportar en Parquet, por nombre
+            report_path: Ruta del informe de texto (de save_analysis_to_file), usada como base de los nombres
+            
+        Returns:
+            Diccionario con la ruta de cada archivo generado
+        """
+        base_path = os.path.splitext(report_path)[0]
+        files = {"json": FileService.save_json(bundle, f"{base_path}.json", overwrite=False)}
+        
+        for name, table in tables.items():
+            path = FileService.save_parquet(table, f"{base_path}_{name}.parquet", overwrite=False)
+            if path:
+                files[name] = path
+        
+        return files
+    
+    @staticmethod
+    def index_report(
+        report_path: str,
+        sections: Dict[str, str],
+        comments: Optional[Iterable[Any]] = None,
+        total_comments: int = 0
+    ) -> None:
+        """
+        Añade un informe guardado y sus comentarios al índice de búsqueda (en segundo plano).
+        
+        Args:
+            report_path: Ruta del informe de texto; su nombre identifica la ejecución
+            sections: Secciones del informe por nombre
+            comments: Comentarios analizados, en orden
+            total_comments: Número de comentarios de la ejecución
+        """
+        run_id = os.path.splitext(os.path.basename(report_path))[0]
+        search_index.index_run(run_id, report_path, sections, comments, total_comments)
+    
+    @staticmethod
+    def load_json(filepath: str) -> Optional[Dict[str, Any]]:
+        """
+        Carga un archivo JSON.
+        
+        Args:
+            filepath: Ruta al archivo
+            
+        Returns:
+            Datos cargados o None si el archivo no existe o no es válido
+        """
+        if not os.path.exists(filepath):
+            return None
+        
+        try:
+            with open(filepath, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error al leer JSON de '{filepath}': {str(e)}")
+            return None
+    
     @staticmethod
     def get_file_handle(filepath: str) -> Optional[TextIO]:
         """
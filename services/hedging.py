@@ -0,0 +1,111 @@
+"""
+Control de peticiones duplicadas (hedging) para recortar la latencia de los chunks más lentos.
+Decide a partir de qué tiempo de espera merece la pena lanzar una copia de una petición
+y limita cuántas copias se pueden lanzar en total.
+"""
+import math
+import threading
+import logging
+from collections import deque
+from typing import Any, Dict, Optional
+
+from config.settings import HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES, HEDGE_MAX_EXTRA_FRACTION
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Número de latencias recientes que se conservan para calcular el percentil
+LATENCY_WINDOW = 200
+
+class HedgeController:
+    """
+    Mide la latencia de las peticiones de chunks y administra el presupuesto de duplicados.
+
+    Una petición se duplica cuando supera el percentil configurado de las latencias recientes,
+    siempre que el número de duplicados no exceda la fracción máxima de peticiones.
+    """
+
+    def __init__(
+        self,
+        percentile: float = HEDGE_PERCENTILE,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        max_extra_fraction: float = HEDGE_MAX_EXTRA_FRACTION
+    ):
+        """
+        Inicializa el controlador.
+
+        Args:
+            percentile: Percentil de latencia (0-1) a partir del cual se duplica una petición
+            min_samples: Latencias necesarias antes de empezar a duplicar
+            max_extra_fraction: Máximo de duplicados en proporción al número de peticiones
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_extra_fraction = max_extra_fraction
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._requests = 0
+        self._hedges = 0
+        self._wins = 0
+
+    def record_latency(self, seconds: float) -> None:
+        """Registra la latencia de una petición completada."""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def threshold(self) -> Optional[float]:
+        """
+        Calcula el tiempo de espera a partir del cual se duplica una petición.
+
+        Returns:
+            Segundos de espera o None si aún no hay latencias suficientes
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, math.ceil(self.percentile * len(ordered)) - 1)
+        return ordered[index]
+
+    def register_request(self) -> None:
+        """Contabiliza una petición original."""
+        with self._lock:
+            self._requests += 1
+
+    def try_acquire_hedge(self) -> bool:
+        """
+        Reserva un duplicado si el presupuesto lo permite.
+
+        Returns:
+            True si se puede lanzar el duplicado
+        """
+        with self._lock:
+            if self._hedges + 1 > self.max_extra_fraction * self._requests:
+                return False
+            self._hedges += 1
+            return True
+
+    def record_win(self) -> None:
+        """Contabiliza un duplicado que terminó antes que la petición original."""
+        with self._lock:
+            self._wins += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve las estadísticas acumuladas del proceso.
+
+        Returns:
+            Diccionario con peticiones, duplicados, duplicados ganadores y umbral actual
+        """
+        threshold = self.threshold()
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "hedges": self._hedges,
+                "wins": self._wins,
+                "hedge_rate": self._hedges / self._requests if self._requests else 0.0,
+                "threshold_seconds": threshold
+            }
+
+# Instancia global del controlador
+hedge_controller = HedgeController()
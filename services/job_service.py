@@ -0,0 +1,546 @@
+"""
+Servicio de ejecución de análisis en segundo plano.
+Los análisis se ejecutan en hilos del servidor, independientes de la sesión de Streamlit,
+de modo que sobreviven a recargas de la página, interacciones con widgets y desconexiones.
+"""
+import os
+import re
+import glob
+import math
+import time
+import threading
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from config.settings import JOBS_DIR, MAX_CONCURRENT_JOBS, DEFAULT_USER, JOB_SAVE_INTERVAL, PROFILING_ENABLED
+from services.file_service import file_service
+from services.result_store import result_store
+from services.scheduler import request_scheduler
+from services.theme_service import theme_index_store
+from services.analysis_pipeline import (
+    prepare_chunks,
+    run_chunk_pipeline,
+    run_period_pipeline,
+    run_group_pipeline,
+    finalize_analysis
+)
+from utils.data_processing import (
+    split_dataframe_by_period,
+    split_dataframe_by_group,
+    fingerprint_comments,
+    build_config_fingerprint
+)
+from utils.partial_results import PartialResultsAggregator
+from utils.profiling import profile_run
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+class AnalysisJob:
+    """
+    Estado de un análisis en segundo plano.
+
+    Los cambios de estado se persisten en disco inmediatamente; las actualizaciones de
+    progreso y de resultados parciales, como mucho una vez cada JOB_SAVE_INTERVAL segundos.
+    El resultado se guarda en el almacén compartido; si se expulsa, se vuelve a leer del disco.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        config: Dict[str, Any],
+        user: str = DEFAULT_USER,
+        priority: int = 1,
+        estimated_requests: int = 1,
+        jobs_dir: str = JOBS_DIR
+    ):
+        """
+        Inicializa el trabajo.
+
+        Args:
+            job_id: Identificador único del trabajo
+            config: Configuración seleccionada en la barra lateral
+            user: Usuario que envió el trabajo
+            priority: Peso de prioridad del trabajo en el reparto de peticiones
+            estimated_requests: Estimación del número de peticiones necesarias
+            jobs_dir: Directorio donde se persiste el estado del trabajo
+        """
+        self.job_id = job_id
+        self.config = config
+        self.user = user
+        self.priority = priority
+        self.estimated_requests = estimated_requests
+        self.status = "queued"
+        self.step = 0
+        self.total_steps = 1
+        self.message = "En cola..."
+        self.errors = []
+        self.result = None
+        self.result_key = f"job-result:{job_id}"
+        self.created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.finished_at = None
+        self.partial = PartialResultsAggregator()
+        # Resultados correctos de una ejecución anterior que se reutilizan al reintentar
+        self.previous_results: Dict[int, Dict[str, Any]] = {}
+        # Clave de deduplicación y número de solicitudes idénticas atendidas por este trabajo
+        self.single_flight_key: Optional[str] = None
+        self.subscribers = 1
+        self._path = os.path.join(jobs_dir, f"{job_id}.json")
+        self._lock = threading.Lock()
+        self._last_saved = 0.0
+
+    def _load_result(self, owner: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Resultado del trabajo desde el almacén compartido o, si se expulsó, desde su archivo."""
+        if self.result is not None or self.status != "completed":
+            return self.result
+        return result_store.get_or_load(
+            self.result_key, lambda: (file_service.load_json(self._path) or {}).get("result"), owner
+        )
+
+    def to_dict(self, owner: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Devuelve una copia serializable del estado del trabajo.
+
+        Args:
+            owner: Sesión que consulta el trabajo, a la que se atribuye la memoria del resultado
+        """
+        result = self._load_result(owner)
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "user": self.user,
+                "priority": self.priority,
+                "status": self.status,
+                "step": self.step,
+                "total_steps": self.total_steps,
+                "message": self.message,
+                "errors": list(self.errors),
+                "partial": self.partial.snapshot() if self.status == "running" else None,
+                "result": result,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+                "subscribers": self.subscribers
+            }
+
+    def save(self) -> None:
+        """Persiste el estado actual del trabajo."""
+        self._last_saved = time.monotonic()
+        try:
+            file_service.save_json(self.to_dict(), self._path)
+        except Exception as e:
+            logger.error(f"No se pudo persistir el trabajo {self.job_id}: {str(e)}")
+
+    def _save_throttled(self) -> None:
+        """Persiste el estado solo si ha pasado el intervalo mínimo desde el último guardado."""
+        if time.monotonic() - self._last_saved >= JOB_SAVE_INTERVAL:
+            self.save()
+
+    def remaining_requests(self) -> int:
+        """Estimación de las peticiones que le quedan al trabajo."""
+        with self._lock:
+            if self.status == "queued":
+                return self.estimated_requests
+            return max(self.total_steps - self.step, 0)
+
+    def attach(self, user: str) -> bool:
+        """
+        Une una solicitud idéntica a este trabajo si todavía no ha terminado.
+
+        Args:
+            user: Usuario que envió la solicitud idéntica
+
+        Returns:
+            True si la solicitud queda unida al trabajo
+        """
+        with self._lock:
+            if self.status not in ("queued", "running"):
+                return False
+            self.subscribers += 1
+        logger.info(f"Solicitud idéntica de '{user}' unida al trabajo {self.job_id} ({self.subscribers} solicitudes)")
+        return True
+
+    def start(self, total_steps: int) -> None:
+        """Marca el trabajo como en ejecución."""
+        with self._lock:
+            self.status = "running"
+            self.total_steps = max(total_steps, 1)
+            self.message = "Iniciando análisis..."
+        self.save()
+
+    def update_progress(self, step: int, message: str) -> None:
+        """Actualiza el progreso del trabajo."""
+        with self._lock:
+            self.step = step
+            self.message = message
+        self._save_throttled()
+
+    def add_result(self, label: str, comments_count: int, result: Dict[str, Any]) -> None:
+        """Incorpora un resultado intermedio (chunk, periodo o producto) a los resultados parciales."""
+        self.partial.add(label, comments_count, result.get("analysis", ""), result.get("statistics"))
+        self._save_throttled()
+
+    def add_error(self, message: str) -> None:
+        """Registra un error no fatal (por ejemplo, un chunk fallido)."""
+        with self._lock:
+            self.errors.append(message)
+        self.save()
+
+    def complete(self, result: Dict[str, Any]) -> None:
+        """Marca el trabajo como completado y pasa su resultado, ya persistido, al almacén compartido."""
+        with self._lock:
+            self.status = "completed"
+            self.step = self.total_steps
+            self.message = "Análisis completado"
+            self.result = result
+            self.finished_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.partial = PartialResultsAggregator()
+        self.save()
+        result_store.put(self.result_key, result)
+        with self._lock:
+            self.result = None
+
+    def fail(self, message: str) -> None:
+        """Marca el trabajo como fallido."""
+        with self._lock:
+            self.status = "failed"
+            self.message = message
+            self.finished_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.partial = PartialResultsAggregator()
+        self.save()
+
+class JobManager:
+    """
+    Cola de trabajos de análisis compartida por todas las sesiones, atendida por hilos
+    de trabajo del proceso del servidor.
+
+    El siguiente trabajo en arrancar es el del usuario con menos trabajos en ejecución y,
+    a igualdad, el de mayor prioridad. Una vez en ejecución, el planificador de peticiones
+    reparte el presupuesto de la API entre los usuarios activos.
+    """
+
+    def __init__(self, max_workers: int = MAX_CONCURRENT_JOBS, jobs_dir: str = JOBS_DIR):
+        """
+        Inicializa el gestor de trabajos.
+
+        Args:
+            max_workers: Número de análisis que se ejecutan simultáneamente
+            jobs_dir: Directorio donde se persiste el estado de los trabajos
+        """
+        self.jobs_dir = jobs_dir
+        self._max_workers = max_workers
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._pending: List[Tuple[int, AnalysisJob, pd.DataFrame, str]] = []
+        self._running_by_user: Dict[str, int] = {}
+        # Trabajos en curso por clave de deduplicación (entrada + configuración)
+        self._inflight: Dict[str, str] = {}
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._workers = []
+        self._fail_interrupted_jobs()
+
+    def _fail_interrupted_jobs(self) -> None:
+        """
+        Marca como fallidos los trabajos persistidos que seguían en cola o en ejecución.
+
+        Al arrancar el proceso ningún hilo los atiende, así que una sesión que los recuperase
+        desde la URL los consultaría indefinidamente.
+        """
+        for path in glob.glob(os.path.join(self.jobs_dir, "*.json")):
+            # El estado va al principio del archivo: se evita leer los resultados de los trabajos terminados
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    head = re.search(r'"status": "(\w+)"', f.read(4096))
+            except OSError:
+                continue
+            if head and head.group(1) not in ("queued", "running"):
+                continue
+            state = file_service.load_json(path)
+            if not state or state.get("status") not in ("queued", "running"):
+                continue
+            message = "Análisis interrumpido por reinicio del servidor"
+            state.update(
+                status="failed",
+                message=message,
+                errors=list(state.get("errors") or []) + [message],
+                partial=None,
+                finished_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            )
+            try:
+                file_service.save_json(state, path)
+                logger.warning(f"Trabajo {state.get('job_id')} interrumpido por reinicio del servidor, marcado como fallido")
+            except Exception as e:
+                logger.error(f"No se pudo marcar como fallido el trabajo interrumpido {path}: {str(e)}")
+
+    def _ensure_workers(self) -> None:
+        """Arranca los hilos de trabajo la primera vez que se necesitan."""
+        with self._cond:
+            if self._workers:
+                return
+            for i in range(self._max_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"analysis-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+            logger.info(f"Iniciados {self._max_workers} hilos de análisis en segundo plano")
+
+    @staticmethod
+    def _single_flight_key(df: pd.DataFrame, config: Dict[str, Any], comment_column: str) -> str:
+        """
+        Calcula la clave que identifica análisis idénticos: contenido de las columnas usadas y
+        opciones de configuración que cambian el resultado.
+        """
+        columns = [comment_column]
+        if config.get('group_enabled'):
+            columns.append(config['group_column'])
+        elif config.get('trend_enabled'):
+            columns.append(config['date_column'])
+        options = [
+            build_config_fingerprint(config),
+            config.get('max_comments'),
+            config.get('topic_clustering'),
+            config.get('trend_enabled'),
+            config.get('period_frequency') if config.get('trend_enabled') else None,
+            config.get('group_enabled')
+        ]
+        return fingerprint_comments(
+            [fingerprint_comments(df[column]) for column in columns] + [str(option) for option in options]
+        )
+
+    def submit(
+        self,
+        df: pd.DataFrame,
+        config: Dict[str, Any],
+        comment_column: str = 'Cuerpo',
+        user: str = DEFAULT_USER,
+        priority: int = 1,
+        previous_results: Optional[Dict[int, Dict[str, Any]]] = None
+    ) -> str:
+        """
+        Encola un nuevo análisis.
+
+        Si ya hay en curso un análisis idéntico (misma entrada y configuración), la solicitud
+        se une a él y comparte su progreso y su resultado en lugar de repetir las peticiones.
+
+        Args:
+            df: DataFrame validado con los comentarios
+            config: Configuración seleccionada en la barra lateral
+            comment_column: Nombre de la columna que contiene los comentarios
+            user: Usuario que envía el trabajo
+            priority: Peso de prioridad del trabajo
+            previous_results: Resultados correctos de chunks de una ejecución anterior, por índice
+
+        Returns:
+            Identificador del trabajo (el del trabajo en curso si la solicitud se ha unido a uno)
+        """
+        self._ensure_workers()
+
+        key = self._single_flight_key(df, config, comment_column)
+
+        total = len(df) if not config.get('max_comments') else min(len(df), config['max_comments'])
+        estimated_requests = math.ceil(total / config['chunk_size']) + 1 - len(previous_results or {})
+
+        job_id = uuid.uuid4().hex[:12]
+        job = AnalysisJob(job_id, dict(config), user, priority, estimated_requests, self.jobs_dir)
+        job.previous_results = dict(previous_results or {})
+        job.single_flight_key = key
+        with self._cond:
+            # Los reintentos no se unen a otros trabajos: reutilizan resultados propios
+            inflight = self._jobs.get(self._inflight.get(key)) if not previous_results else None
+            attached = inflight is not None and inflight.attach(user)
+            if not attached:
+                self._jobs[job_id] = job
+                self._inflight[key] = job_id
+                self._seq += 1
+                self._pending.append((self._seq, job, df, comment_column))
+                self._cond.notify()
+
+        if attached:
+            inflight.save()
+            return inflight.job_id
+
+        job.save()
+
+        logger.info(f"Trabajo {job_id} de '{user}' encolado ({len(df)} comentarios, prioridad {priority})")
+        return job_id
+
+    def retry_failed_chunks(self, job_id: str) -> Optional[str]:
+        """
+        Encola un nuevo análisis que reutiliza los chunks correctos de un trabajo y solo repite los fallidos.
+
+        Args:
+            job_id: Identificador del trabajo completado con chunks fallidos
+
+        Returns:
+            Identificador del nuevo trabajo o None si el trabajo ya no se puede reintentar
+            (por ejemplo, tras reiniciar el servidor o si sus datos se expulsaron del almacén)
+        """
+        retry = result_store.get(f"job-retry:{job_id}")
+        result_store.discard(f"job-retry:{job_id}")
+        with self._cond:
+            job = self._jobs.get(job_id)
+        if retry is None or job is None:
+            return None
+
+        df, comment_column, previous_results = retry
+        logger.info(f"Reintentando los chunks fallidos del trabajo {job_id} ({len(previous_results)} reutilizados)")
+        return self.submit(df, job.config, comment_column, job.user, job.priority, previous_results)
+
+    def _pending_order(self) -> List[Tuple[int, AnalysisJob, pd.DataFrame, str]]:
+        """Ordena los trabajos pendientes según el reparto justo. Debe llamarse con el lock adquirido."""
+        return sorted(
+            self._pending,
+            key=lambda item: (self._running_by_user.get(item[1].user, 0), -item[1].priority, item[0])
+        )
+
+    def _estimate_eta(self, job: AnalysisJob) -> Tuple[Optional[int], Optional[float]]:
+        """
+        Calcula la posición en cola y el tiempo restante estimado de un trabajo.
+
+        Returns:
+            Tupla con (posición_en_cola o None si ya se ejecuta, segundos_restantes)
+        """
+        if job.status == "running":
+            rate = request_scheduler.job_rate(job.job_id)
+            if rate is None:
+                rate = request_scheduler.global_rate() / request_scheduler.active_users()
+            return None, job.remaining_requests() / rate
+
+        with self._cond:
+            order = self._pending_order()
+            running = [j for j in self._jobs.values() if j.status == "running"]
+        position = next((i for i, item in enumerate(order) if item[1] is job), None)
+        if position is None:
+            return None, None
+
+        # Peticiones que deben atenderse antes de que este trabajo termine
+        ahead = sum(item[1].remaining_requests() for item in order[:position])
+        if len(running) >= self._max_workers:
+            ahead += min(j.remaining_requests() for j in running)
+        seconds = (ahead + job.remaining_requests()) / request_scheduler.global_rate()
+        return position + 1, seconds
+
+    def get_job(self, job_id: str, owner: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el estado de un trabajo, desde memoria o desde disco si el proceso se reinició.
+
+        Args:
+            job_id: Identificador del trabajo
+            owner: Sesión que consulta el trabajo, a la que se atribuye la memoria del resultado
+
+        Returns:
+            Estado del trabajo o None si no existe
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return result_store.get_or_load(
+                f"job-file:{job_id}", lambda: file_service.load_json(os.path.join(self.jobs_dir, f"{job_id}.json")), owner
+            )
+
+        state = job.to_dict(owner)
+        if state["status"] in ("queued", "running"):
+            state["queue_position"], state["eta_seconds"] = self._estimate_eta(job)
+        return state
+
+    def release(self, job_id: str, owner: Optional[str]) -> None:
+        """
+        Indica que una sesión ha dejado de mostrar el resultado de un trabajo.
+
+        Args:
+            job_id: Identificador del trabajo
+            owner: Sesión que cierra el resultado
+        """
+        result_store.release(f"job-result:{job_id}", owner)
+        result_store.release(f"job-file:{job_id}", owner)
+
+    def _worker_loop(self) -> None:
+        """Atiende la cola de trabajos indefinidamente."""
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                item = self._pending_order()[0]
+                self._pending.remove(item)
+                _, job, df, comment_column = item
+                self._running_by_user[job.user] = self._running_by_user.get(job.user, 0) + 1
+
+            try:
+                with request_scheduler.job_context(job.job_id, job.user, job.priority), \
+                        profile_run(f"job-{job.job_id}", enabled=PROFILING_ENABLED or job.config.get("profile", False)):
+                    self._run_job(job, df, comment_column)
+            except Exception as e:
+                logger.error(f"Error en el trabajo {job.job_id}: {str(e)}", exc_info=True)
+                job.fail(f"Error inesperado: {str(e)}")
+            finally:
+                with self._cond:
+                    self._running_by_user[job.user] -= 1
+                    if self._inflight.get(job.single_flight_key) == job.job_id:
+                        del self._inflight[job.single_flight_key]
+
+    def _run_job(self, job: AnalysisJob, df: pd.DataFrame, comment_column: str) -> None:
+        """Ejecuta el pipeline correspondiente a la configuración del trabajo."""
+        config = job.config
+
+        def report_error(label: str):
+            return lambda index, result: job.add_error(
+                f"Error al analizar {label} {index+1} ({result.get('error_type', 'Error')}): "
+                f"{result.get('analysis', 'Error desconocido')}"
+            )
+
+        if config.get('group_enabled'):
+            job.start(len(split_dataframe_by_group(df, config['group_column'])) + 1)
+            result = run_group_pipeline(
+                df, config, comment_column,
+                progress_callback=job.update_progress,
+                error_callback=report_error("el producto"),
+                result_callback=job.add_result,
+                run_id=job.job_id
+            )
+        elif config.get('trend_enabled'):
+            job.start(len(split_dataframe_by_period(df, config['date_column'], config['period_frequency'])) + 1)
+            result = run_period_pipeline(
+                df, config, comment_column,
+                progress_callback=job.update_progress,
+                error_callback=report_error("el periodo"),
+                result_callback=job.add_result
+            )
+        else:
+            chunks, total_comments, clusters = prepare_chunks(
+                df, config, comment_column, max_comments=config['max_comments']
+            )
+            job.start(len(chunks) + 1)
+            result = run_chunk_pipeline(
+                chunks,
+                total_comments,
+                config,
+                progress_callback=job.update_progress,
+                error_callback=report_error("el grupo"),
+                theme_frequencies=clusters,
+                result_callback=job.add_result,
+                previous_results=job.previous_results
+            )
+            job.previous_results = {}
+
+        final_analysis = result["final_analysis"]
+        if final_analysis.get("error", False):
+            job.fail(f"Error en el análisis final: {final_analysis.get('analysis', 'Error desconocido')}")
+            return
+
+        comments = df[comment_column] if not config.get('max_comments') else df[comment_column].head(config['max_comments'])
+        final_result = finalize_analysis(result, comments=comments, run_id=job.job_id)
+        theme_index_store.build(final_result["report_hash"], comments)
+        # Solo el análisis global permite repetir chunks concretos; los periodos y grupos
+        # incompletos se repiten enteros en la siguiente ejecución
+        final_result["retryable"] = bool(result.get("chunk_results") is not None and result.get("failed_chunks"))
+        if final_result["retryable"]:
+            # Datos para reintentar solo los chunks fallidos, mientras el almacén no los expulse
+            result_store.put(f"job-retry:{job.job_id}", (df, comment_column, result["chunk_results"]))
+
+        job.complete(final_result)
+        logger.info(f"Trabajo {job.job_id} completado")
+
+# Instancia global del gestor de trabajos
+job_manager = JobManager()
@@ -0,0 +1,405 @@
+"""
+Motor de análisis local: clasificación de sentimiento con un modelo pequeño en CPU, sin conexión.
+Carga el modelo desde una ruta local (ONNX con onnxruntime o transformers con PyTorch) y construye
+el informe a partir de los recuentos y de comentarios representativos, sin coste de API.
+"""
+import os
+import time
+import threading
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    from transformers import AutoConfig, AutoTokenizer
+    TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    TRANSFORMERS_AVAILABLE = False
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+from config.settings import (
+    LOCAL_MODEL_PATH, LOCAL_MODEL_BATCH_SIZE, LOCAL_MODEL_THREADS, LOCAL_MODEL_MAX_LENGTH,
+    LOCAL_REPORT_EXAMPLES, LOCAL_THEME_MIN_MENTIONS, THEME_SYNONYMS
+)
+from services.analysis_backend import AnalysisBackend, SENTIMENT_LABELS
+from utils.metrics_extraction import format_coverage_note
+from utils.text_normalization import normalize_comment, trim_comment
+from utils.theme_index import CommentIndex, theme_keywords
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Archivo del modelo exportado a ONNX dentro de LOCAL_MODEL_PATH
+ONNX_MODEL_FILE = "model.onnx"
+
+def map_sentiment_label(label: str, num_labels: int, index: int) -> str:
+    """
+    Traduce la etiqueta de un modelo de clasificación a Positivo, Neutral o Negativo.
+
+    Reconoce etiquetas con nombre ("negative", "POS", "neutral"), de estrellas ("1 star" ... "5 stars")
+    y genéricas ("LABEL_0"), que se interpretan por posición: negativa, (neutral,) positiva.
+
+    Args:
+        label: Etiqueta del modelo (id2label)
+        num_labels: Número de clases del modelo
+        index: Posición de la clase
+
+    Returns:
+        Etiqueta de SENTIMENT_LABELS
+    """
+    name = label.strip().lower()
+    if name.startswith("neg"):
+        return "Negativo"
+    if name.startswith("neu"):
+        return "Neutral"
+    if name.startswith("pos"):
+        return "Positivo"
+    if "star" in name and name[0].isdigit():
+        stars = int(name[0])
+        return "Negativo" if stars <= 2 else "Neutral" if stars == 3 else "Positivo"
+    if index == 0:
+        return "Negativo"
+    return "Positivo" if index == num_labels - 1 else "Neutral"
+
+class LocalModelService(AnalysisBackend):
+    """
+    Análisis con un modelo local de clasificación de sentimiento.
+
+    La inferencia se hace por lotes de comentarios de longitud similar (menos relleno) repartidos
+    en un pool de hilos; onnxruntime y PyTorch liberan el GIL durante el cálculo.
+    """
+
+    name = "local"
+
+    def __init__(self, model_path: str = LOCAL_MODEL_PATH, threads: int = LOCAL_MODEL_THREADS):
+        """
+        Inicializa el servicio; el modelo se carga en la primera petición.
+
+        Args:
+            model_path: Directorio del modelo (tokenizer, config.json y model.onnx o pesos de PyTorch)
+            threads: Número de hilos de inferencia
+        """
+        self.model_path = model_path
+        self.threads = threads
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="local-model")
+        self._lock = threading.Lock()
+        self._tokenizer = None
+        self._predict = None
+        self._labels: List[str] = []
+
+    def is_available(self) -> bool:
+        """Indica si están instaladas las dependencias y existe el modelo local."""
+        return TRANSFORMERS_AVAILABLE and os.path.isdir(self.model_path)
+
+    def _load(self) -> None:
+        """Carga el tokenizer y el modelo (ONNX si existe el archivo exportado, si no PyTorch)."""
+        with self._lock:
+            if self._predict is not None:
+                return
+            if not TRANSFORMERS_AVAILABLE:
+                raise RuntimeError("El modelo local requiere el paquete 'transformers'")
+            if not os.path.isdir(self.model_path):
+                raise RuntimeError(f"No se encuentra el modelo local en '{self.model_path}'")
+
+            start = time.perf_counter()
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_path, local_files_only=True)
+            model_config = AutoConfig.from_pretrained(self.model_path, local_files_only=True)
+            id2label = {int(k): v for k, v in model_config.id2label.items()}
+            self._labels = [map_sentiment_label(id2label[i], len(id2label), i) for i in range(len(id2label))]
+
+            onnx_path = os.path.join(self.model_path, ONNX_MODEL_FILE)
+            if ONNXRUNTIME_AVAILABLE and os.path.exists(onnx_path):
+                # Repartir los núcleos entre los hilos de inferencia para no sobresuscribir la CPU
+                options = ort.SessionOptions()
+                options.intra_op_num_threads = max(1, (os.cpu_count() or 1) // self.threads)
+                session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+                input_names = [model_input.name for model_input in session.get_inputs()]
+
+                def predict(batch: List[str]) -> np.ndarray:
+                    encoded = self._tokenizer(
+                        batch, padding=True, truncation=True, max_length=LOCAL_MODEL_MAX_LENGTH, return_tensors="np"
+                    )
+                    feeds = {name: encoded[name].astype(np.int64) for name in input_names if name in encoded}
+                    return session.run(None, feeds)[0]
+
+                engine = "onnxruntime"
+            else:
+                import torch
+                from transformers import AutoModelForSequenceClassification
+
+                torch.set_num_threads(max(1, (os.cpu_count() or 1) // self.threads))
+                model = AutoModelForSequenceClassification.from_pretrained(self.model_path, local_files_only=True)
+                model.eval()
+
+                def predict(batch: List[str]) -> np.ndarray:
+                    encoded = self._tokenizer(
+                        batch, padding=True, truncation=True, max_length=LOCAL_MODEL_MAX_LENGTH, return_tensors="pt"
+                    )
+                    with torch.inference_mode():
+                        return model(**encoded).logits.numpy()
+
+                engine = "PyTorch"
+
+            self._predict = predict
+            logger.info(
+                f"Modelo local cargado desde '{self.model_path}' con {engine} en {time.perf_counter() - start:.1f}s "
+                f"(etiquetas: {', '.join(self._labels)})"
+            )
+
+    def classify_comments(self, comments: List[str]) -> List[str]:
+        """
+        Clasifica el sentimiento de cada comentario con el modelo local.
+
+        Args:
+            comments: Lista de comentarios
+
+        Returns:
+            Una etiqueta de SENTIMENT_LABELS por comentario, en el mismo orden
+        """
+        self._load()
+        texts = [normalize_comment(comment) for comment in comments]
+        if not texts:
+            return []
+
+        # Lotes de comentarios de longitud parecida; después se restaura el orden original
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        batches = [order[i:i + LOCAL_MODEL_BATCH_SIZE] for i in range(0, len(order), LOCAL_MODEL_BATCH_SIZE)]
+        predictions = self._executor.map(lambda batch: self._predict([texts[i] for i in batch]).argmax(axis=1), batches)
+
+        labels: List[str] = [""] * len(texts)
+        for batch, classes in zip(batches, predictions):
+            for position, label_index in zip(batch, classes):
+                labels[position] = self._labels[label_index]
+        return labels
+
+    @staticmethod
+    def _empty_usage() -> Dict[str, Any]:
+        """Recuentos de tokens de una respuesta local (sin coste de API)."""
+        return {
+            "tokens_razonamiento": 0,
+            "total_tokens": 0,
+            "input_tokens": 0,
+            "cached_tokens": 0
+        }
+
+    @staticmethod
+    def _error_result(e: Exception) -> Dict[str, Any]:
+        """Resultado de error con el mismo formato que el resto de proveedores."""
+        return {
+            "analysis": f"Error: {str(e)}",
+            "tokens_razonamiento": 0,
+            "total_tokens": 0,
+            "error": True,
+            "error_type": type(e).__name__
+        }
+
+    @staticmethod
+    def _theme_sentiment(comments: List[str], labels: List[str]) -> Dict[str, Dict[str, int]]:
+        """Recuento de sentimiento de los comentarios que mencionan cada tema de THEME_SYNONYMS."""
+        index = CommentIndex(comments)
+        labels_array = np.array(labels, dtype=object)
+        theme_sentiment = {}
+        for theme in THEME_SYNONYMS:
+            documents = index.match(theme_keywords(theme))
+            if len(documents):
+                counts = Counter(labels_array[documents])
+                theme_sentiment[theme] = {label: counts.get(label, 0) for label in SENTIMENT_LABELS}
+        return theme_sentiment
+
+    @staticmethod
+    def _merge_examples(items: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+        """Une los comentarios representativos de varios resultados."""
+        return {
+            label: [example for item in items for example in item.get("examples", {}).get(label, [])][:LOCAL_REPORT_EXAMPLES]
+            for label in ("Positivo", "Negativo")
+        }
+
+    @staticmethod
+    def _merge_theme_sentiment(items: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+        """Suma el sentimiento por tema de varios resultados."""
+        merged: Dict[str, Counter] = {}
+        for item in items:
+            for theme, counts in item.get("theme_sentiment", {}).items():
+                merged.setdefault(theme, Counter()).update(counts)
+        return {theme: {label: counts.get(label, 0) for label in SENTIMENT_LABELS} for theme, counts in merged.items()}
+
+    def analyze_comments_chunk(self, comments: List[str], system_prompt: str, **options: Any) -> Dict[str, Any]:
+        """
+        Analiza un chunk clasificando cada comentario con el modelo local.
+
+        El prompt del sistema y las opciones del modelo de OpenAI no se utilizan.
+
+        Args:
+            comments: Lista de comentarios para analizar
+            system_prompt: Prompt del sistema (no se utiliza)
+            **options: Opciones de otros proveedores (se ignoran)
+
+        Returns:
+            Dict con un resumen del chunk, sus estadísticas, el sentimiento por tema y comentarios representativos
+        """
+        logger.info(f"Clasificando localmente un chunk de {len(comments)} comentarios")
+        try:
+            # Los chunks son vistas sobre el archivo: se materializan una sola vez
+            comments = list(comments)
+            labels = self.classify_comments(comments)
+            sentiment = Counter(labels)
+            theme_sentiment = self._theme_sentiment(comments, labels)
+            themes = {theme: sum(counts.values()) for theme, counts in theme_sentiment.items()}
+            examples = {
+                label: [
+                    trim_comment(normalize_comment(comment), 60)
+                    for comment, comment_label in zip(comments, labels) if comment_label == label
+                ][:LOCAL_REPORT_EXAMPLES]
+                for label in ("Positivo", "Negativo")
+            }
+        except Exception as e:
+            logger.error(f"Error al clasificar chunk con el modelo local: {str(e)}")
+            return self._error_result(e)
+
+        top_themes = sorted(themes.items(), key=lambda item: item[1], reverse=True)[:5]
+        analysis = (
+            f"Sentimiento: {sentiment.get('Positivo', 0)} positivos, {sentiment.get('Neutral', 0)} neutrales, "
+            f"{sentiment.get('Negativo', 0)} negativos.\n"
+            f"Temas: {', '.join(f'{theme} ({count})' for theme, count in top_themes) or 'sin temas reconocidos'}."
+        )
+        return {
+            "analysis": analysis,
+            "statistics": {
+                "comments": len(comments),
+                "sentiment": {label: sentiment.get(label, 0) for label in SENTIMENT_LABELS},
+                "themes": themes
+            },
+            "theme_sentiment": theme_sentiment,
+            "examples": examples,
+            **self._empty_usage(),
+            "input_tokens_saved": 0
+        }
+
+    def generate_intermediate_summary(
+        self,
+        analyses: List[Dict[str, Any]],
+        comments_count: int,
+        system_prompt: str,
+        **options: Any
+    ) -> Dict[str, Any]:
+        """
+        Combina varios análisis locales conservando el sentimiento por tema y los ejemplos.
+
+        Args:
+            analyses: Lista de análisis preliminares (de chunks o resúmenes anteriores)
+            comments_count: Número de comentarios que cubren en conjunto
+            system_prompt: Prompt del sistema (no se utiliza)
+            **options: Opciones de otros proveedores (se ignoran)
+
+        Returns:
+            Dict con el resumen intermedio
+        """
+        return {
+            "analysis": f"Resumen de {len(analyses)} análisis locales ({comments_count} comentarios).",
+            "theme_sentiment": self._merge_theme_sentiment(analyses),
+            "examples": self._merge_examples(analyses),
+            **self._empty_usage()
+        }
+
+    def generate_final_analysis(
+        self,
+        chunk_analyses: List[Dict[str, Any]],
+        total_comments: int,
+        chunks_count: int,
+        system_prompt: str,
+        theme_frequencies: Optional[List[Dict[str, Any]]] = None,
+        statistics: Optional[Dict[str, Any]] = None,
+        coverage: Optional[Dict[str, int]] = None,
+        **options: Any
+    ) -> Dict[str, Any]:
+        """
+        Construye el informe con la misma estructura de secciones que el informe del modelo de OpenAI,
+        a partir de los recuentos exactos, el sentimiento por tema y comentarios representativos.
+
+        Las secciones que requieren un modelo generativo (segmentación) se indican como no disponibles.
+
+        Args:
+            chunk_analyses: Lista de resultados de análisis por chunks o resúmenes intermedios
+            total_comments: Número total de comentarios analizados
+            chunks_count: Número de chunks procesados
+            system_prompt: Prompt del sistema (no se utiliza)
+            theme_frequencies: Clusters temáticos calculados localmente
+            statistics: Recuentos de sentimiento y temas sumados localmente
+            coverage: Comentarios y chunks realmente analizados frente a los totales
+            **options: Opciones de otros proveedores (se ignoran)
+
+        Returns:
+            Dict con el informe final
+        """
+        logger.info(f"Generando informe local para {total_comments} comentarios en {chunks_count} chunks")
+        if not statistics:
+            return self._error_result(RuntimeError("No hay estadísticas de ningún chunk para construir el informe"))
+
+        valid = [chunk for chunk in chunk_analyses if not chunk.get("error", False)]
+        theme_sentiment = self._merge_theme_sentiment(valid)
+        examples = self._merge_examples(valid)
+        percentages = statistics["sentiment_percentages"]
+        classified = max(sum(statistics["sentiment"].values()), 1)
+
+        ranked = sorted(theme_sentiment.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        frequent = [(theme, counts) for theme, counts in ranked if sum(counts.values()) >= LOCAL_THEME_MIN_MENTIONS]
+        themes_lines = [
+            f"- {theme}: {100 * sum(counts.values()) / classified:.1f}% de los comentarios "
+            f"({100 * counts['Positivo'] / sum(counts.values()):.0f}% positivos, "
+            f"{100 * counts['Negativo'] / sum(counts.values()):.0f}% negativos)"
+            for theme, counts in ranked[:7]
+        ]
+        if not themes_lines:
+            # Informes de periodos o productos: solo se dispone de los recuentos de temas agregados
+            themes_lines = [
+                f"- {theme}: {100 * count / classified:.1f}% de los comentarios"
+                for theme, count in list(statistics["themes"].items())[:7]
+            ]
+        for cluster in sorted(theme_frequencies or [], key=lambda c: c['size'], reverse=True)[:7]:
+            themes_lines.append(f"- {', '.join(cluster['terms'][:3])}: {cluster['percentage']:.1f}% (agrupación local)")
+
+        best = sorted(frequent, key=lambda item: item[1]["Positivo"] / sum(item[1].values()), reverse=True)[:5]
+        worst = sorted(frequent, key=lambda item: item[1]["Negativo"], reverse=True)[:5]
+
+        coverage_note = ""
+        if coverage and coverage["comments_analyzed"] < coverage["comments_total"]:
+            coverage_note = f"{format_coverage_note(coverage)}\n\n"
+
+        analysis = (
+            f"{coverage_note}"
+            "1. SENTIMIENTO GENERAL:\n"
+            f"{percentages['Positivo']:.1f}% positivos, {percentages['Negativo']:.1f}% negativos, "
+            f"{percentages['Neutral']:.1f}% neutrales ({total_comments} comentarios clasificados con el modelo local)\n\n"
+            "2. TEMAS PRINCIPALES:\n"
+            f"{chr(10).join(themes_lines) or '- No se reconocieron temas configurados en los comentarios'}\n\n"
+            "3. FORTALEZAS DEL PRODUCTO:\n"
+            f"{chr(10).join(f'- {example}' for example in examples['Positivo']) or '- Sin comentarios positivos'}\n\n"
+            "4. ÁREAS DE MEJORA:\n"
+            f"{chr(10).join(f'- {example}' for example in examples['Negativo']) or '- Sin comentarios negativos'}\n\n"
+            "5. OPORTUNIDADES DE MARKETING:\n"
+            + ("\n".join(
+                f"- Destacar {theme}: {100 * counts['Positivo'] / sum(counts.values()):.0f}% de sus menciones son positivas"
+                for theme, counts in best
+            ) or "- Sin temas con menciones suficientes")
+            + "\n\n"
+            "6. SEGMENTACIÓN:\n"
+            "- No disponible con el modelo local (requiere un modelo generativo)\n\n"
+            "7. RECOMENDACIONES ACCIONABLES:\n"
+            + ("\n".join(
+                f"- Revisar {theme}: {counts['Negativo']} menciones negativas "
+                f"({100 * counts['Negativo'] / sum(counts.values()):.0f}% de sus menciones)"
+                for theme, counts in worst if counts["Negativo"]
+            ) or "- Sin temas con menciones negativas suficientes")
+        )
+        return {"analysis": analysis, **self._empty_usage()}
+
+# Instancia global del servicio
+local_model_service = LocalModelService()
@@ -3,21 +3,100 @@ Servicios para interactuar con la API de OpenAI.
 Proporciona funciones para analizar comentarios utilizando modelos de razonamiento.
 """
 import os
+import re
+import time
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed
+from typing import List, Dict, Any, Optional, Tuple
 from openai import OpenAI
 import streamlit as st
-from config.settings import DEFAULT_MODEL, DEFAULT_REASONING_EFFORT, DEFAULT_MAX_TOKENS_CHUNK, DEFAULT_MAX_TOKENS_FINAL
+from config.settings import (
+    DEFAULT_MODEL, DEFAULT_REASONING_EFFORT, DEFAULT_MAX_TOKENS_CHUNK, DEFAULT_MAX_TOKENS_FINAL,
+    DEFAULT_MAX_TOKENS_INTERMEDIATE, DEFAULT_MAX_CONCURRENT_REQUESTS, MAX_CONCURRENT_JOBS, MAX_PARALLEL_GROUPS,
+    CLASSIFY_BATCH_SIZE
+)
+from services.analysis_backend import AnalysisBackend, SENTIMENT_LABELS
+from services.hedging import hedge_controller
+from services.rate_limiter import rate_limiter
+from services.scheduler import request_scheduler
+from utils.metrics_extraction import (
+    parse_chunk_statistics, strip_chunk_statistics, format_statistics_table, format_coverage_note
+)
+from utils.profiling import run_in_profile
+from utils.text_normalization import build_compact_comments_block, build_chunk_prompt
 
 # Configurar logger
 logger = logging.getLogger(__name__)
 
-class OpenAIService:
+# Instrucciones fijas de cada tipo de petición. Van antes que cualquier dato variable para que
+# el prompt del sistema más estas instrucciones formen un prefijo idéntico entre peticiones
+# y el proveedor pueda reutilizarlo de su caché.
+CHUNK_INSTRUCTIONS = (
+    "Analiza el conjunto de comentarios de clientes que aparece a continuación (uno por línea, con su "
+    "número entre corchetes) y proporciona insights preliminares sobre:\n"
+    "1. Distribución aproximada de sentimientos\n"
+    "2. Temas principales mencionados\n"
+    "3. Patrones de quejas o elogios identificados\n"
+    "Sé conciso (máximo 200 palabras): las cifras van en el bloque de estadísticas.\n"
+    "Termina tu respuesta con una única línea con este formato exacto (JSON en una sola línea), donde cada "
+    "número es la cantidad de comentarios del conjunto y positivos + neutrales + negativos = número de "
+    "comentarios indicado:\n"
+    'ESTADISTICAS: {"positivos": 0, "neutrales": 0, "negativos": 0, "temas": {"nombre corto del tema": 0}}'
+)
+
+INTERMEDIATE_INSTRUCTIONS = (
+    "Combina los análisis preliminares que aparecen a continuación en un único resumen intermedio y conciso con:\n"
+    "1. Distribución de sentimientos (% positivos, negativos, neutrales), ponderada por el número de "
+    "comentarios de cada análisis\n"
+    "2. Temas principales mencionados y su frecuencia relativa\n"
+    "3. Patrones de quejas o elogios identificados\n"
+    "Conserva las cifras y los matices relevantes; elimina las repeticiones."
+)
+
+CLASSIFY_INSTRUCTIONS = (
+    "Clasifica el sentimiento de cada comentario de cliente que aparece a continuación (uno por línea, con "
+    "su número entre corchetes). Responde únicamente con una línea por comentario con el formato exacto "
+    "\"[número] etiqueta\", donde la etiqueta es Positivo, Neutral o Negativo."
+)
+
+FINAL_INSTRUCTIONS = """Basándote en los análisis preliminares de cada grupo que aparecen a continuación, proporciona un informe ejecutivo completo con:
+
+1. SENTIMIENTO GENERAL: Distribución estimada de sentimientos (% positivos, negativos, neutrales) 
+   y tendencias principales
+
+2. TEMAS PRINCIPALES: Los 5-7 temas más mencionados, su frecuencia relativa y su relación con el sentimiento
+
+3. FORTALEZAS DEL PRODUCTO: Principales aspectos positivos mencionados por los clientes
+
+4. ÁREAS DE MEJORA: Principales quejas o sugerencias de mejora, ordenadas por frecuencia e impacto
+
+5. OPORTUNIDADES DE MARKETING: 3-5 ideas concretas para campañas de marketing basadas en los comentarios
+
+6. SEGMENTACIÓN: Identificación de diferentes segmentos de clientes según sus preferencias o preocupaciones
+
+7. RECOMENDACIONES ACCIONABLES: 5 recomendaciones concretas y priorizadas para mejorar la satisfacción del cliente
+
+Si se incluyen estadísticas agregadas, son recuentos exactos: úsalas tal cual para la distribución de
+sentimientos y la frecuencia de los temas, sin volver a estimarlas. Si se incluye la frecuencia de temas
+medida localmente, usa esos tamaños como referencia para la frecuencia relativa de los temas. Si se indica
+una cobertura incompleta, menciónala al principio del informe y no extrapoles a los comentarios que faltan."""
+
+class OpenAIService(AnalysisBackend):
     """Clase para gestionar las interacciones con la API de OpenAI."""
     
+    name = "openai"
+    
     def __init__(self):
         """Inicializa el servicio de OpenAI."""
         self._client = None
+        # Hilos para las peticiones con duplicado: uno por cada petición que puede estar
+        # esperando o en vuelo en el proceso, más sus posibles duplicados
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=2 * MAX_CONCURRENT_JOBS * MAX_PARALLEL_GROUPS * DEFAULT_MAX_CONCURRENT_REQUESTS,
+            thread_name_prefix="hedge"
+        )
         self._initialize_client()
     
     def _initialize_client(self) -> None:
@@ -34,6 +113,14 @@ class OpenAIService:
             logger.error(f"Error al inicializar el cliente de OpenAI: {str(e)}")
             raise
     
+    def is_available(self) -> bool:
+        """Indica si hay una API Key configurada."""
+        return bool(os.getenv("OPENAI_API_KEY"))
+    
+    def instructions_signature(self) -> str:
+        """Instrucciones de los prompts de chunk, resumen intermedio e informe final."""
+        return "\n".join((CHUNK_INSTRUCTIONS, INTERMEDIATE_INSTRUCTIONS, FINAL_INSTRUCTIONS))
+    
     @property
     def client(self) -> OpenAI:
         """Devuelve el cliente de OpenAI."""
@@ -41,76 +128,291 @@ class OpenAIService:
             self._initialize_client()
         return self._client
     
+    def _create_response(
+        self,
+        system_prompt: str,
+        instructions: str,
+        user_prompt: str,
+        model: str,
+        reasoning_effort: str,
+        max_tokens: int,
+        cancelled: Optional[threading.Event] = None,
+        sent: Optional[threading.Event] = None
+    ) -> Any:
+        """
+        Envía una petición al modelo respetando el reparto equitativo entre usuarios
+        y el presupuesto global de peticiones.
+        
+        El prompt del sistema y las instrucciones fijas van primero, en mensajes propios, y los
+        datos variables al final, de modo que el prefijo de la petición sea estable.
+        
+        Args:
+            system_prompt: Prompt del sistema para el modelo
+            instructions: Instrucciones fijas del tipo de petición
+            user_prompt: Datos variables de la petición
+            model: Modelo de OpenAI a utilizar
+            reasoning_effort: Nivel de esfuerzo de razonamiento
+            max_tokens: Número máximo de tokens para la respuesta
+            cancelled: Evento que, si se activa antes de obtener hueco, anula la petición
+            sent: Evento que se activa al enviar la petición; además registra su latencia
+            
+        Returns:
+            Respuesta de la API de OpenAI, o None si la petición se anuló antes de enviarse
+        """
+        with request_scheduler.request_slot():
+            if cancelled is not None and cancelled.is_set():
+                return None
+            with rate_limiter:
+                if sent is not None:
+                    sent.set()
+                start = time.monotonic()
+                response = self._send(system_prompt, instructions, user_prompt, model, reasoning_effort, max_tokens)
+        
+        if sent is not None:
+            hedge_controller.record_latency(time.monotonic() - start)
+        return response
+    
+    def _create_hedged_response(
+        self,
+        system_prompt: str,
+        instructions: str,
+        user_prompt: str,
+        model: str,
+        reasoning_effort: str,
+        max_tokens: int
+    ) -> Tuple[Any, Dict[str, bool]]:
+        """
+        Envía una petición y, si tarda más que el percentil de latencia observado, lanza un duplicado
+        y se queda con la primera respuesta.
+        
+        Una petición ya enviada no se puede interrumpir desde otro hilo: si el duplicado aún espera
+        hueco cuando la original termina, se anula sin enviarse; si ya se envió, su respuesta se descarta.
+        
+        Args:
+            system_prompt: Prompt del sistema para el modelo
+            instructions: Instrucciones fijas del tipo de petición
+            user_prompt: Datos variables de la petición
+            model: Modelo de OpenAI a utilizar
+            reasoning_effort: Nivel de esfuerzo de razonamiento
+            max_tokens: Número máximo de tokens para la respuesta
+            
+        Returns:
+            Tupla con (respuesta, {"hedged": se lanzó duplicado, "hedge_won": el duplicado respondió antes})
+        """
+        args = (system_prompt, instructions, user_prompt, model, reasoning_effort, max_tokens)
+        cancelled = threading.Event()
+        sent = threading.Event()
+        
+        hedge_controller.register_request()
+        threshold = hedge_controller.threshold()
+        primary = self._hedge_executor.submit(contextvars.copy_context().run, run_in_profile, self._create_response, *args, None, sent)
+        
+        # El umbral cuenta desde el envío, no desde la espera en la cola del planificador
+        while not sent.wait(0.1) and not primary.done():
+            pass
+        
+        done, _ = wait([primary], timeout=threshold)
+        if done or not hedge_controller.try_acquire_hedge():
+            return primary.result(), {"hedged": False, "hedge_won": False}
+        
+        logger.info(f"Petición sin respuesta tras {threshold:.1f}s; se lanza un duplicado")
+        hedge = self._hedge_executor.submit(contextvars.copy_context().run, run_in_profile, self._create_response, *args, cancelled)
+        
+        first_error = None
+        for future in as_completed([primary, hedge]):
+            if future.exception() is not None:
+                first_error = first_error or future.exception()
+                continue
+            cancelled.set()
+            hedge_won = future is hedge
+            if hedge_won:
+                hedge_controller.record_win()
+            return future.result(), {"hedged": True, "hedge_won": hedge_won}
+        
+        raise first_error
+    
+    def _send(
+        self,
+        system_prompt: str,
+        instructions: str,
+        user_prompt: str,
+        model: str,
+        reasoning_effort: str,
+        max_tokens: int
+    ) -> Any:
+        """Realiza la llamada a la API de OpenAI."""
+        return self.client.responses.create(
+            model=model,
+            reasoning={"effort": reasoning_effort},
+            input=[
+                {
+                    "role": "system", 
+                    "content": system_prompt
+                },
+                {
+                    "role": "user", 
+                    "content": instructions
+                },
+                {
+                    "role": "user", 
+                    "content": user_prompt
+                }
+            ],
+            max_output_tokens=max_tokens
+        )
+    
+    @staticmethod
+    def _usage_counts(response: Any) -> Dict[str, int]:
+        """
+        Extrae los recuentos de tokens de una respuesta.
+        
+        Args:
+            response: Respuesta de la API de OpenAI
+            
+        Returns:
+            Dict con los tokens de razonamiento, totales, de entrada y de entrada servidos desde caché
+        """
+        usage = response.usage
+        input_details = getattr(usage, "input_tokens_details", None)
+        return {
+            "tokens_razonamiento": getattr(usage.output_tokens_details, "reasoning_tokens", 0) or 0,
+            "total_tokens": usage.total_tokens,
+            "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+            "cached_tokens": getattr(input_details, "cached_tokens", 0) or 0
+        }
+    
     def analyze_comments_chunk(
         self, 
         comments: List[str], 
         system_prompt: str, 
         model: str = DEFAULT_MODEL,
         reasoning_effort: str = DEFAULT_REASONING_EFFORT,
-        max_tokens: int = DEFAULT_MAX_TOKENS_CHUNK
+        max_tokens: int = DEFAULT_MAX_TOKENS_CHUNK,
+        hedge: bool = False
     ) -> Dict[str, Any]:
         """
         Analiza un chunk de comentarios usando el modelo de OpenAI.
         
         Args:
-            comments: Lista de comentarios para analizar
+            comments: Comentarios para analizar (lista o CommentChunk)
             system_prompt: Prompt del sistema para el modelo
             model: Modelo de OpenAI a utilizar
             reasoning_effort: Nivel de esfuerzo de razonamiento ('low', 'medium', 'high')
             max_tokens: Número máximo de tokens para la respuesta
+            hedge: Si es True, duplica la petición cuando tarda más de lo habitual
             
         Returns:
             Dict con los resultados del análisis
         """
         logger.info(f"Analizando chunk de {len(comments)} comentarios")
         
-        comments_text = "\n\n".join([f"Comentario {i+1}: {comment}" for i, comment in enumerate(comments)])
-        
-        chunk_prompt = f"""
-        Analiza este conjunto de {len(comments)} comentarios de clientes y proporciona insights preliminares sobre:
+        chunk_prompt, raw_tokens, compact_tokens = build_chunk_prompt(comments)
         
-        1. Distribución aproximada de sentimientos
-        2. Temas principales mencionados
-        3. Patrones de quejas o elogios identificados
+        try:
+            hedge_info = {"hedged": False, "hedge_won": False}
+            if hedge:
+                response, hedge_info = self._create_hedged_response(
+                    system_prompt,
+                    CHUNK_INSTRUCTIONS,
+                    chunk_prompt,
+                    model=model,
+                    reasoning_effort=reasoning_effort,
+                    max_tokens=max_tokens
+                )
+            else:
+                response = self._create_response(
+                    system_prompt,
+                    CHUNK_INSTRUCTIONS,
+                    chunk_prompt,
+                    model=model,
+                    reasoning_effort=reasoning_effort,
+                    max_tokens=max_tokens
+                )
+            
+            result = {
+                "analysis": strip_chunk_statistics(response.output_text),
+                "statistics": parse_chunk_statistics(response.output_text, len(comments)),
+                **self._usage_counts(response),
+                "input_tokens_saved": max(raw_tokens - compact_tokens, 0),
+                **hedge_info
+            }
+            
+            if result["statistics"] is None:
+                logger.warning("El análisis del chunk no incluye un bloque de estadísticas válido")
+            logger.info(f"Análisis completado: {result['total_tokens']} tokens utilizados")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error al analizar chunk: {str(e)}")
+            return {
+                "analysis": f"Error: {str(e)}",
+                "tokens_razonamiento": 0,
+                "total_tokens": 0,
+                "error": True,
+                "error_type": type(e).__name__
+            }
+    
+    def generate_intermediate_summary(
+        self,
+        analyses: List[Dict[str, Any]],
+        comments_count: int,
+        system_prompt: str,
+        model: str = DEFAULT_MODEL,
+        reasoning_effort: str = DEFAULT_REASONING_EFFORT,
+        max_tokens: int = DEFAULT_MAX_TOKENS_INTERMEDIATE
+    ) -> Dict[str, Any]:
+        """
+        Combina varios análisis preliminares en un único resumen intermedio.
         
-        Comentarios:
-        {comments_text}
+        Args:
+            analyses: Lista de análisis preliminares (de chunks o resúmenes anteriores)
+            comments_count: Número de comentarios que cubren en conjunto
+            system_prompt: Prompt del sistema para el modelo
+            model: Modelo de OpenAI a utilizar
+            reasoning_effort: Nivel de esfuerzo de razonamiento
+            max_tokens: Número máximo de tokens para la respuesta
+            
+        Returns:
+            Dict con el resumen intermedio
         """
+        logger.info(f"Generando resumen intermedio de {len(analyses)} análisis ({comments_count} comentarios)")
+        
+        insights = "\n\n".join(
+            f"--- ANÁLISIS {i+1} ({analysis.get('comments_count', 0)} comentarios) ---\n{analysis['analysis']}"
+            for i, analysis in enumerate(analyses)
+        )
+        
+        summary_prompt = (
+            f"Los {len(analyses)} análisis preliminares cubren {comments_count} comentarios de clientes.\n\n"
+            f"Análisis preliminares:\n{insights}"
+        )
         
         try:
-            response = self.client.responses.create(
+            response = self._create_response(
+                system_prompt,
+                INTERMEDIATE_INSTRUCTIONS,
+                summary_prompt,
                 model=model,
-                reasoning={"effort": reasoning_effort},
-                input=[
-                    {
-                        "role": "system", 
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user", 
-                        "content": chunk_prompt
-                    }
-                ],
-                max_output_tokens=max_tokens
+                reasoning_effort=reasoning_effort,
+                max_tokens=max_tokens
             )
             
             result = {
                 "analysis": response.output_text,
-                "tokens_razonamiento": response.usage.output_tokens_details.reasoning_tokens 
-                                     if hasattr(response.usage.output_tokens_details, 'reasoning_tokens') else 0,
-                "total_tokens": response.usage.total_tokens
+                **self._usage_counts(response)
             }
             
-            logger.info(f"Análisis completado: {result['total_tokens']} tokens utilizados")
+            logger.info(f"Resumen intermedio completado: {result['total_tokens']} tokens utilizados")
             return result
             
         except Exception as e:
-            logger.error(f"Error al analizar chunk: {str(e)}")
+            logger.error(f"Error en resumen intermedio: {str(e)}")
             return {
                 "analysis": f"Error: {str(e)}",
                 "tokens_razonamiento": 0,
                 "total_tokens": 0,
-                "error": True
+                "error": True,
+                "error_type": type(e).__name__
             }
     
     def generate_final_analysis(
@@ -121,7 +423,10 @@ class OpenAIService:
         system_prompt: str,
         model: str = DEFAULT_MODEL,
         reasoning_effort: str = DEFAULT_REASONING_EFFORT,
-        max_tokens: int = DEFAULT_MAX_TOKENS_FINAL
+        max_tokens: int = DEFAULT_MAX_TOKENS_FINAL,
+        theme_frequencies: Optional[List[Dict[str, Any]]] = None,
+        statistics: Optional[Dict[str, Any]] = None,
+        coverage: Optional[Dict[str, int]] = None
     ) -> Dict[str, Any]:
         """
         Genera el análisis final basado en los análisis de chunks.
@@ -134,6 +439,9 @@ class OpenAIService:
             model: Modelo de OpenAI a utilizar
             reasoning_effort: Nivel de esfuerzo de razonamiento
             max_tokens: Número máximo de tokens para la respuesta
+            theme_frequencies: Clusters temáticos calculados localmente (tamaño y términos representativos)
+            statistics: Recuentos de sentimiento y temas sumados localmente a partir de los chunks
+            coverage: Comentarios y chunks realmente analizados frente a los totales
             
         Returns:
             Dict con los resultados del análisis final
@@ -145,58 +453,55 @@ class OpenAIService:
         if errors:
             logger.warning(f"Se encontraron {len(errors)} errores en los análisis por chunks")
         
+        # Numerar los grupos válidos conservando la posición de cada chunk entre todos los procesados
+        valid_chunks = [(position, chunk) for position, chunk in enumerate(chunk_analyses) if not chunk.get("error", False)]
         chunk_insights = "\n\n".join([
-            f"--- INSIGHTS DEL GRUPO {i+1} ({chunk_analyses.index(chunk)+1} de {chunks_count}) ---\n{chunk['analysis']}"
-            for i, chunk in enumerate(chunk_analyses) if not chunk.get("error", False)
+            f"--- {chunk['label']} ---\n{chunk['analysis']}" if chunk.get("label") else
+            f"--- INSIGHTS DEL GRUPO {i+1} ({position+1} de {chunks_count}) ---\n{chunk['analysis']}"
+            for i, (position, chunk) in enumerate(valid_chunks)
         ])
         
-        final_prompt = f"""
-        Has analizado un total de {total_comments} comentarios de clientes en {chunks_count} grupos.
-        
-        Basándote en los análisis preliminares de cada grupo, proporciona un informe ejecutivo completo con:
-        
-        1. SENTIMIENTO GENERAL: Distribución estimada de sentimientos (% positivos, negativos, neutrales) 
-           y tendencias principales
-        
-        2. TEMAS PRINCIPALES: Los 5-7 temas más mencionados, su frecuencia relativa y su relación con el sentimiento
-        
-        3. FORTALEZAS DEL PRODUCTO: Principales aspectos positivos mencionados por los clientes
-        
-        4. ÁREAS DE MEJORA: Principales quejas o sugerencias de mejora, ordenadas por frecuencia e impacto
-        
-        5. OPORTUNIDADES DE MARKETING: 3-5 ideas concretas para campañas de marketing basadas en los comentarios
+        themes_block = ""
+        if theme_frequencies:
+            themes_lines = "\n".join(
+                f"- {', '.join(cluster['terms'])}: {cluster['size']} comentarios ({cluster['percentage']:.1f}%)"
+                for cluster in sorted(theme_frequencies, key=lambda c: c['size'], reverse=True)
+            )
+            themes_block = (
+                "Frecuencia de temas medida localmente (grupos de comentarios similares y sus términos "
+                f"más representativos):\n{themes_lines}\n\n"
+            )
         
-        6. SEGMENTACIÓN: Identificación de diferentes segmentos de clientes según sus preferencias o preocupaciones
+        statistics_block = ""
+        if statistics:
+            statistics_block = (
+                "Estadísticas agregadas de todos los grupos (recuentos exactos):\n"
+                f"{format_statistics_table(statistics, total_comments)}\n\n"
+            )
         
-        7. RECOMENDACIONES ACCIONABLES: 5 recomendaciones concretas y priorizadas para mejorar la satisfacción del cliente
+        coverage_block = ""
+        if coverage and coverage["comments_analyzed"] < coverage["comments_total"]:
+            coverage_block = f"{format_coverage_note(coverage)}\n\n"
         
-        Aquí están los insights preliminares de cada grupo:
-        
-        {chunk_insights}
-        """
+        final_prompt = (
+            f"Has analizado un total de {total_comments} comentarios de clientes en {chunks_count} grupos.\n\n"
+            f"{coverage_block}{statistics_block}{themes_block}"
+            f"Aquí están las notas cualitativas de cada grupo:\n\n{chunk_insights}"
+        )
         
         try:
-            response = self.client.responses.create(
+            response = self._create_response(
+                system_prompt,
+                FINAL_INSTRUCTIONS,
+                final_prompt,
                 model=model,
-                reasoning={"effort": reasoning_effort},
-                input=[
-                    {
-                        "role": "system", 
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user", 
-                        "content": final_prompt
-                    }
-                ],
-                max_output_tokens=max_tokens
+                reasoning_effort=reasoning_effort,
+                max_tokens=max_tokens
             )
             
             result = {
                 "analysis": response.output_text,
-                "tokens_razonamiento": response.usage.output_tokens_details.reasoning_tokens 
-                                     if hasattr(response.usage.output_tokens_details, 'reasoning_tokens') else 0,
-                "total_tokens": response.usage.total_tokens
+                **self._usage_counts(response)
             }
             
             logger.info(f"Análisis final completado: {result['total_tokens']} tokens utilizados")
@@ -208,8 +513,57 @@ class OpenAIService:
                 "analysis": f"Error: {str(e)}",
                 "tokens_razonamiento": 0,
                 "total_tokens": 0,
-                "error": True
+                "error": True,
+                "error_type": type(e).__name__
+            }
+
+    def classify_comments(
+        self,
+        comments: List[str],
+        model: str = DEFAULT_MODEL,
+        reasoning_effort: str = "low",
+        max_tokens: int = DEFAULT_MAX_TOKENS_CHUNK
+    ) -> List[str]:
+        """
+        Clasifica el sentimiento de cada comentario con el modelo, en lotes de CLASSIFY_BATCH_SIZE
+        enviados en paralelo.
+        
+        Args:
+            comments: Lista de comentarios
+            model: Modelo de OpenAI a utilizar
+            reasoning_effort: Nivel de esfuerzo de razonamiento
+            max_tokens: Número máximo de tokens para cada respuesta
+            
+        Returns:
+            Una etiqueta por comentario; los comentarios sin etiqueta en la respuesta se cuentan como neutrales
+        """
+        batches = [comments[i:i + CLASSIFY_BATCH_SIZE] for i in range(0, len(comments), CLASSIFY_BATCH_SIZE)]
+        
+        def classify_batch(batch: List[str]) -> List[str]:
+            comments_text, _, _ = build_compact_comments_block(batch)
+            response = self._create_response(
+                "Eres un clasificador de sentimiento de comentarios de clientes.",
+                CLASSIFY_INSTRUCTIONS,
+                comments_text,
+                model=model,
+                reasoning_effort=reasoning_effort,
+                max_tokens=max_tokens
+            )
+            labels = {
+                int(number): label.capitalize()
+                for number, label in re.findall(r'\[(\d+)\]\s*(positivo|neutral|negativo)', response.output_text, re.IGNORECASE)
             }
+            missing = sum(1 for i in range(1, len(batch) + 1) if i not in labels)
+            if missing:
+                logger.warning(f"{missing} comentarios sin etiqueta en la respuesta de clasificación")
+            return [labels.get(i, SENTIMENT_LABELS[1]) for i in range(1, len(batch) + 1)]
+        
+        with ThreadPoolExecutor(max_workers=DEFAULT_MAX_CONCURRENT_REQUESTS) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, run_in_profile, classify_batch, batch)
+                for batch in batches
+            ]
+            return [label for future in futures for label in future.result()]
 
 # Instancia global del servicio
 openai_service = OpenAIService()
\ No newline at end of file
@@ -0,0 +1,74 @@
+"""
+Limitador de peticiones compartido por todo el proceso.
+Reparte un único presupuesto de peticiones a la API entre todos los análisis en curso.
+"""
+import time
+import threading
+import logging
+
+from config.settings import DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_MAX_CONCURRENT_REQUESTS
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """Token bucket con límite de peticiones por minuto y de peticiones simultáneas."""
+
+    def __init__(
+        self,
+        requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT_REQUESTS
+    ):
+        """
+        Inicializa el limitador.
+
+        Args:
+            requests_per_minute: Número máximo de peticiones por minuto
+            max_concurrent: Número máximo de peticiones en vuelo a la vez
+        """
+        self._rate = requests_per_minute / 60.0
+        self._capacity = float(max_concurrent)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self.total_wait_seconds = 0.0
+
+    def _refill(self) -> None:
+        """Repone tokens según el tiempo transcurrido. Debe llamarse con el lock adquirido."""
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        """Bloquea hasta que haya presupuesto para una nueva petición."""
+        start = time.monotonic()
+        self._semaphore.acquire()
+
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+        waited = time.monotonic() - start
+        if waited > 0:
+            with self._lock:
+                self.total_wait_seconds += waited
+
+    def release(self) -> None:
+        """Libera el hueco de concurrencia de una petición terminada."""
+        self._semaphore.release()
+
+    def __enter__(self) -> "RateLimiter":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+# Instancia global del limitador
+rate_limiter = RateLimiter()
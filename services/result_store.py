@@ -0,0 +1,228 @@
+"""
+Almacén en memoria, compartido por todas las sesiones, de los datos pesados de la aplicación
+(resultados de análisis, DataFrames preparados, índices de temas).
+Las sesiones guardan solo la clave de cada dato; el almacén respeta un límite global de memoria
+expulsando las entradas usadas hace más tiempo.
+"""
+import os
+import sys
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.settings import RESULT_STORE_MAX_BYTES
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+def estimate_size(payload: Any, _seen: Optional[set] = None) -> int:
+    """
+    Estima los bytes que ocupa un objeto y todo lo que referencia.
+
+    Los DataFrames y arrays se miden con sus propios métodos; los objetos con un método
+    memory_usage() (como el índice de comentarios) informan de su tamaño.
+
+    Args:
+        payload: Objeto a medir
+
+    Returns:
+        Tamaño aproximado en bytes
+    """
+    seen = _seen if _seen is not None else set()
+    if id(payload) in seen:
+        return 0
+    seen.add(id(payload))
+
+    if isinstance(payload, (pd.DataFrame, pd.Series)):
+        usage = payload.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(payload, pd.DataFrame) else usage)
+    if isinstance(payload, np.ndarray):
+        if payload.dtype == object:
+            return payload.nbytes + sum(estimate_size(item, seen) for item in payload.ravel())
+        return payload.nbytes
+    if isinstance(payload, dict):
+        return sys.getsizeof(payload) + sum(
+            estimate_size(key, seen) + estimate_size(value, seen) for key, value in payload.items()
+        )
+    if isinstance(payload, (list, tuple, set, frozenset)):
+        return sys.getsizeof(payload) + sum(estimate_size(item, seen) for item in payload)
+    if callable(getattr(payload, "memory_usage", None)) and not isinstance(payload, type):
+        return int(payload.memory_usage())
+    return sys.getsizeof(payload)
+
+def current_session_id() -> Optional[str]:
+    """Identificador de la sesión de Streamlit del hilo actual (None fuera de una sesión)."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except Exception:
+        return None
+    return ctx.session_id if ctx is not None else None
+
+class _Entry:
+    """Entrada del almacén: el dato, su tamaño y las sesiones que lo utilizan."""
+
+    __slots__ = ("payload", "size", "owners")
+
+    def __init__(self, payload: Any, size: int):
+        self.payload = payload
+        self.size = size
+        self.owners = set()
+
+class ResultStore:
+    """
+    Almacén LRU con límite global de memoria.
+
+    Un dato que supera por sí solo el límite no se guarda. El uso por sesión atribuye a cada sesión
+    el tamaño completo de los datos que utiliza, aunque los comparta con otras sesiones.
+    """
+
+    def __init__(self, max_bytes: int = RESULT_STORE_MAX_BYTES):
+        """
+        Inicializa el almacén.
+
+        Args:
+            max_bytes: Memoria máxima ocupada por los datos guardados
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def put(self, key: str, payload: Any, owner: Optional[str] = None, size: Optional[int] = None) -> bool:
+        """
+        Guarda (o sustituye) un dato y expulsa los menos recientes hasta respetar el límite.
+
+        Args:
+            key: Clave del dato
+            payload: Dato a guardar
+            owner: Sesión que utiliza el dato
+            size: Tamaño en bytes, si ya se conoce; si no, se estima
+
+        Returns:
+            True si el dato queda guardado
+        """
+        size = estimate_size(payload) if size is None else size
+        if size > self.max_bytes:
+            logger.warning(f"Dato '{key}' de {size / 2**20:.0f} MB no guardado: supera el límite del almacén")
+            self.discard(key)
+            return False
+
+        entry = _Entry(payload, size)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+                entry.owners = previous.owners
+            if owner:
+                entry.owners.add(owner)
+            self._entries[key] = entry
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._evictions += 1
+                logger.info(f"Dato '{evicted_key}' ({evicted.size / 2**20:.1f} MB) expulsado del almacén")
+        return True
+
+    def get(self, key: Optional[str], owner: Optional[str] = None) -> Optional[Any]:
+        """
+        Obtiene un dato y lo marca como usado recientemente.
+
+        Args:
+            key: Clave del dato
+            owner: Sesión que utiliza el dato
+
+        Returns:
+            El dato o None si no existe o se expulsó
+        """
+        if not key:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            if owner:
+                entry.owners.add(owner)
+            return entry.payload
+
+    def get_or_load(self, key: str, loader: Callable[[], Any], owner: Optional[str] = None) -> Any:
+        """
+        Obtiene un dato o, si no está en memoria, lo carga con `loader` y lo guarda.
+
+        Args:
+            key: Clave del dato
+            loader: Función sin argumentos que devuelve el dato (None si no se puede cargar)
+            owner: Sesión que utiliza el dato
+
+        Returns:
+            El dato o None si no se pudo cargar
+        """
+        payload = self.get(key, owner)
+        if payload is None:
+            payload = loader()
+            if payload is not None:
+                self.put(key, payload, owner)
+        return payload
+
+    def discard(self, key: Optional[str]) -> None:
+        """Elimina un dato del almacén."""
+        with self._lock:
+            entry = self._entries.pop(key, None) if key else None
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def release(self, key: Optional[str], owner: Optional[str]) -> None:
+        """Indica que una sesión ya no utiliza un dato; si nadie más lo usa, se elimina."""
+        with self._lock:
+            entry = self._entries.get(key) if key else None
+            if entry is None or owner not in entry.owners:
+                return
+            entry.owners.discard(owner)
+            if not entry.owners:
+                del self._entries[key]
+                self._bytes -= entry.size
+
+    def usage_by_owner(self) -> Dict[str, int]:
+        """Bytes de los datos que utiliza cada sesión."""
+        usage: Dict[str, int] = {}
+        with self._lock:
+            for entry in self._entries.values():
+                for owner in entry.owners:
+                    usage[owner] = usage.get(owner, 0) + entry.size
+        return usage
+
+    def stats(self) -> Dict[str, int]:
+        """Número de datos, bytes ocupados, límite y expulsiones desde el arranque."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions
+            }
+
+def process_rss() -> Optional[int]:
+    """Memoria residente (RSS) actual del proceso en bytes, o None si el sistema no la expone."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Sin /proc solo se dispone del pico (KB en Linux, bytes en macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+# Instancia global del almacén
+result_store = ResultStore()
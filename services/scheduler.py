@@ -0,0 +1,136 @@
+"""
+Planificador de peticiones con reparto equitativo entre usuarios.
+Todas las sesiones comparten la instancia global de OpenAIService; este planificador decide
+qué trabajo envía la siguiente petición para que ningún usuario acapare el presupuesto.
+"""
+import time
+import itertools
+import threading
+import contextvars
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.settings import DEFAULT_MAX_CONCURRENT_REQUESTS, DEFAULT_REQUESTS_PER_MINUTE
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Trabajo al que pertenecen las peticiones del contexto actual
+_current_job: contextvars.ContextVar = contextvars.ContextVar("current_job", default=None)
+
+# Ventana (segundos) para medir el ritmo de peticiones de cada trabajo
+RATE_WINDOW_SECONDS = 120
+
+class RequestScheduler:
+    """
+    Reparte los huecos de petición con un esquema de cola justa ponderada (virtual time).
+
+    Cada usuario acumula un tiempo virtual que avanza 1/peso con cada petición concedida;
+    el siguiente hueco libre se concede a la petición en espera del usuario con menor
+    tiempo virtual. Así, cada usuario activo recibe una parte del presupuesto proporcional
+    a la prioridad de sus trabajos, independientemente de cuántas peticiones tenga en cola.
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT_REQUESTS):
+        """
+        Inicializa el planificador.
+
+        Args:
+            max_concurrent: Número máximo de peticiones en vuelo en todo el proceso
+        """
+        self._cond = threading.Condition()
+        self._available = max_concurrent
+        self._waiting: List[Dict[str, Any]] = []
+        self._user_vtime: Dict[str, float] = {}
+        self._virtual_clock = 0.0
+        self._seq = itertools.count()
+        self._grants: Dict[str, deque] = {}
+
+    @contextmanager
+    def job_context(self, job_id: str, user: str, weight: int) -> Iterator[None]:
+        """
+        Asocia las peticiones realizadas dentro del bloque a un trabajo y usuario.
+
+        Args:
+            job_id: Identificador del trabajo
+            user: Usuario propietario del trabajo
+            weight: Peso de la prioridad del trabajo
+        """
+        token = _current_job.set({"job_id": job_id, "user": user, "weight": max(weight, 1)})
+        try:
+            yield
+        finally:
+            _current_job.reset(token)
+            with self._cond:
+                self._grants.pop(job_id, None)
+
+    def _next_waiter(self) -> Dict[str, Any]:
+        """Devuelve la petición en espera que debe atenderse a continuación."""
+        return min(self._waiting, key=lambda w: (self._user_vtime[w["user"]], w["seq"]))
+
+    @contextmanager
+    def request_slot(self) -> Iterator[None]:
+        """Bloquea hasta que el planificador concede un hueco a la petición del contexto actual."""
+        job = _current_job.get() or {"job_id": "-", "user": "anonimo", "weight": 1}
+        waiter = dict(job, seq=next(self._seq))
+
+        with self._cond:
+            # Un usuario que vuelve tras estar inactivo no acumula crédito atrasado
+            self._user_vtime[waiter["user"]] = max(
+                self._user_vtime.get(waiter["user"], 0.0), self._virtual_clock
+            )
+            self._waiting.append(waiter)
+
+            while not (self._available > 0 and self._next_waiter() is waiter):
+                self._cond.wait()
+
+            self._waiting.remove(waiter)
+            self._available -= 1
+            self._virtual_clock = self._user_vtime[waiter["user"]]
+            self._user_vtime[waiter["user"]] += 1.0 / waiter["weight"]
+            self._grants.setdefault(waiter["job_id"], deque()).append(time.monotonic())
+            # Otros esperando pueden ser ahora los siguientes
+            self._cond.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._available += 1
+                self._cond.notify_all()
+
+    def job_rate(self, job_id: str) -> Optional[float]:
+        """
+        Calcula el ritmo reciente de peticiones concedidas a un trabajo.
+
+        Args:
+            job_id: Identificador del trabajo
+
+        Returns:
+            Peticiones por segundo o None si aún no hay datos suficientes
+        """
+        now = time.monotonic()
+        with self._cond:
+            grants = self._grants.get(job_id)
+            if not grants:
+                return None
+            while grants and now - grants[0] > RATE_WINDOW_SECONDS:
+                grants.popleft()
+            if len(grants) < 2:
+                return None
+            return len(grants) / max(now - grants[0], 1.0)
+
+    def active_users(self) -> int:
+        """Número de usuarios con peticiones en espera."""
+        with self._cond:
+            return len({w["user"] for w in self._waiting}) or 1
+
+    @staticmethod
+    def global_rate() -> float:
+        """Presupuesto global de peticiones por segundo."""
+        return DEFAULT_REQUESTS_PER_MINUTE / 60.0
+
+# Instancia global del planificador
+request_scheduler = RequestScheduler()
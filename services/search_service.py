@@ -0,0 +1,352 @@
+"""
+Índice de búsqueda de texto completo sobre los informes y los comentarios analizados.
+Usa SQLite FTS5 embebido; el índice se alimenta de forma incremental al terminar cada análisis.
+"""
+import os
+import glob
+import time
+import sqlite3
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from config.settings import SEARCH_INDEX_PATH, SEARCH_RESULTS_LIMIT, SEARCH_INSERT_BATCH
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# unicode61 sin diacríticos: "azucar" encuentra "azúcar"
+_TOKENIZER = "unicode61 remove_diacritics 2"
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS runs (
+        run_id TEXT PRIMARY KEY,
+        report_path TEXT,
+        created_at TEXT,
+        total_comments INTEGER
+    )""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS report_sections USING fts5(
+        run_id UNINDEXED, section UNINDEXED, content, tokenize='{_TOKENIZER}'
+    )""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS comments USING fts5(
+        run_id UNINDEXED, position UNINDEXED, content, tokenize='{_TOKENIZER}'
+    )"""
+]
+
+# Columnas de runs añadidas después de la primera versión del índice: rango de rowids de cada
+# ejecución en las tablas FTS (para borrarla sin recorrer la tabla) y número de filas indexadas
+_RUN_COLUMNS = [
+    "sections_first", "sections_last", "comments_first", "comments_last", "sections_count", "comments_count"
+]
+
+# Consultas por tipo de documento: primero se ordena y limita en la tabla FTS y después se une con runs
+_QUERIES = {
+    "reports": """
+        SELECT hits.run_id, hits.section, hits.snippet, hits.score, runs.created_at, runs.report_path
+        FROM (
+            SELECT run_id, section, snippet(report_sections, 2, '**', '**', '…', 16) AS snippet, rank AS score
+            FROM report_sections WHERE report_sections MATCH ? ORDER BY rank LIMIT ?
+        ) AS hits JOIN runs ON runs.run_id = hits.run_id
+        ORDER BY hits.score
+    """,
+    "comments": """
+        SELECT hits.run_id, hits.position, hits.snippet, hits.score, runs.created_at, runs.report_path
+        FROM (
+            SELECT run_id, position, snippet(comments, 2, '**', '**', '…', 24) AS snippet, rank AS score
+            FROM comments WHERE comments MATCH ? ORDER BY rank LIMIT ?
+        ) AS hits JOIN runs ON runs.run_id = hits.run_id
+        ORDER BY hits.score
+    """
+}
+_COUNT_QUERIES = {
+    "reports": "SELECT count(*) FROM report_sections WHERE report_sections MATCH ?",
+    "comments": "SELECT count(*) FROM comments WHERE comments MATCH ?"
+}
+
+def build_match_query(text: str) -> str:
+    """
+    Convierte el texto introducido por el usuario en una consulta FTS5 segura.
+
+    Los fragmentos entre comillas se buscan como frase; el resto de palabras deben aparecer
+    todas (en cualquier orden). Un asterisco final busca por prefijo ("azúc*").
+
+    Args:
+        text: Texto de búsqueda
+
+    Returns:
+        Consulta para MATCH o cadena vacía si no hay términos
+    """
+    terms = []
+    for i, part in enumerate(text.split('"')):
+        if i % 2:
+            if part.strip():
+                terms.append(f'"{part.strip()}"')
+            continue
+        for word in part.split():
+            prefix = word.endswith("*")
+            word = word.rstrip("*")
+            if word:
+                terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+class SearchIndex:
+    """
+    Índice FTS5 de secciones de informes y comentarios, uno por ejecución.
+
+    Las escrituras se serializan en un único hilo en segundo plano para no retrasar la entrega
+    de resultados; las lecturas abren su propia conexión y pueden ejecutarse en paralelo (WAL).
+    """
+
+    def __init__(self, db_path: str = SEARCH_INDEX_PATH):
+        """
+        Inicializa el índice.
+
+        Args:
+            db_path: Ruta del archivo SQLite
+        """
+        self.db_path = db_path
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-index")
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._backfilled = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre una conexión y crea el esquema la primera vez."""
+        with self._init_lock:
+            if self._initialized:
+                return sqlite3.connect(self.db_path, timeout=30)
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            self._migrate(connection)
+            connection.commit()
+            self._initialized = True
+            return connection
+
+    @staticmethod
+    def _migrate(connection: sqlite3.Connection) -> None:
+        """Añade a runs las columnas que falten y calcula los recuentos de las ejecuciones ya indexadas."""
+        existing = {row[1] for row in connection.execute("PRAGMA table_info(runs)")}
+        missing = [column for column in _RUN_COLUMNS if column not in existing]
+        if not missing:
+            return
+        for column in missing:
+            connection.execute(f"ALTER TABLE runs ADD COLUMN {column} INTEGER")
+
+        # Una única pasada por las tablas FTS; después los totales se mantienen al indexar
+        for table, column in (("report_sections", "sections_count"), ("comments", "comments_count")):
+            counts = connection.execute(f"SELECT run_id, count(*) FROM {table} GROUP BY run_id").fetchall()
+            connection.execute(f"UPDATE runs SET {column} = 0")
+            connection.executemany(f"UPDATE runs SET {column} = ? WHERE run_id = ?", [(n, run_id) for run_id, n in counts])
+        logger.info("Índice de búsqueda actualizado al nuevo esquema")
+
+    @staticmethod
+    def _next_rowid(connection: sqlite3.Connection, table: str) -> int:
+        """Primer rowid libre de una tabla FTS (FTS5 recorre el rowid en orden inverso sin leer la tabla)."""
+        row = connection.execute(f"SELECT rowid FROM {table} ORDER BY rowid DESC LIMIT 1").fetchone()
+        return (row[0] if row else 0) + 1
+
+    @staticmethod
+    def _delete_run(connection: sqlite3.Connection, run_id: str) -> None:
+        """Elimina una ejecución del índice, si existe, usando su rango de rowids."""
+        previous = connection.execute(
+            "SELECT sections_first, sections_last, comments_first, comments_last FROM runs WHERE run_id = ?",
+            (run_id,)
+        ).fetchone()
+        if previous is None:
+            return
+
+        sections_first, sections_last, comments_first, comments_last = previous
+        for table, first, last in (
+            ("report_sections", sections_first, sections_last),
+            ("comments", comments_first, comments_last)
+        ):
+            if first is None:
+                # Ejecución indexada antes de guardar los rangos: hay que recorrer la tabla
+                connection.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+            elif last >= first:
+                connection.execute(f"DELETE FROM {table} WHERE rowid BETWEEN ? AND ?", (first, last))
+        connection.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def index_run(
+        self,
+        run_id: str,
+        report_path: str,
+        sections: Dict[str, str],
+        comments: Optional[Iterable[Any]] = None,
+        total_comments: int = 0
+    ):
+        """
+        Encola la indexación de una ejecución.
+
+        Args:
+            run_id: Identificador único de la ejecución (nombre del informe sin extensión, que
+                incluye el identificador del trabajo)
+            report_path: Ruta del informe guardado
+            sections: Secciones del informe por nombre
+            comments: Comentarios analizados, en orden
+            total_comments: Número de comentarios de la ejecución
+
+        Returns:
+            Future de la indexación
+        """
+        return self._writer.submit(self._index_run, run_id, report_path, sections, comments, total_comments)
+
+    def _index_run(
+        self,
+        run_id: str,
+        report_path: str,
+        sections: Dict[str, str],
+        comments: Optional[Iterable[Any]],
+        total_comments: int
+    ) -> None:
+        """
+        Indexa una ejecución sustituyendo cualquier versión anterior.
+
+        Las filas de cada ejecución reciben rowids consecutivos (el escritor es único), de modo
+        que basta con guardar el primero y el último para borrarla después.
+        """
+        start = time.perf_counter()
+        connection = self._connect()
+        try:
+            with connection:
+                self._delete_run(connection, run_id)
+
+                sections_first = self._next_rowid(connection, "report_sections")
+                section_rows = [
+                    (sections_first + i, run_id, name, text)
+                    for i, (name, text) in enumerate((name, text) for name, text in sections.items() if text)
+                ]
+                connection.executemany(
+                    "INSERT INTO report_sections (rowid, run_id, section, content) VALUES (?, ?, ?, ?)", section_rows
+                )
+
+                comments_first = self._next_rowid(connection, "comments")
+                indexed = 0
+                batch = []
+                for position, comment in enumerate(comments if comments is not None else []):
+                    batch.append((comments_first + position, run_id, position, str(comment)))
+                    if len(batch) >= SEARCH_INSERT_BATCH:
+                        connection.executemany("INSERT INTO comments (rowid, run_id, position, content) VALUES (?, ?, ?, ?)", batch)
+                        indexed += len(batch)
+                        batch = []
+                if batch:
+                    connection.executemany("INSERT INTO comments (rowid, run_id, position, content) VALUES (?, ?, ?, ?)", batch)
+                    indexed += len(batch)
+
+                connection.execute(
+                    """INSERT INTO runs (
+                        run_id, report_path, created_at, total_comments,
+                        sections_first, sections_last, comments_first, comments_last, sections_count, comments_count
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (
+                        run_id, report_path, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), total_comments,
+                        sections_first, sections_first + len(section_rows) - 1,
+                        comments_first, comments_first + indexed - 1,
+                        len(section_rows), indexed
+                    )
+                )
+
+            logger.info(f"Ejecución {run_id} indexada: {indexed} comentarios en {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            logger.error(f"Error al indexar la ejecución {run_id}: {str(e)}")
+        finally:
+            connection.close()
+
+    def backfill_reports(self, output_dir: str = "outputs") -> int:
+        """
+        Indexa (una vez por proceso) los informes de texto guardados que aún no están en el índice.
+
+        Args:
+            output_dir: Directorio de los informes
+
+        Returns:
+            Número de informes encolados para indexar
+        """
+        if self._backfilled:
+            return 0
+        self._backfilled = True
+
+        # Importación diferida: la extracción de secciones no es necesaria para escribir en el índice
+        from utils.metrics_extraction import extract_key_sections
+
+        connection = self._connect()
+        try:
+            known = {row[0] for row in connection.execute("SELECT run_id FROM runs")}
+        finally:
+            connection.close()
+
+        pending = 0
+        for path in sorted(glob.glob(os.path.join(output_dir, "*.txt"))):
+            run_id = os.path.splitext(os.path.basename(path))[0]
+            if run_id in known:
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                report_text = f.read()
+            sections = extract_key_sections(report_text)
+            if not any(sections.values()):
+                sections = {"informe": report_text}
+            self.index_run(run_id, path, sections)
+            pending += 1
+
+        if pending:
+            logger.info(f"Indexando {pending} informes existentes de '{output_dir}'")
+        return pending
+
+    def search(self, text: str, kind: str = "comments", limit: int = SEARCH_RESULTS_LIMIT) -> Dict[str, Any]:
+        """
+        Busca en el índice y devuelve los resultados ordenados por relevancia (BM25).
+
+        Args:
+            text: Texto de búsqueda
+            kind: "comments" o "reports"
+            limit: Número máximo de resultados
+
+        Returns:
+            Diccionario con los resultados, el número total de coincidencias y el tiempo empleado
+        """
+        query = build_match_query(text)
+        if not query:
+            return {"hits": [], "total": 0, "seconds": 0.0}
+
+        start = time.perf_counter()
+        connection = self._connect()
+        try:
+            rows = connection.execute(_QUERIES[kind], (query, limit)).fetchall()
+            total = connection.execute(_COUNT_QUERIES[kind], (query,)).fetchone()[0]
+        except sqlite3.OperationalError as e:
+            logger.error(f"Consulta de búsqueda no válida '{query}': {str(e)}")
+            return {"hits": [], "total": 0, "seconds": 0.0, "error": str(e)}
+        finally:
+            connection.close()
+
+        hits = [
+            {
+                "run_id": run_id,
+                "location": location,
+                "snippet": snippet,
+                "score": -score,
+                "created_at": created_at,
+                "report_path": report_path
+            }
+            for run_id, location, snippet, score, created_at, report_path in rows
+        ]
+        return {"hits": hits, "total": total, "seconds": time.perf_counter() - start}
+
+    def stats(self) -> Dict[str, int]:
+        """Número de ejecuciones, secciones y comentarios indexados (totales guardados en runs, sin recorrer las tablas FTS)."""
+        connection = self._connect()
+        try:
+            runs, sections, comments = connection.execute(
+                "SELECT count(*), coalesce(sum(sections_count), 0), coalesce(sum(comments_count), 0) FROM runs"
+            ).fetchone()
+            return {"runs": runs, "sections": sections, "comments": comments}
+        finally:
+            connection.close()
+
+# Instancia global del índice
+search_index = SearchIndex()
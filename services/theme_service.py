@@ -0,0 +1,80 @@
+"""
+Índices de comentarios de los análisis recientes, guardados en el almacén compartido de resultados.
+Permite pasar de un tema del informe a los comentarios que lo mencionan sin volver a leer el archivo.
+"""
+import time
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+from config.settings import THEME_DRILLDOWN_LIMIT
+from services.result_store import result_store
+from utils.theme_index import CommentIndex
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+class ThemeIndexStore:
+    """Índices de comentarios por huella del informe; el almacén compartido decide cuándo se expulsan."""
+
+    @staticmethod
+    def _key(report_hash: str) -> str:
+        """Clave del índice en el almacén compartido."""
+        return f"theme-index:{report_hash}"
+
+    def build(self, report_hash: str, comments: Iterable[Any]) -> Optional[CommentIndex]:
+        """
+        Construye y guarda el índice de los comentarios de un análisis.
+
+        Args:
+            report_hash: Huella del informe del análisis
+            comments: Comentarios analizados, en orden
+
+        Returns:
+            Índice construido o None si no se pudo construir
+        """
+        start = time.perf_counter()
+        try:
+            index = CommentIndex(comments)
+        except Exception as e:
+            # El índice es un complemento: un fallo no debe invalidar el análisis
+            logger.error(f"No se pudo construir el índice de temas {report_hash}: {str(e)}")
+            return None
+
+        result_store.put(self._key(report_hash), index, size=index.memory_usage())
+        logger.info(f"Índice de temas {report_hash} construido en {time.perf_counter() - start:.2f}s")
+        return index
+
+    def get(self, report_hash: Optional[str], owner: Optional[str] = None) -> Optional[CommentIndex]:
+        """Obtiene el índice de un análisis, si sigue en memoria."""
+        if not report_hash:
+            return None
+        return result_store.get(self._key(report_hash), owner)
+
+    def drilldown(
+        self,
+        report_hash: Optional[str],
+        name: str,
+        extra_terms: Optional[Iterable[str]] = None,
+        limit: int = THEME_DRILLDOWN_LIMIT,
+        owner: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Localiza los comentarios de un tema en el índice de un análisis.
+
+        Args:
+            report_hash: Huella del informe del análisis
+            name: Nombre del tema
+            extra_terms: Términos adicionales asociados al tema
+            limit: Número máximo de comentarios de ejemplo
+            owner: Sesión que consulta el índice
+
+        Returns:
+            Resultado de CommentIndex.drilldown o None si el índice no está disponible
+        """
+        index = self.get(report_hash, owner)
+        if index is None:
+            return None
+        return index.drilldown(name, extra_terms, limit=limit)
+
+# Instancia global del almacén de índices de temas
+theme_index_store = ThemeIndexStore()
@@ -0,0 +1,81 @@
+"""
+Configuración común de las pruebas: rutas de importación, motor de análisis simulado y datos de ejemplo.
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class FakeBackend:
+    """Motor de análisis sin llamadas externas: devuelve análisis fijos y registra los chunks recibidos."""
+
+    name = "fake"
+
+    def __init__(self):
+        self.chunks = []
+
+    def analyze_comments_chunk(self, comments, system_prompt, **options):
+        comments = list(comments)
+        self.chunks.append(comments)
+        return {
+            "analysis": f"Chunk de {len(comments)} comentarios",
+            "statistics": {
+                "comments": len(comments),
+                "sentiment": {"Positivo": len(comments), "Neutral": 0, "Negativo": 0},
+                "themes": {}
+            },
+            "tokens_razonamiento": 0,
+            "total_tokens": 1
+        }
+
+    def generate_intermediate_summary(self, analyses, comments_count, system_prompt, **options):
+        return {"analysis": "Resumen intermedio", "tokens_razonamiento": 0, "total_tokens": 1}
+
+    def generate_final_analysis(self, analyses, total_comments, chunks_count, system_prompt, **options):
+        return {"analysis": f"Informe final de {total_comments} comentarios", "tokens_razonamiento": 0, "total_tokens": 1}
+
+    def instructions_signature(self):
+        return ""
+
+    def is_available(self):
+        return True
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    """Sustituye el motor de análisis del pipeline por FakeBackend."""
+    import services.analysis_pipeline as analysis_pipeline
+    backend = FakeBackend()
+    monkeypatch.setattr(analysis_pipeline, "get_backend", lambda name=None: backend)
+    return backend
+
+@pytest.fixture
+def analysis_config():
+    """Configuración mínima del análisis, como la que construye la barra lateral."""
+    return {
+        "chunk_size": 10,
+        "max_comments": 0,
+        "backend": "openai",
+        "model": "o1",
+        "reasoning_effort": "high",
+        "system_prompt": "Analiza los comentarios",
+        "topic_clustering": False,
+        "hedge_requests": False,
+        "trend_enabled": True,
+        "date_column": "Fecha",
+        "period_frequency": "M",
+        "group_enabled": False,
+        "group_column": "SKU"
+    }
+
+@pytest.fixture
+def dated_comments():
+    """Genera un DataFrame con `per_month` comentarios en cada uno de los meses indicados ('2024-01', ...)."""
+    def make(months, per_month):
+        return pd.DataFrame([
+            {"Cuerpo": f"comentario {i} de {month}", "Fecha": pd.Timestamp(f"{month}-15")}
+            for month in months for i in range(per_month)
+        ])
+    return make
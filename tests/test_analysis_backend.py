@@ -0,0 +1,22 @@
+"""
+Pruebas de la selección de motores de análisis.
+"""
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_app_modules_do_not_import_the_local_model():
+    code = (
+        "import sys, ui.pages, ui.sidebar, services.job_service; "
+        "print(any(name.startswith(('services.local_model_service', 'transformers', 'onnxruntime')) for name in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    assert output.stdout.strip().splitlines()[-1] == "False"
+
+def test_get_backend_returns_the_requested_backend():
+    from services.analysis_backend import get_backend
+    assert get_backend("openai").name == "openai"
+    assert get_backend("desconocido").name == "openai"
+    assert get_backend("local").name == "local"
@@ -0,0 +1,28 @@
+"""
+Pruebas de la huella de configuración que separa los resultados en caché.
+"""
+from utils.data_processing import build_config_fingerprint
+
+BASE = {
+    "model": "o1",
+    "reasoning_effort": "high",
+    "system_prompt": "Analiza los comentarios",
+    "chunk_size": 50,
+    "topic_clustering": False,
+    "backend": "openai"
+}
+
+def test_options_that_change_the_result_change_the_key():
+    key = build_config_fingerprint(BASE)
+    for option, value in [
+        ("model", "o3"), ("reasoning_effort", "low"), ("system_prompt", "Otro prompt"),
+        ("chunk_size", 100), ("topic_clustering", True), ("backend", "local")
+    ]:
+        assert build_config_fingerprint(dict(BASE, **{option: value})) != key, option
+
+def test_instructions_change_the_key():
+    assert build_config_fingerprint(BASE, "Instrucciones v1") != build_config_fingerprint(BASE, "Instrucciones v2")
+
+def test_presentation_options_do_not_change_the_key():
+    key = build_config_fingerprint(BASE)
+    assert build_config_fingerprint(dict(BASE, user="ana", priority=4, profile=True)) == key
@@ -0,0 +1,73 @@
+"""
+Pruebas del guardado de informes: nombres únicos y sin sobrescribir informes existentes.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.file_service import FileService
+
+def test_concurrent_reports_get_distinct_files(tmp_path):
+    run_ids = [f"job{i}" for i in range(8)]
+    with ThreadPoolExecutor(max_workers=len(run_ids)) as executor:
+        paths = list(executor.map(
+            lambda run_id: FileService.save_analysis_to_file(f"informe {run_id}", str(tmp_path), run_id=run_id),
+            run_ids
+        ))
+
+    assert len(set(paths)) == len(run_ids)
+    for run_id, path in zip(run_ids, paths):
+        assert run_id in os.path.basename(path)
+        with open(path, encoding="utf-8") as f:
+            assert f.read() == f"informe {run_id}"
+
+def test_reports_without_run_id_do_not_collide(tmp_path):
+    paths = {FileService.save_analysis_to_file("informe", str(tmp_path)) for _ in range(20)}
+    assert len(paths) == 20
+
+def test_existing_report_is_not_replaced(tmp_path, monkeypatch):
+    monkeypatch.setattr(FileService, "report_filename", staticmethod(lambda label=None, run_id=None: "fijo.txt"))
+    path = FileService.save_analysis_to_file("primero", str(tmp_path))
+
+    with pytest.raises(FileExistsError):
+        FileService.save_analysis_to_file("segundo", str(tmp_path))
+
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "primero"
+    assert os.listdir(tmp_path) == ["fijo.txt"]
+
+def test_concurrent_jobs_keep_their_own_export_bundle(tmp_path, monkeypatch, fake_backend, analysis_config):
+    import json
+    import pandas as pd
+    import services.analysis_pipeline as analysis_pipeline
+    from services.file_service import file_service
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(file_service, "index_report", lambda *args, **kwargs: None)
+
+    def run(run_id, total):
+        df = pd.DataFrame({"Cuerpo": [f"{run_id} comentario {i}" for i in range(total)]})
+        chunks, total_comments, _ = analysis_pipeline.prepare_chunks(df, analysis_config)
+        result = analysis_pipeline.run_chunk_pipeline(chunks, total_comments, analysis_config)
+        return analysis_pipeline.finalize_analysis(result, comments=df["Cuerpo"], run_id=run_id)
+
+    run_ids = {"job_a": 10, "job_b": 20, "job_c": 30}
+    with ThreadPoolExecutor(max_workers=len(run_ids)) as executor:
+        results = dict(zip(run_ids, executor.map(lambda item: run(*item), run_ids.items())))
+
+    for run_id, total in run_ids.items():
+        files = results[run_id]["export_files"]
+        assert all(run_id in os.path.basename(path) for path in files.values())
+        with open(files["json"], encoding="utf-8") as f:
+            assert json.load(f)["total_comments"] == total
+        comments = pd.read_parquet(files["comments"])
+        assert len(comments) == total and comments["comment"].str.startswith(run_id).all()
+
+def test_labels_that_sanitize_alike_get_distinct_files(tmp_path):
+    paths = [
+        FileService.save_analysis_to_file(f"informe {label}", str(tmp_path), label=label, run_id="job")
+        for label in ("A/B", "A B", "A_B")
+    ]
+    assert len(set(paths)) == 3
+    assert all("_A_B_" in os.path.basename(path) for path in paths)
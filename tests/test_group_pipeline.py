@@ -0,0 +1,39 @@
+"""
+Pruebas del análisis por producto: informes por grupo y su indexación.
+"""
+import pandas as pd
+
+import services.analysis_pipeline as analysis_pipeline
+from services.file_service import file_service
+
+def test_group_reports_are_indexed(tmp_path, monkeypatch, fake_backend, analysis_config):
+    monkeypatch.chdir(tmp_path)
+    indexed = []
+    monkeypatch.setattr(
+        file_service, "index_report",
+        lambda report_path, sections, comments=None, total_comments=0: indexed.append((report_path, comments, total_comments))
+    )
+
+    df = pd.DataFrame({"Cuerpo": [f"comentario {i}" for i in range(30)], "SKU": ["A"] * 20 + ["B"] * 10})
+    config = dict(analysis_config, trend_enabled=False, group_enabled=True)
+    result = analysis_pipeline.run_group_pipeline(df, config)
+
+    paths = {r["filepath"]: r["total_comments"] for r in result["group_results"]}
+    assert {path: total for path, _, total in indexed} == paths
+    assert all(comments is None for _, comments, _ in indexed)
+
+def test_parallel_groups_with_similar_labels_keep_their_reports(tmp_path, monkeypatch, fake_backend, analysis_config):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(file_service, "index_report", lambda *args, **kwargs: None)
+
+    labels = ["A/B", "A B", "A_B", "A-B"]
+    df = pd.DataFrame({
+        "Cuerpo": [f"comentario {i}" for i in range(40)],
+        "SKU": [label for label in labels for _ in range(10)]
+    })
+    config = dict(analysis_config, trend_enabled=False, group_enabled=True)
+    result = analysis_pipeline.run_group_pipeline(df, config, run_id="job123")
+
+    paths = [r["filepath"] for r in result["group_results"]]
+    assert len(set(paths)) == len(labels)
+    assert all("job123" in path for path in paths)
@@ -0,0 +1,32 @@
+"""
+Pruebas del gestor de trabajos: estado de los trabajos persistidos al arrancar.
+"""
+import json
+
+from services.job_service import JobManager
+
+def _write_job(directory, job_id, status, **extra):
+    state = {"job_id": job_id, "user": "ana", "priority": 2, "status": status, "message": "", "errors": [], **extra}
+    with open(directory / f"{job_id}.json", "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+def _read_job(directory, job_id):
+    with open(directory / f"{job_id}.json", encoding="utf-8") as f:
+        return json.load(f)
+
+def test_interrupted_jobs_are_failed_on_startup(tmp_path):
+    _write_job(tmp_path, "enejecucion", "running", partial={"completed": 3})
+    _write_job(tmp_path, "encola", "queued")
+    _write_job(tmp_path, "terminado", "completed", result={"status": "running"})
+    _write_job(tmp_path, "fallido", "failed", message="Error anterior")
+
+    manager = JobManager(jobs_dir=str(tmp_path))
+
+    for job_id in ("enejecucion", "encola"):
+        state = manager.get_job(job_id)
+        assert state["status"] == "failed"
+        assert "interrumpido por reinicio" in state["message"]
+        assert state["errors"] == [state["message"]]
+        assert state["partial"] is None
+    assert _read_job(tmp_path, "terminado")["status"] == "completed"
+    assert _read_job(tmp_path, "fallido")["message"] == "Error anterior"
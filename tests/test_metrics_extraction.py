@@ -0,0 +1,47 @@
+"""
+Pruebas de la lectura de las estadísticas que el modelo añade a cada chunk.
+"""
+from utils.metrics_extraction import parse_chunk_statistics
+
+def _block(positivos, neutrales, negativos, temas=None):
+    temas = temas or {}
+    return (
+        f'Análisis\nESTADISTICAS: {{"positivos": {positivos}, "neutrales": {neutrales}, '
+        f'"negativos": {negativos}, "temas": {str(temas).replace(chr(39), chr(34))}}}'
+    )
+
+def test_exact_counts_are_kept():
+    statistics = parse_chunk_statistics(_block(3, 1, 1, {"sabor": 2}), 5)
+    assert statistics == {"comments": 5, "sentiment": {"Positivo": 3, "Neutral": 1, "Negativo": 1}, "themes": {"sabor": 2}}
+
+def test_counts_off_by_one_are_scaled_to_the_chunk():
+    statistics = parse_chunk_statistics(_block(30, 10, 11), 50)
+    assert sum(statistics["sentiment"].values()) == 50
+    assert statistics["sentiment"] == {"Positivo": 29, "Neutral": 10, "Negativo": 11}
+
+def test_undercounted_block_is_scaled_up():
+    statistics = parse_chunk_statistics(_block(1, 1, 1), 10)
+    assert sum(statistics["sentiment"].values()) == 10
+
+def test_theme_counts_are_capped_at_the_chunk_size():
+    assert parse_chunk_statistics(_block(2, 0, 0, {"precio": 7}), 2)["themes"] == {"precio": 2}
+
+def test_missing_or_empty_block():
+    assert parse_chunk_statistics("Sin estadísticas", 5) is None
+    assert parse_chunk_statistics(_block(0, 0, 0), 5) is None
+
+def test_exact_metrics_only_replace_text_metrics_with_full_coverage():
+    from services.analysis_pipeline import _apply_statistics
+    from utils.metrics_extraction import aggregate_chunk_statistics
+
+    statistics = aggregate_chunk_statistics([parse_chunk_statistics(_block(4, 0, 0, {"sabor": 2}), 4)])
+    text_metrics = {"sentiment_distribution": {"Positivo": 50.0, "Neutral": 25.0, "Negativo": 25.0}, "top_themes": []}
+
+    full = {"comments_analyzed": 4, "comments_total": 4, "chunks_analyzed": 1, "chunks_total": 1}
+    metrics = _apply_statistics(dict(text_metrics), statistics, full)
+    assert metrics["sentiment_distribution"]["Positivo"] == 100.0
+    assert metrics["top_themes"] == [{"name": "sabor", "percentage": 50.0}]
+
+    # Otro chunk de 6 comentarios se analizó sin devolver estadísticas
+    partial = dict(full, comments_analyzed=10, comments_total=10, chunks_analyzed=2, chunks_total=2)
+    assert _apply_statistics(dict(text_metrics), statistics, partial) == text_metrics
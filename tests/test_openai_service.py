@@ -0,0 +1,48 @@
+"""
+Pruebas del servicio de OpenAI sin llamadas a la API.
+"""
+from types import SimpleNamespace
+
+from services.openai_service import openai_service
+
+def _response(text):
+    usage = SimpleNamespace(
+        output_tokens_details=SimpleNamespace(reasoning_tokens=0),
+        input_tokens_details=SimpleNamespace(cached_tokens=0),
+        total_tokens=10,
+        input_tokens=5
+    )
+    return SimpleNamespace(output_text=text, usage=usage)
+
+def test_final_prompt_numbers_duplicate_chunks_by_position(monkeypatch):
+    prompts = []
+
+    def fake_create_response(system_prompt, instructions, user_prompt, **kwargs):
+        prompts.append(user_prompt)
+        return _response("informe")
+
+    monkeypatch.setattr(openai_service, "_create_response", fake_create_response)
+    chunks = [
+        {"analysis": "igual"},
+        {"analysis": "fallo", "error": True},
+        {"analysis": "igual"}
+    ]
+
+    result = openai_service.generate_final_analysis(chunks, total_comments=6, chunks_count=3, system_prompt="")
+
+    assert result["analysis"] == "informe"
+    assert "INSIGHTS DEL GRUPO 1 (1 de 3)" in prompts[0]
+    assert "INSIGHTS DEL GRUPO 2 (3 de 3)" in prompts[0]
+    assert "fallo" not in prompts[0]
+
+def test_mismatched_statistics_keep_the_chunk(monkeypatch):
+    reply = 'Texto\nESTADISTICAS: {"positivos": 7, "neutrales": 0, "negativos": 3, "temas": {"sabor": 9}}'
+    monkeypatch.setattr(openai_service, "_create_response", lambda *args, **kwargs: _response(reply))
+
+    result = openai_service.analyze_comments_chunk(["a", "b", "c", "d", "e"], system_prompt="")
+
+    assert not result.get("error")
+    assert result["analysis"] == "Texto"
+    assert result["total_tokens"] == 10
+    assert result["statistics"]["sentiment"] == {"Positivo": 4, "Neutral": 0, "Negativo": 1}
+    assert result["statistics"]["themes"] == {"sabor": 5}
@@ -0,0 +1,33 @@
+"""
+Pruebas de los resultados provisionales de un análisis en curso.
+"""
+from utils.partial_results import PartialResultsAggregator
+
+def _statistics(positive, negative, themes):
+    return {
+        "comments": positive + negative,
+        "sentiment": {"Positivo": positive, "Neutral": 0, "Negativo": negative},
+        "themes": themes
+    }
+
+def test_themes_count_comments_from_statistics():
+    partial = PartialResultsAggregator()
+    partial.add("Grupo 1", 50, "", _statistics(40, 10, {"sabor": 30, "precio": 5}))
+    partial.add("Grupo 2", 50, "", _statistics(10, 40, {"precio": 20}))
+
+    snapshot = partial.snapshot()
+    assert snapshot["sentiment_distribution"] == {"Positivo": 50.0, "Neutral": 0.0, "Negativo": 50.0}
+    assert snapshot["themes"] == [
+        {"name": "sabor", "comments": 30, "chunks": 0},
+        {"name": "precio", "comments": 25, "chunks": 0}
+    ]
+
+def test_themes_without_statistics_count_chunks():
+    partial = PartialResultsAggregator()
+    partial.add("Grupo 1", 50, "", _statistics(50, 0, {"sabor": 12}))
+    partial.add("Grupo 2", 50, "TEMAS PRINCIPALES:\n1. Sabor: muy valorado\n2. Envío: lento", None)
+
+    assert partial.snapshot()["themes"] == [
+        {"name": "sabor", "comments": 12, "chunks": 1},
+        {"name": "envío", "comments": 0, "chunks": 1}
+    ]
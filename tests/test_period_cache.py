@@ -0,0 +1,31 @@
+"""
+Pruebas de la caché de periodos: cuándo se reutiliza un periodo y cuándo se recalcula.
+"""
+import pytest
+
+from services.cache_service import PeriodCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return PeriodCache(str(tmp_path))
+
+def _entry(fingerprint, closed=True):
+    return {"period": "2024-01", "closed": closed, "fingerprint": fingerprint, "analysis": "enero"}
+
+def test_closed_period_is_reused_with_same_comments(cache):
+    cache.set("2024-01", "cfg", _entry("f1"))
+    entry = cache.get("2024-01", "cfg", "f1", closed=True)
+    assert entry is not None and entry["analysis"] == "enero"
+
+def test_closed_period_with_different_comments_is_recomputed(cache):
+    cache.set("2024-01", "cfg", _entry("f1"))
+    assert cache.get("2024-01", "cfg", "f2", closed=True) is None
+
+def test_open_period_is_recomputed_when_comments_change(cache):
+    cache.set("2024-01", "cfg", _entry("f1", closed=False))
+    assert cache.get("2024-01", "cfg", "f1", closed=False) is not None
+    assert cache.get("2024-01", "cfg", "f2", closed=False) is None
+
+def test_config_change_misses_cache(cache):
+    cache.set("2024-01", "cfg", _entry("f1"))
+    assert cache.get("2024-01", "otra_cfg", "f1", closed=True) is None
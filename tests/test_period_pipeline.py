@@ -0,0 +1,64 @@
+"""
+Pruebas del análisis por periodos: qué periodos se guardan en caché y cuáles se reutilizan.
+"""
+from pathlib import Path
+
+import pytest
+
+import services.analysis_pipeline as analysis_pipeline
+from services.cache_service import PeriodCache
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = PeriodCache(str(tmp_path))
+    monkeypatch.setattr(analysis_pipeline, "period_cache", cache)
+    return cache
+
+def test_second_run_reuses_cached_periods(cache, fake_backend, analysis_config, dated_comments):
+    df = dated_comments(["2024-01", "2024-02"], 15)
+    analysis_pipeline.run_period_pipeline(df, analysis_config)
+    calls = len(fake_backend.chunks)
+
+    result = analysis_pipeline.run_period_pipeline(df, analysis_config)
+    assert [r["from_cache"] for r in result["period_results"]] == [True, True]
+    assert len(fake_backend.chunks) == calls
+
+def test_period_cut_by_max_comments_is_not_cached(cache, fake_backend, analysis_config, dated_comments):
+    df = dated_comments(["2024-01", "2024-02"], 15)
+    config = dict(analysis_config, max_comments=20)
+    result = analysis_pipeline.run_period_pipeline(df, config)
+    assert [r["total_comments"] for r in result["period_results"]] == [15, 5]
+    cached_files = [path.name for path in Path(cache.cache_dir).rglob("*.json")]
+    assert cached_files == ["2024-01.json"]
+
+    # Con el límite ampliado, el mes completo se reutiliza y el recortado se analiza entero
+    config = dict(analysis_config, max_comments=30)
+    result = analysis_pipeline.run_period_pipeline(df, config)
+    assert [(r["from_cache"], r["total_comments"]) for r in result["period_results"]] == [(True, 15), (False, 15)]
+
+def test_changed_instructions_recompute_cached_periods(cache, fake_backend, analysis_config, dated_comments, monkeypatch):
+    df = dated_comments(["2024-01"], 15)
+    analysis_pipeline.run_period_pipeline(df, analysis_config)
+
+    monkeypatch.setattr(fake_backend, "instructions_signature", lambda: "Instrucciones nuevas")
+    result = analysis_pipeline.run_period_pipeline(df, analysis_config)
+    assert [r["from_cache"] for r in result["period_results"]] == [False]
+
+def test_renamed_export_with_a_new_month_reuses_earlier_periods(cache, fake_backend, analysis_config, dated_comments):
+    # El nombre del archivo no interviene: una exportación renombrada aporta los mismos comentarios por periodo
+    months = ["2024-01", "2024-02", "2024-03"]
+    analysis_pipeline.run_period_pipeline(dated_comments(months, 15), dict(analysis_config))
+    calls = len(fake_backend.chunks)
+
+    result = analysis_pipeline.run_period_pipeline(dated_comments(months + ["2024-04"], 15), dict(analysis_config))
+    assert [r["from_cache"] for r in result["period_results"]] == [True, True, True, False]
+    # Solo se analizan los chunks del mes nuevo
+    assert len(fake_backend.chunks) - calls == 2
+
+def test_other_dataset_with_the_same_months_is_recomputed(cache, fake_backend, analysis_config, dated_comments):
+    df = dated_comments(["2024-01"], 15)
+    analysis_pipeline.run_period_pipeline(df, analysis_config)
+
+    other = df.assign(Cuerpo=df["Cuerpo"] + " (otra tienda)")
+    result = analysis_pipeline.run_period_pipeline(other, analysis_config)
+    assert [r["from_cache"] for r in result["period_results"]] == [False]
@@ -0,0 +1,31 @@
+"""
+Pruebas del perfilado: rotación del directorio de perfiles.
+"""
+import os
+
+from utils.profiling import prune_profiles, profile_run
+
+def _write_profile(directory, run_id, mtime):
+    for suffix in (".collapsed", ".summary.txt"):
+        path = os.path.join(directory, f"{run_id}{suffix}")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("x")
+        os.utime(path, (mtime, mtime))
+
+def test_prune_keeps_the_newest_runs(tmp_path):
+    for i in range(5):
+        _write_profile(tmp_path, f"render-{i}", 1_000_000 + i)
+
+    assert prune_profiles(str(tmp_path), keep=2) == 3
+    assert sorted(os.listdir(tmp_path)) == [
+        "render-3.collapsed", "render-3.summary.txt", "render-4.collapsed", "render-4.summary.txt"
+    ]
+
+def test_prune_missing_directory(tmp_path):
+    assert prune_profiles(str(tmp_path / "no_existe"), keep=2) == 0
+
+def test_disabled_profile_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with profile_run("render-x", enabled=False) as profiler:
+        assert profiler is None
+    assert os.listdir(tmp_path) == []
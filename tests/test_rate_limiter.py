@@ -0,0 +1,35 @@
+"""
+Pruebas del limitador de peticiones compartido.
+"""
+import threading
+import time
+
+from services.rate_limiter import RateLimiter
+
+def test_limits_concurrent_requests():
+    limiter = RateLimiter(requests_per_minute=6000, max_concurrent=2)
+    limiter.acquire()
+    limiter.acquire()
+
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.1)
+
+    limiter.release()
+    assert acquired.wait(1)
+    thread.join()
+
+def test_waits_for_tokens_once_the_burst_is_spent():
+    limiter = RateLimiter(requests_per_minute=600, max_concurrent=2)
+    for _ in range(2):
+        with limiter:
+            pass
+
+    start = time.monotonic()
+    with limiter:
+        pass
+
+    # A 10 peticiones por segundo, el siguiente token tarda unos 0,1 s
+    assert time.monotonic() - start >= 0.05
+    assert limiter.total_wait_seconds >= 0.05
@@ -0,0 +1,41 @@
+"""
+Pruebas del almacén compartido: expulsión LRU, uso por sesión y memoria del proceso.
+"""
+from services.result_store import ResultStore, process_rss
+
+def test_evicts_least_recently_used():
+    store = ResultStore(max_bytes=300)
+    store.put("a", "A", size=100)
+    store.put("b", "B", size=100)
+    store.put("c", "C", size=100)
+    assert store.get("a") == "A"
+
+    store.put("d", "D", size=100)
+
+    assert store.get("b") is None
+    assert [store.get(key) for key in ("a", "c", "d")] == ["A", "C", "D"]
+    assert store.stats() == {"entries": 3, "bytes": 300, "max_bytes": 300, "evictions": 1}
+
+def test_oversized_payload_is_not_stored():
+    store = ResultStore(max_bytes=100)
+    store.put("a", "viejo", size=10)
+    assert store.put("a", "enorme", size=101) is False
+    assert store.get("a") is None
+    assert store.stats()["bytes"] == 0
+
+def test_release_and_usage_by_owner():
+    store = ResultStore(max_bytes=1000)
+    store.put("compartido", 1, owner="s1", size=100)
+    store.get("compartido", owner="s2")
+    store.put("propio", 2, owner="s1", size=50)
+    assert store.usage_by_owner() == {"s1": 150, "s2": 100}
+
+    store.release("compartido", "s1")
+    assert store.get("compartido") == 1
+    store.release("compartido", "s2")
+    assert store.get("compartido") is None
+    assert store.usage_by_owner() == {"s1": 50}
+
+def test_process_rss():
+    rss = process_rss()
+    assert rss is None or rss > 0
@@ -0,0 +1,44 @@
+"""
+Pruebas del reparto equitativo de peticiones entre usuarios.
+"""
+import threading
+import time
+
+from services.scheduler import RequestScheduler
+
+def _grant_order(scheduler, requests):
+    """
+    Encola todas las peticiones mientras el único hueco está ocupado y devuelve el orden
+    en que se conceden al liberarlo. `requests` es una lista de (usuario, peso).
+    """
+    order = []
+    blocker = scheduler.request_slot()
+    blocker.__enter__()
+
+    def request(user, weight):
+        with scheduler.job_context(f"job-{user}", user, weight):
+            with scheduler.request_slot():
+                order.append(user)
+
+    threads = []
+    for user, weight in requests:
+        thread = threading.Thread(target=request, args=(user, weight))
+        thread.start()
+        threads.append(thread)
+        # Esperar a que la petición quede en cola para fijar su orden de llegada
+        while len(scheduler._waiting) < len(threads):
+            time.sleep(0.001)
+
+    blocker.__exit__(None, None, None)
+    for thread in threads:
+        thread.join(timeout=5)
+    return order
+
+def test_users_alternate_regardless_of_queued_requests():
+    order = _grant_order(RequestScheduler(max_concurrent=1), [("ana", 1)] * 6 + [("luis", 1)] * 2)
+    assert order == ["ana", "luis", "ana", "luis", "ana", "ana", "ana", "ana"]
+
+def test_share_is_proportional_to_priority():
+    order = _grant_order(RequestScheduler(max_concurrent=1), [("ana", 2)] * 6 + [("luis", 1)] * 6)
+    assert order[:6].count("ana") == 4
+    assert order[:6].count("luis") == 2
@@ -0,0 +1,63 @@
+"""
+Pruebas del índice de búsqueda FTS5: indexación por ejecución, sustitución y migración del esquema.
+"""
+import sqlite3
+
+import pytest
+
+from services.search_service import SearchIndex
+
+@pytest.fixture
+def index(tmp_path):
+    return SearchIndex(str(tmp_path / "search.db"))
+
+def _index(index, run_id, comments, sections=None):
+    index.index_run(run_id, f"outputs/{run_id}.txt", sections or {"informe": f"informe {run_id}"}, comments, len(comments)).result()
+
+def _runs(result):
+    return sorted({hit["run_id"] for hit in result["hits"]})
+
+def test_runs_are_searchable_independently(index):
+    _index(index, "run_a", ["el envío llegó tarde", "buen sabor"])
+    _index(index, "run_b", ["el envío fue rápido"])
+
+    assert _runs(index.search("envío")) == ["run_a", "run_b"]
+    assert _runs(index.search("sabor")) == ["run_a"]
+    assert _runs(index.search("informe run_b", kind="reports")) == ["run_b"]
+
+def test_reindexing_a_run_replaces_only_that_run(index):
+    _index(index, "run_a", ["caja rota", "precio alto"])
+    _index(index, "run_b", ["caja perfecta"])
+    _index(index, "run_a", ["textura cremosa"])
+
+    assert _runs(index.search("caja")) == ["run_b"]
+    assert _runs(index.search("precio")) == []
+    assert _runs(index.search("cremosa")) == ["run_a"]
+
+def test_legacy_index_is_migrated_and_can_be_reindexed(tmp_path):
+    path = str(tmp_path / "search.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE runs (run_id TEXT PRIMARY KEY, report_path TEXT, created_at TEXT, total_comments INTEGER)")
+    connection.execute("CREATE VIRTUAL TABLE report_sections USING fts5(run_id UNINDEXED, section UNINDEXED, content)")
+    connection.execute("CREATE VIRTUAL TABLE comments USING fts5(run_id UNINDEXED, position UNINDEXED, content)")
+    connection.execute("INSERT INTO runs VALUES ('antiguo', 'outputs/antiguo.txt', '2024-01-01 00:00:00', 2)")
+    connection.execute("INSERT INTO report_sections VALUES ('antiguo', 'informe', 'informe antiguo')")
+    connection.executemany("INSERT INTO comments VALUES ('antiguo', ?, ?)", [(0, "sabor amargo"), (1, "sabor dulce")])
+    connection.commit()
+    connection.close()
+
+    index = SearchIndex(path)
+    assert index.stats() == {"runs": 1, "sections": 1, "comments": 2}
+
+    _index(index, "antiguo", ["sabor nuevo"])
+    assert [hit["snippet"] for hit in index.search("sabor")["hits"]] == ["**sabor** nuevo"]
+
+def test_stats_follow_indexing_and_reindexing(index):
+    assert index.stats() == {"runs": 0, "sections": 0, "comments": 0}
+
+    _index(index, "run_a", ["uno", "dos", "tres"], {"sentimiento": "bien", "temas": "envío"})
+    _index(index, "run_b", ["cuatro"])
+    assert index.stats() == {"runs": 2, "sections": 3, "comments": 4}
+
+    _index(index, "run_a", ["cinco"])
+    assert index.stats() == {"runs": 2, "sections": 2, "comments": 2}
@@ -0,0 +1,19 @@
+"""
+Pruebas de la identidad usada en el reparto equitativo entre sesiones.
+"""
+import ui.sidebar as sidebar
+
+def test_empty_name_falls_back_to_the_session(monkeypatch):
+    sessions = iter(["a1b2c3d4e5f6a7b8", "ffffeeeeddddcccc"])
+    monkeypatch.setattr(sidebar, "current_session_id", lambda: next(sessions))
+    first, second = sidebar.resolve_user(""), sidebar.resolve_user("  ")
+    assert first == "sesion-a1b2c3d4e5f6"
+    assert first != second
+
+def test_name_is_used_when_given(monkeypatch):
+    monkeypatch.setattr(sidebar, "current_session_id", lambda: "a1b2c3d4e5f6a7b8")
+    assert sidebar.resolve_user(" ana ") == "ana"
+
+def test_outside_a_session_uses_the_default_user(monkeypatch):
+    monkeypatch.setattr(sidebar, "current_session_id", lambda: None)
+    assert sidebar.resolve_user("") == sidebar.DEFAULT_USER
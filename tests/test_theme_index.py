@@ -0,0 +1,46 @@
+"""
+Pruebas del índice invertido de comentarios usado en el detalle de cada tema.
+"""
+import numpy as np
+import pytest
+
+import utils.theme_index as theme_index
+from utils.theme_index import CommentIndex, normalize_for_index
+
+COMMENTS = [
+    "Demasiado azúcar",
+    "Los azúcares añadidos",
+    "Aceite de coco excelente",
+    "El coco sabe raro",
+    "Buen aceite, calidad-precio",
+    None,
+    ""
+]
+
+@pytest.fixture(params=[True, False], ids=["arrow", "python"])
+def index(request, monkeypatch):
+    """Índice construido con y sin pyarrow."""
+    if request.param and not theme_index.PYARROW_AVAILABLE:
+        pytest.skip("pyarrow no está instalado")
+    monkeypatch.setattr(theme_index, "PYARROW_AVAILABLE", request.param)
+    return CommentIndex(COMMENTS)
+
+def test_prefix_lookup_covers_plural_and_accents(index):
+    assert index.match([normalize_for_index("Azúcar")]).tolist() == [0, 1]
+
+def test_multiword_keyword_requires_every_word(index):
+    assert index.match(["aceite de coco"]).tolist() == [2]
+    assert index.match(["coco", "precio"]).tolist() == [2, 3, 4]
+
+def test_missing_comments_have_no_tokens(index):
+    assert "none" not in index.vocabulary
+    assert index.match(["none"]).tolist() == []
+    assert index.size == len(COMMENTS)
+
+def test_both_tokenizers_build_the_same_index(monkeypatch):
+    arrow = CommentIndex(COMMENTS)
+    monkeypatch.setattr(theme_index, "PYARROW_AVAILABLE", False)
+    python = CommentIndex(COMMENTS)
+    assert list(arrow.vocabulary) == list(python.vocabulary)
+    assert np.array_equal(arrow.postings, python.postings)
+    assert np.array_equal(arrow.offsets, python.offsets)
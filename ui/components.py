@@ -1,14 +1,16 @@
 """
 Componentes reutilizables para la interfaz de usuario.
 """
+import json
 import streamlit as st
 import pandas as pd
 import logging
 from typing import Dict, List, Any, Optional, Callable
-import time
 
-from utils.visualization import create_sentiment_pie_chart, create_themes_bar_chart,format_full_report
-from utils.metrics_extraction import format_key_points
+from config.settings import RENDER_CACHE_ENTRIES
+from utils.data_processing import fingerprint_report
+from utils.visualization import create_sentiment_pie_chart, create_themes_bar_chart, create_sentiment_trend_chart, format_full_report
+from utils.metrics_extraction import format_key_points, format_coverage_note
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -22,7 +24,7 @@ def upload_area(help_text: str = "El archivo debe contener una columna 'Cuerpo'
     """
     st.markdown("""
     <div class="upload-area">
-        <h3>📁 Arrastra y suelta tu archivo CSV aquí</h3>
+        <h3>📁 Arrastra y suelta tu archivo aquí</h3>
         <p>{}</p>
     </div>
     """.format(help_text), unsafe_allow_html=True)
@@ -47,7 +49,7 @@ def display_instructions() -> None:
     """Muestra instrucciones sobre cómo usar la aplicación."""
     st.markdown("""
     ### 🚀 Cómo funciona:
-    1. Sube tu archivo CSV con comentarios
+    1. Sube tu archivo (CSV, Parquet, Arrow/Feather o Excel) con comentarios
     2. Configura los parámetros de análisis en el panel lateral
     3. Haz clic en "Analizar comentarios"
     4. Recibe un análisis detallado y accionable
@@ -79,15 +81,71 @@ def progress_tracker(total_steps: int) -> tuple:
         progress = min(step / total_steps, 1.0)
         progress_bar.progress(progress)
         progress_text.text(message)
-        # Pequeña pausa para visualizar mejor la actualización
-        time.sleep(0.1)
     
     return progress_bar, progress_text, update_progress
 
+def queue_status_display(queue_position: Optional[int], eta_seconds: Optional[float]) -> None:
+    """
+    Muestra la posición en la cola compartida y el tiempo restante estimado.
+    
+    Args:
+        queue_position: Posición en la cola (None si el análisis ya se está ejecutando)
+        eta_seconds: Tiempo restante estimado en segundos
+    """
+    eta_text = "calculando..."
+    if eta_seconds is not None:
+        minutes, seconds = divmod(int(eta_seconds), 60)
+        eta_text = f"~{minutes} min {seconds:02d} s" if minutes else f"~{seconds} s"
+    
+    if queue_position is not None:
+        st.info(f"🕒 En cola: posición {queue_position} · Tiempo estimado hasta completar: {eta_text}")
+    else:
+        st.caption(f"Tiempo restante estimado: {eta_text}")
+
+def partial_results_display(partial: Optional[Dict[str, Any]]) -> None:
+    """
+    Muestra los resultados provisionales de un análisis en curso.
+    
+    Args:
+        partial: Instantánea de los resultados parciales agregados
+    """
+    if not partial or not partial["completed"]:
+        return
+    
+    st.markdown(f"### 🔄 Resultados provisionales ({partial['completed']} completados)")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if partial["sentiment_distribution"]:
+            st.plotly_chart(
+                create_sentiment_pie_chart(partial["sentiment_distribution"], title='Distribución provisional'),
+                use_container_width=True
+            )
+    
+    with col2:
+        if partial["themes"]:
+            st.markdown("#### Temas más citados hasta ahora")
+            for theme in partial["themes"]:
+                counts = [f"{theme['comments']} comentarios"] if theme["comments"] else []
+                if theme["chunks"]:
+                    counts.append(f"citado en {theme['chunks']} chunks sin recuento")
+                st.markdown(f"• {theme['name']} ({', '.join(counts)})")
+    
+    st.markdown("#### Últimos insights recibidos")
+    for insight in partial["recent_insights"]:
+        with st.expander(insight["label"], expanded=False):
+            st.markdown(insight["analysis"])
+
 def metrics_display(
     total_comments: int, 
     tokens_reasoning: int, 
-    total_tokens: int
+    total_tokens: int,
+    input_tokens_saved: int = 0,
+    input_tokens: int = 0,
+    cached_tokens: int = 0,
+    hedged_requests: int = 0,
+    hedge_wins: int = 0
 ) -> None:
     """
     Muestra métricas generales en tres columnas.
@@ -96,6 +154,11 @@ def metrics_display(
         total_comments: Número total de comentarios analizados
         tokens_reasoning: Número de tokens de razonamiento utilizados
         total_tokens: Número total de tokens utilizados
+        input_tokens_saved: Tokens de entrada ahorrados (estimados) al compactar los prompts
+        input_tokens: Número total de tokens de entrada enviados
+        cached_tokens: Tokens de entrada servidos desde la caché de prefijos del proveedor
+        hedged_requests: Peticiones de chunks que se duplicaron por tardar demasiado
+        hedge_wins: Duplicados que respondieron antes que la petición original
     """
     col1, col2, col3 = st.columns(3)
     
@@ -107,26 +170,88 @@ def metrics_display(
     
     with col3:
         st.metric("Total de tokens", f"{total_tokens:,}")
+    
+    if input_tokens_saved:
+        st.caption(f"Compactación de prompts: ~{input_tokens_saved:,} tokens de entrada ahorrados (estimación)")
+    
+    if input_tokens:
+        st.caption(
+            f"Caché de prefijos: {cached_tokens:,} de {input_tokens:,} tokens de entrada "
+            f"({100 * cached_tokens / input_tokens:.1f}%) servidos desde caché"
+        )
+    
+    if hedged_requests:
+        st.caption(
+            f"Peticiones duplicadas: {hedged_requests:,}, de las que {hedge_wins:,} "
+            "respondieron antes que la original"
+        )
+
+@st.cache_data(max_entries=RENDER_CACHE_ENTRIES, show_spinner=False)
+def _render_report(report_hash: str, _analysis_text: str, _report_text: str) -> Dict[str, Any]:
+    """
+    Formatea el informe completo y prepara su descarga; memoizado por la huella del informe.
+    
+    Los argumentos con guion bajo no forman parte de la clave de la caché.
+    """
+    return {
+        "markdown": format_full_report(_analysis_text),
+        "download": _report_text.encode("utf-8")
+    }
+
+@st.cache_data(max_entries=RENDER_CACHE_ENTRIES, show_spinner=False)
+def _render_summary(report_hash: str, _metrics: Dict[str, Any], _formatted_sections: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Genera el gráfico de sentimientos (como JSON) y los puntos clave del resumen visual;
+    memoizado por la huella del informe.
+    """
+    mejoras_text = _formatted_sections.get("mejoras", "").replace("### ⚠️ ÁREAS DE MEJORA\n\n", "")
+    if not mejoras_text.strip():
+        mejoras_text = "No se identificaron áreas específicas de mejora en los comentarios analizados."
+    
+    recom_text = _formatted_sections.get("recomendaciones", "").replace("### 🚀 RECOMENDACIONES ACCIONABLES\n\n", "")
+    if not recom_text.strip():
+        recom_text = "No hay suficientes datos para generar recomendaciones específicas."
+    
+    fortalezas_text = _formatted_sections.get("fortalezas", "").replace("### ✅ FORTALEZAS DEL PRODUCTO\n\n", "")
+    
+    return {
+        "figure": json.loads(create_sentiment_pie_chart(_metrics["sentiment_distribution"]).to_json()),
+        "fortalezas": format_key_points(fortalezas_text, max_points=3),
+        "mejoras": format_key_points(mejoras_text, max_points=3),
+        "recomendaciones": format_key_points(recom_text, max_points=5)
+    }
 
-def results_tabs(analysis_text: str, metrics: Dict[str, Any], formatted_sections: Dict[str, str], filepath: str) -> None:
+def results_tabs(
+    analysis_text: str,
+    metrics: Dict[str, Any],
+    formatted_sections: Dict[str, str],
+    report_text: Optional[str] = None,
+    report_hash: Optional[str] = None
+) -> None:
     """
     Muestra los resultados en pestañas organizadas (versión mejorada).
     
+    El gráfico, los puntos clave y el informe formateado se memoizan por la huella del informe,
+    y la descarga se sirve desde memoria, de modo que volver a mostrar un resultado no recalcula
+    nada ni lee del disco.
+    
     Args:
         analysis_text: Texto completo del análisis
         metrics: Métricas extraídas para visualización
         formatted_sections: Secciones del análisis formateadas
-        filepath: Ruta al archivo guardado para descarga
+        report_text: Texto del informe tal como se guardó (por defecto, el análisis)
+        report_hash: Huella del informe (se calcula si no se proporciona)
     """
+    report_text = report_text or analysis_text
+    report_hash = report_hash or fingerprint_report(report_text, metrics)
+    summary = _render_summary(report_hash, metrics, formatted_sections)
+    
     # Crear pestañas simplificadas
     tab1, tab2 = st.tabs(["📊 Resumen Visual", "📄 Informe Completo"])
     
     with tab1:
         # Gráfico de sentimiento
-        st.plotly_chart(
-            create_sentiment_pie_chart(metrics["sentiment_distribution"]), 
-            use_container_width=True
-        )
+        st.plotly_chart(summary["figure"], use_container_width=True)
         
         # Mostrar solo las secciones más importantes
         st.markdown("### 🔍 Principales Hallazgos")
@@ -137,10 +262,9 @@ def results_tabs(analysis_text: str, metrics: Dict[str, Any], formatted_sections
         with col1:
             if "fortalezas" in formatted_sections:
                 st.markdown("#### ✅ Fortalezas")
-                fortalezas_text = formatted_sections.get("fortalezas", "").replace("### ✅ FORTALEZAS DEL PRODUCTO\n\n", "")
                 
                 # Formatear puntos como viñetas más legibles
-                points = format_key_points(fortalezas_text, max_points=3)
+                points = summary["fortalezas"]
                 if points:
                     for point in points.split("• "):
                         if point.strip():
@@ -150,13 +274,8 @@ def results_tabs(analysis_text: str, metrics: Dict[str, Any], formatted_sections
             # Asegurar que siempre se muestre la sección de áreas de mejora
             st.markdown("#### ⚠️ Áreas de Mejora")
             
-            # Obtener texto de áreas de mejora o proporcionar un mensaje predeterminado
-            mejoras_text = formatted_sections.get("mejoras", "").replace("### ⚠️ ÁREAS DE MEJORA\n\n", "")
-            if not mejoras_text.strip():
-                mejoras_text = "No se identificaron áreas específicas de mejora en los comentarios analizados."
-            
             # Formatear puntos como viñetas más legibles
-            points = format_key_points(mejoras_text, max_points=3)
+            points = summary["mejoras"]
             if points:
                 for point in points.split("• "):
                     if point.strip():
@@ -167,13 +286,8 @@ def results_tabs(analysis_text: str, metrics: Dict[str, Any], formatted_sections
         # Añadir recomendaciones en una sección aparte
         st.markdown("### 🚀 Recomendaciones Clave")
         
-        # Obtener texto de recomendaciones o proporcionar un mensaje predeterminado
-        recom_text = formatted_sections.get("recomendaciones", "").replace("### 🚀 RECOMENDACIONES ACCIONABLES\n\n", "")
-        if not recom_text.strip():
-            recom_text = "No hay suficientes datos para generar recomendaciones específicas."
-        
         # Formatear puntos como viñetas numeradas más legibles
-        points = format_key_points(recom_text, max_points=5)
+        points = summary["recomendaciones"]
         if points:
             for i, point in enumerate(points.split("• ")[1:], 1):  # Empezar desde 1, ignorar el primer elemento vacío
                 if point.strip():
@@ -182,20 +296,151 @@ def results_tabs(analysis_text: str, metrics: Dict[str, Any], formatted_sections
     with tab2:
         st.markdown("## 📋 Informe Completo")
         
-        # Aplicar formato mejorado para Streamlit
-        formatted_report = format_full_report(analysis_text)
+        # Aplicar formato mejorado para Streamlit (memoizado)
+        report = _render_report(report_hash, analysis_text, report_text)
         
         # Mostrar el informe formateado
-        st.markdown(formatted_report)
+        st.markdown(report["markdown"])
         
-        # Botón de descarga
-        with open(filepath, "r", encoding="utf-8") as f:
-            st.download_button(
-                label="📥 Descargar informe completo",
-                data=f,
-                file_name="analisis_sentimiento.txt",
-                mime="text/plain"
-            )
+        # Botón de descarga servido desde memoria
+        st.download_button(
+            label="📥 Descargar informe completo",
+            data=report["download"],
+            file_name="analisis_sentimiento.txt",
+            mime="text/plain"
+        )
+
+def theme_clusters_display(clusters: List[Dict[str, Any]]) -> None:
+    """
+    Muestra la frecuencia de los temas medida a partir del tamaño de los clusters locales.
+    
+    Args:
+        clusters: Lista de clusters con su tamaño, porcentaje y términos representativos
+    """
+    themes_data = [
+        {"name": ", ".join(cluster["terms"][:3]), "percentage": round(cluster["percentage"], 1)}
+        for cluster in clusters
+    ]
+    
+    fig = create_themes_bar_chart(themes_data, title='Temas Detectados por Agrupación Local')
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True)
+
+def theme_drilldown_display(
+    themes: List[Dict[str, Any]],
+    drilldown: Callable[[str, List[str]], Optional[Dict[str, Any]]]
+) -> None:
+    """
+    Permite elegir un tema y ver los comentarios que lo mencionan.
+
+    Args:
+        themes: Temas con su nombre y, opcionalmente, términos asociados ("terms")
+        drilldown: Función que localiza los comentarios de un tema a partir de su nombre y términos
+    """
+    if not themes:
+        return
+
+    st.subheader("🔍 Comentarios por tema")
+    labels = [theme["name"] for theme in themes]
+    selected = st.selectbox("Tema", labels, key="theme_drilldown")
+    theme = themes[labels.index(selected)]
+
+    result = drilldown(theme["name"], theme.get("terms", []))
+    if result is None:
+        st.info("El índice de comentarios de este análisis ya no está en memoria. Repita el análisis para consultarlo.")
+        return
+
+    st.metric("Comentarios que mencionan el tema", f"{result['count']} ({result['percentage']:.1f}%)")
+    st.caption("Palabras clave: " + ", ".join(result["keywords"]))
+    if result["comments"]:
+        st.dataframe(pd.DataFrame({"Comentario": result["comments"]}), use_container_width=True, hide_index=True)
+    else:
+        st.caption("Ningún comentario contiene las palabras clave de este tema")
+
+def trend_display(period_results: List[Dict[str, Any]]) -> None:
+    """
+    Muestra la evolución del sentimiento por periodo y el detalle de cada periodo.
+    
+    Args:
+        period_results: Lista de resultados por periodo
+    """
+    st.markdown("### 📈 Tendencia de Sentimiento")
+    
+    fig = create_sentiment_trend_chart(period_results)
+    if fig is None:
+        st.info("No hay periodos suficientes para mostrar la tendencia.")
+        return
+    
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Tabla resumen por periodo
+    summary_df = pd.DataFrame([
+        {
+            "Periodo": result["period"],
+            "Comentarios": result["total_comments"],
+            "Positivo (%)": round(result["metrics"]["sentiment_distribution"].get("Positivo", 0), 1),
+            "Neutral (%)": round(result["metrics"]["sentiment_distribution"].get("Neutral", 0), 1),
+            "Negativo (%)": round(result["metrics"]["sentiment_distribution"].get("Negativo", 0), 1),
+            "Estado": "Cerrado" if result["closed"] else "Abierto",
+            "Origen": "Caché" if result["from_cache"] else "Analizado"
+        }
+        for result in period_results
+    ])
+    st.dataframe(summary_df, hide_index=True)
+
+def group_results_display(group_results: List[Dict[str, Any]]) -> None:
+    """
+    Muestra un resumen comparativo por producto y el informe individual de cada uno.
+    
+    Args:
+        group_results: Lista de resultados por grupo
+    """
+    st.markdown("### 📦 Resultados por Producto")
+    
+    summary_df = pd.DataFrame([
+        {
+            "Producto": result["group"],
+            "Comentarios": result["total_comments"],
+            "Positivo (%)": round(result["metrics"]["sentiment_distribution"].get("Positivo", 0), 1),
+            "Neutral (%)": round(result["metrics"]["sentiment_distribution"].get("Neutral", 0), 1),
+            "Negativo (%)": round(result["metrics"]["sentiment_distribution"].get("Negativo", 0), 1),
+            "Grupos fallidos": result["failed_chunks"],
+            "Tokens": result["token_counts"]["total_tokens"]
+        }
+        for result in group_results
+    ])
+    st.dataframe(summary_df, hide_index=True)
+    
+    for result in group_results:
+        with st.expander(f"📄 {result['group']} ({result['total_comments']} comentarios)", expanded=False):
+            report_hash = result.get("report_hash") or fingerprint_report(result["analysis"])
+            st.markdown(_render_report(report_hash, result["analysis"], result["analysis"])["markdown"])
+            st.caption(f"Informe guardado en {result['filepath']}")
+
+def coverage_display(coverage: Optional[Dict[str, int]], failed_chunks: List[Dict[str, Any]]) -> None:
+    """
+    Advierte de la cobertura real cuando quedaron comentarios sin analizar y detalla los grupos fallidos.
+    
+    Args:
+        coverage: Comentarios y chunks analizados frente a los totales
+        failed_chunks: Lista de chunks fallidos con su clase de error
+    """
+    if not coverage or coverage["comments_analyzed"] >= coverage["comments_total"]:
+        return
+    
+    st.warning(f"⚠️ {format_coverage_note(coverage)} El informe se basa solo en los comentarios analizados.")
+    
+    if failed_chunks:
+        with st.expander(f"Grupos fallidos ({len(failed_chunks)})", expanded=False):
+            st.dataframe(pd.DataFrame([
+                {
+                    "Grupo": chunk["index"] + 1,
+                    "Comentarios": chunk["comments_count"],
+                    "Tipo de error": chunk["error_type"],
+                    "Detalle": chunk["error"]
+                }
+                for chunk in failed_chunks
+            ]), hide_index=True)
 
 def error_message(error: Exception, show_details: bool = True) -> None:
     """
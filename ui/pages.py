@@ -4,31 +4,221 @@ Páginas principales de la aplicación.
 import streamlit as st
 import pandas as pd
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
+from config.settings import SUPPORTED_INPUT_FORMATS
 from ui.sidebar import render_sidebar
 from ui.components import (
     upload_area, 
     display_example_dataframe, 
     display_instructions,
     progress_tracker,
+    queue_status_display,
+    partial_results_display,
     metrics_display,
     results_tabs,
+    theme_clusters_display,
+    theme_drilldown_display,
+    trend_display,
+    group_results_display,
+    coverage_display,
     error_message
 )
-from utils.data_processing import (
-    validate_and_prepare_dataframe,
-    split_dataframe_into_chunks,
-    calculate_total_tokens
-)
-from utils.metrics_extraction import extract_metrics_from_analysis, extract_key_sections
-from utils.visualization import format_analysis_sections
-from services.openai_service import openai_service
-from services.file_service import file_service
+from utils.data_processing import load_dataframe, validate_and_prepare_dataframe
+from services.job_service import job_manager
+from services.search_service import search_index
+from services.theme_service import theme_index_store
+from services.result_store import result_store, current_session_id
 
 # Configurar logger
 logger = logging.getLogger(__name__)
 
+def _get_active_job_id() -> Optional[str]:
+    """Obtiene el trabajo activo de la sesión o, tras recargar la página, de la URL."""
+    job_id = st.session_state.get("job_id")
+    if not job_id:
+        job_id = st.query_params.get("job")
+        if job_id:
+            st.session_state.job_id = job_id
+    return job_id
+
+def _set_active_job_id(job_id: Optional[str]) -> None:
+    """Guarda el trabajo activo en la sesión y en la URL para poder recuperarlo tras una recarga."""
+    st.session_state.job_id = job_id
+    if job_id:
+        st.query_params["job"] = job_id
+    elif "job" in st.query_params:
+        del st.query_params["job"]
+
+def _prepare_uploaded_data(uploaded_file: Any, columns: List[str], config: Dict[str, Any]) -> Tuple[bool, str, pd.DataFrame]:
+    """
+    Carga y valida el archivo subido una sola vez por archivo y opciones de limpieza.
+
+    El DataFrame preparado se guarda en el almacén compartido y la sesión conserva solo su clave;
+    al cambiar de archivo u opciones, la sesión libera el anterior.
+
+    Args:
+        uploaded_file: Archivo subido
+        columns: Columnas necesarias para el análisis
+        config: Configuración seleccionada en la barra lateral
+
+    Returns:
+        Tupla con (éxito, mensaje, DataFrame preparado)
+    """
+    file_id = getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{uploaded_file.size}"
+    key = f"upload:{file_id}:{','.join(columns)}:{config['min_comment_length']}:{config['language']}"
+    owner = current_session_id()
+
+    previous_key = st.session_state.get("data_key")
+    if previous_key and previous_key != key:
+        result_store.release(previous_key, owner)
+    st.session_state.data_key = key
+
+    def load() -> Tuple[bool, str, pd.DataFrame]:
+        df = load_dataframe(uploaded_file, uploaded_file.name, columns)
+        return validate_and_prepare_dataframe(
+            df,
+            comment_column="Cuerpo",
+            min_length=config['min_comment_length'],
+            language=config['language']
+        )
+
+    return result_store.get_or_load(key, load, owner)
+
+def render_analysis_results(results: Dict[str, Any]) -> None:
+    """
+    Muestra los resultados de un análisis completado.
+    
+    Args:
+        results: Resultado serializado del trabajo de análisis
+    """
+    total_comments = results["total_comments"]
+    token_counts = results["token_counts"]
+    
+    # Mostrar mensaje de éxito
+    st.success(f"✅ Análisis completado: {total_comments} comentarios procesados en {results['chunks_count']} grupos")
+    coverage_display(results.get("coverage"), results.get("failed_chunks", []))
+    
+    # Mostrar métricas generales
+    metrics_display(
+        total_comments=total_comments,
+        tokens_reasoning=token_counts["tokens_reasoning"],
+        total_tokens=token_counts["total_tokens"],
+        input_tokens_saved=token_counts.get("input_tokens_saved", 0),
+        input_tokens=token_counts.get("input_tokens", 0),
+        cached_tokens=token_counts.get("cached_tokens", 0),
+        hedged_requests=token_counts.get("hedged_requests", 0),
+        hedge_wins=token_counts.get("hedge_wins", 0)
+    )
+    
+    # Separador
+    st.markdown("---")
+    
+    # Mostrar frecuencia de temas medida localmente
+    if results.get("theme_frequencies"):
+        theme_clusters_display(results["theme_frequencies"])
+        st.markdown("---")
+    
+    # Mostrar los comentarios de cada tema (del informe y de los clusters locales)
+    themes = [{"name": theme["name"]} for theme in results["metrics"].get("top_themes", [])]
+    themes += [
+        {"name": ", ".join(cluster["terms"][:3]), "terms": cluster["terms"]}
+        for cluster in results.get("theme_frequencies", [])
+    ]
+    if themes:
+        theme_drilldown_display(
+            themes,
+            lambda name, terms: theme_index_store.drilldown(
+                results.get("report_hash"), name, terms, owner=current_session_id()
+            )
+        )
+        st.markdown("---")
+    
+    # Mostrar tendencia por periodos
+    if results.get("period_results"):
+        trend_display(results["period_results"])
+        st.markdown("---")
+    
+    # Mostrar resultados por producto
+    if results.get("group_results"):
+        group_results_display(results["group_results"])
+        st.markdown("---")
+    
+    if results.get("export_files"):
+        st.caption("Exportación estructurada: " + ", ".join(f"`{path}`" for path in results["export_files"].values()))
+    
+    try:
+        # Mostrar resultados en pestañas
+        results_tabs(
+            analysis_text=results["analysis_text"],
+            metrics=results["metrics"],
+            formatted_sections=results["formatted_sections"],
+            report_text=results.get("report_text"),
+            report_hash=results.get("report_hash")
+        )
+    except Exception as processing_error:
+        logger.error(f"Error al mostrar resultados: {str(processing_error)}")
+        st.error("Se completó el análisis, pero hubo un error al procesar los resultados para visualización")
+        st.text_area("Análisis en texto plano:", results["analysis_text"], height=400)
+
+def render_job_status(job_id: str) -> None:
+    """
+    Muestra el estado de un trabajo en segundo plano y vuelve a consultar mientras se ejecuta.
+    
+    Args:
+        job_id: Identificador del trabajo
+    """
+    job = job_manager.get_job(job_id, owner=current_session_id())
+    if job is None:
+        st.warning("No se encontró el análisis solicitado. Es posible que se haya eliminado.")
+        _set_active_job_id(None)
+        return
+    
+    for error in job["errors"]:
+        st.error(error)
+    
+    if job["status"] in ("queued", "running"):
+        progress_bar, progress_text, update_progress = progress_tracker(job["total_steps"])
+        update_progress(job["step"], job["message"])
+        queue_status_display(job.get("queue_position"), job.get("eta_seconds"))
+        st.caption("El análisis continúa en el servidor aunque cierres o recargues la página.")
+        if job.get("subscribers", 1) > 1:
+            st.caption(f"🔗 Este análisis atiende {job['subscribers']} solicitudes idénticas; comparten progreso y resultado.")
+        partial_results_display(job.get("partial"))
+        
+        # Consultar de nuevo el estado del trabajo: app.py espera y repite el renderizado fuera del perfil
+        st.session_state.poll_job = True
+        return
+    
+    if job["status"] == "failed":
+        st.error(job["message"])
+    elif job["result"] is None:
+        st.warning("El resultado de este análisis ya no está disponible. Vuelve a subir el archivo para repetirlo.")
+    else:
+        results = job["result"]
+        
+        if results.get("retryable") and st.button("🔁 Reintentar solo los grupos fallidos"):
+            retry_job_id = job_manager.retry_failed_chunks(job_id)
+            if retry_job_id:
+                _set_active_job_id(retry_job_id)
+                st.rerun()
+            st.warning("Los datos de este análisis ya no están disponibles; vuelve a subir el archivo para repetirlo.")
+        
+        render_analysis_results(results)
+        
+        # Guardar en la sesión solo la referencia al resultado; el contenido está en el almacén compartido
+        st.session_state.analysis_results = {
+            "job_id": job_id,
+            "total_comments": results["total_comments"],
+            "timestamp": job["finished_at"]
+        }
+    
+    if st.button("🗑️ Cerrar resultados"):
+        job_manager.release(job_id, current_session_id())
+        st.session_state.analysis_results = None
+        _set_active_job_id(None)
+        st.rerun()
+
 def render_main_page() -> None:
     """Renderiza la página principal de la aplicación."""
     # Título y descripción
@@ -38,158 +228,127 @@ def render_main_page() -> None:
     # Cargar configuración desde la barra lateral
     config = render_sidebar()
     
+    # Trabajo en curso o terminado de esta sesión (o recuperado de la URL)
+    active_job_id = _get_active_job_id()
+    
     # Área para subir archivo
     uploaded_file = st.file_uploader(
-        "Arrastra y suelta tu archivo CSV con comentarios", 
-        type=["csv"], 
+        "Arrastra y suelta tu archivo con comentarios (CSV, Parquet, Arrow/Feather o Excel)", 
+        type=SUPPORTED_INPUT_FORMATS, 
         help="El archivo debe contener una columna 'Cuerpo' con los comentarios"
     )
     
-    if not uploaded_file:
+    # Liberar los datos del archivo anterior cuando se quita de la página
+    if not uploaded_file and st.session_state.get("data_key"):
+        result_store.release(st.session_state.data_key, current_session_id())
+        st.session_state.data_key = None
+    
+    if not uploaded_file and not active_job_id:
         # Mostrar área de subida y ejemplo
         upload_area(help_text="El archivo debe contener una columna llamada 'Cuerpo' con los comentarios de los clientes")
         display_example_dataframe()
         display_instructions()
         return
     
-    # Procesar archivo subido
     try:
-        # Cargar DataFrame
-        df = pd.read_csv(uploaded_file)
-        
-        # Validar y preparar datos
-        success, message, df_cleaned = validate_and_prepare_dataframe(df, comment_column="Cuerpo")
-        
-        if not success:
-            st.error(message)
-            return
-        
-        # Mostrar vista previa
-        total_comments = len(df_cleaned)
-        st.markdown(f"### 📋 Vista previa ({total_comments} comentarios)")
-        st.dataframe(df_cleaned.head(5), hide_index=True)
-        
-        # Botón para iniciar análisis
-        if st.button("🔍 Analizar comentarios", type="primary"):
-            if not config['api_key_status']:
-                st.error("Por favor, configura tu API Key de OpenAI en el archivo .env o ingrésala en el panel lateral")
-                return
-            
-            # Iniciar análisis
-            with st.spinner("Preparando análisis..."):
-                # Dividir en chunks
-                chunks, total_comments = split_dataframe_into_chunks(
-                    df_cleaned, 
-                    comment_column="Cuerpo",
-                    chunk_size=config['chunk_size'],
-                    max_comments=config['max_comments']
-                )
-            
-            # Crear sistema de seguimiento de progreso
-            total_steps = len(chunks) + 1  # +1 para el análisis final
-            progress_bar, progress_text, update_progress = progress_tracker(total_steps)
-            
-            # Procesar chunks
-            chunk_analyses = []
-            
-            for i, chunk in enumerate(chunks):
-                update_progress(i, f"Analizando grupo {i+1} de {len(chunks)} ({len(chunk)} comentarios)...")
-                
-                # Análisis del chunk
-                chunk_result = openai_service.analyze_comments_chunk(
-                    chunk,
-                    system_prompt=config['system_prompt'],
-                    model=config['model'],
-                    reasoning_effort=config['reasoning_effort']
-                )
-                
-                # Verificar si hubo errores
-                if chunk_result.get("error", False):
-                    st.error(f"Error al analizar grupo {i+1}: {chunk_result.get('analysis', 'Error desconocido')}")
-                    continue
-                
-                chunk_analyses.append(chunk_result)
-                
-                # Actualizar barra de progreso
-                update_progress(i + 1, f"Grupo {i+1} de {len(chunks)} completado")
-            
-            # Análisis final
-            update_progress(len(chunks), "Generando análisis final...")
+        if uploaded_file:
+            # Cargar solo las columnas que necesita el análisis
+            columns = ["Cuerpo"]
+            if config['trend_enabled']:
+                columns.append(config['date_column'])
+            if config['group_enabled']:
+                columns.append(config['group_column'])
+            success, message, df_cleaned = _prepare_uploaded_data(uploaded_file, columns, config)
             
-            with st.spinner("Generando análisis final..."):
-                final_analysis = openai_service.generate_final_analysis(
-                    chunk_analyses,
-                    total_comments=total_comments,
-                    chunks_count=len(chunks),
-                    system_prompt=config['system_prompt'],
-                    model=config['model'],
-                    reasoning_effort=config['reasoning_effort']
-                )
-            
-            # Actualizar progreso final
-            update_progress(total_steps, "Análisis completado")
-            
-            # Verificar si el análisis final tuvo errores
-            if final_analysis.get("error", False):
-                st.error(f"Error en el análisis final: {final_analysis.get('analysis', 'Error desconocido')}")
+            if not success:
+                st.error(message)
                 return
             
-            # Mostrar mensaje de éxito
-            st.success(f"✅ Análisis completado: {total_comments} comentarios procesados en {len(chunks)} grupos")
+            # Verificar la columna de fecha si se solicita el análisis temporal
+            if config['trend_enabled'] and config['date_column'] not in df_cleaned.columns:
+                st.error(f"El archivo debe contener una columna '{config['date_column']}' para el análisis temporal")
+                return
             
-            # Calcular totales de tokens
-            token_counts = calculate_total_tokens(chunk_analyses + [final_analysis])
+            # Verificar la columna de agrupación si se solicita el análisis por producto
+            if config['group_enabled'] and config['group_column'] not in df_cleaned.columns:
+                st.error(f"El archivo debe contener una columna '{config['group_column']}' para el análisis por producto")
+                return
             
-            # Mostrar métricas generales
-            metrics_display(
-                total_comments=total_comments,
-                tokens_reasoning=token_counts["tokens_reasoning"],
-                total_tokens=token_counts["total_tokens"]
-            )
+            if config['trend_enabled'] and config['group_enabled']:
+                st.error("El análisis temporal y el análisis por producto no se pueden combinar. Elige solo uno en el panel lateral")
+                return
             
-            # Separador
-            st.markdown("---")
+            # Mostrar vista previa
+            total_comments = len(df_cleaned)
+            st.markdown(f"### 📋 Vista previa ({total_comments} comentarios)")
+            st.dataframe(df_cleaned.head(5), hide_index=True)
             
-            # Procesar y guardar resultados
-            try:
-                # Extraer métricas para visualización
-                metrics = extract_metrics_from_analysis(final_analysis["analysis"])
-                
-                # Extraer secciones clave
-                sections = extract_key_sections(final_analysis["analysis"])
-                
-                # Formatear secciones para mejor presentación
-                formatted_sections = format_analysis_sections(sections)
-                
-                # Guardar análisis en archivo
-                filename = file_service.save_analysis_to_file(final_analysis["analysis"])
+            # Botón para iniciar análisis
+            if st.button("🔍 Analizar comentarios", type="primary"):
+                if config['backend'] == "openai" and not config['api_key_status']:
+                    st.error("Por favor, configura tu API Key de OpenAI en el archivo .env o ingrésala en el panel lateral")
+                    return
                 
-                # Mostrar resultados en pestañas
-                results_tabs(
-                    analysis_text=final_analysis["analysis"],
-                    metrics=metrics,
-                    formatted_sections=formatted_sections,
-                    filepath=filename
+                # Enviar el análisis al trabajador en segundo plano
+                active_job_id = job_manager.submit(
+                    df_cleaned,
+                    config,
+                    comment_column="Cuerpo",
+                    user=config['user'],
+                    priority=config['priority']
                 )
-                
-                # Guardar resultados en estado de sesión para referencia futura
-                st.session_state.analysis_results = {
-                    "analysis_text": final_analysis["analysis"],
-                    "metrics": metrics,
-                    "token_counts": token_counts,
-                    "total_comments": total_comments,
-                    "timestamp": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                
-            except Exception as processing_error:
-                logger.error(f"Error al procesar resultados: {str(processing_error)}")
-                st.error("Se completó el análisis, pero hubo un error al procesar los resultados para visualización")
-                st.text_area("Análisis en texto plano:", final_analysis["analysis"], height=400)
+                _set_active_job_id(active_job_id)
+        
+        if active_job_id:
+            render_job_status(active_job_id)
     
     except Exception as e:
         logger.error(f"Error al procesar archivo: {str(e)}", exc_info=True)
         error_message(e)
 
+def render_search_page() -> None:
+    """Renderiza la búsqueda de texto completo sobre informes y comentarios de análisis anteriores."""
+    st.title("🔎 Búsqueda en Análisis Anteriores")
+    st.markdown("Encuentra qué análisis mencionaron un tema y los comentarios que lo contienen.")
+    
+    # Incorporar al índice los informes guardados antes de que existiera
+    search_index.backfill_reports()
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        query = st.text_input(
+            "Buscar",
+            placeholder='Ejemplo: "aceite de coco" o azúc*',
+            help="Las palabras entre comillas se buscan como frase; un * final busca por prefijo. "
+                 "No distingue mayúsculas ni tildes."
+        )
+    with col2:
+        kind_label = st.radio("Buscar en", ["Comentarios", "Informes"], horizontal=True)
+    
+    stats = search_index.stats()
+    st.caption(
+        f"Índice: {stats['runs']} análisis, {stats['sections']} secciones de informe y "
+        f"{stats['comments']:,} comentarios".replace(",", ".")
+    )
+    
+    if not query.strip():
+        return
+    
+    kind = "comments" if kind_label == "Comentarios" else "reports"
+    results = search_index.search(query, kind=kind)
+    if results.get("error"):
+        st.error("La búsqueda no es válida. Revisa las comillas y los caracteres especiales.")
+        return
+    
+    st.markdown(f"**{results['total']:,} coincidencias** ({results['seconds'] * 1000:.0f} ms)".replace(",", "."))
+    if results["total"] > len(results["hits"]):
+        st.caption(f"Se muestran las {len(results['hits'])} más relevantes.")
+    
+    for hit in results["hits"]:
+        location = f"comentario {hit['location'] + 1}" if kind == "comments" else f"sección {hit['location']}"
+        st.markdown(f"{hit['snippet']}")
+        st.caption(f"Análisis {hit['run_id']} ({hit['created_at']}) · {location} · `{hit['report_path']}`")
+
 def render_help_page() -> None:
     """Renderiza la página de ayuda."""
     st.title("📚 Ayuda y Documentación")
@@ -210,9 +369,9 @@ def render_help_page() -> None:
     - **Segmentación de clientes**: Identifica diferentes segmentos según sus preferencias
     - **Recomendaciones accionables**: Obtén acciones concretas para mejorar la satisfacción del cliente
     
-    ### 📋 Requisitos del archivo CSV
+    ### 📋 Requisitos del archivo
     
-    El archivo CSV debe contener al menos una columna llamada 'Cuerpo' (o el nombre que especifiques 
+    El archivo (CSV, Parquet, Arrow/Feather o Excel) debe contener al menos una columna llamada 'Cuerpo' (o el nombre que especifiques 
     en la configuración) que contenga los comentarios a analizar.
     
     ### ⚙️ Opciones de configuración
@@ -255,8 +414,9 @@ def render_help_page() -> None:
         
         **P: ¿Qué formatos de archivo son compatibles?**
         
-        R: Actualmente solo se admiten archivos CSV. Asegúrate de que tu archivo tenga 
-        una columna con los comentarios.
+        R: CSV, Parquet, Arrow/Feather y Excel (.xlsx). Los formatos Parquet y Arrow se leen
+        directamente y solo se cargan las columnas que necesita el análisis, por lo que no hace
+        falta convertirlos a CSV. Asegúrate de que tu archivo tenga una columna con los comentarios.
         """)
 
 # Puedes añadir más funciones para renderizar páginas adicionales según sea necesario
\ No newline at end of file
@@ -5,14 +5,36 @@ import os
 import streamlit as st
 import logging
 from typing import Dict, Any, Tuple
+from utils.clustering import SKLEARN_AVAILABLE
 from config.settings import (
     DEFAULT_CHUNK_SIZE, MIN_CHUNK_SIZE, MAX_CHUNK_SIZE, 
-    DEFAULT_SYSTEM_PROMPT, DEFAULT_MODEL, DEFAULT_REASONING_EFFORT
+    DEFAULT_SYSTEM_PROMPT, DEFAULT_MODEL, DEFAULT_REASONING_EFFORT,
+    DEFAULT_DATE_COLUMN, PERIOD_FREQUENCIES, DEFAULT_GROUP_COLUMN,
+    JOB_PRIORITIES, DEFAULT_USER, HEDGE_PERCENTILE, HEDGE_MAX_EXTRA_FRACTION,
+    MIN_COMMENT_LENGTH, LANGUAGE_FILTERS, ANALYSIS_BACKENDS, DEFAULT_BACKEND, LOCAL_MODEL_PATH
 )
+from services.analysis_backend import get_backend
+from services.result_store import result_store, current_session_id, process_rss
 
 # Configurar logger
 logger = logging.getLogger(__name__)
 
+def resolve_user(name: str) -> str:
+    """
+    Identidad de la sesión en el reparto equitativo de peticiones.
+
+    Args:
+        name: Nombre indicado en la barra lateral (puede estar vacío)
+
+    Returns:
+        El nombre o, si está vacío, un identificador propio de la sesión de Streamlit
+    """
+    name = name.strip()
+    if name:
+        return name
+    session_id = current_session_id()
+    return f"sesion-{session_id[:12]}" if session_id else DEFAULT_USER
+
 def render_sidebar() -> Dict[str, Any]:
     """
     Renderiza la barra lateral con opciones de configuración.
@@ -33,6 +55,37 @@ def render_sidebar() -> Dict[str, Any]:
             os.environ["OPENAI_API_KEY"] = api_key
             logger.info("API Key configurada manualmente")
     
+    # Motor de análisis: API de OpenAI o modelo local en CPU
+    backend_labels = list(ANALYSIS_BACKENDS.keys())
+    backend_label = st.sidebar.selectbox(
+        "Motor de análisis",
+        options=backend_labels,
+        index=list(ANALYSIS_BACKENDS.values()).index(DEFAULT_BACKEND) if DEFAULT_BACKEND in ANALYSIS_BACKENDS.values() else 0,
+        help=(
+            "El modelo local clasifica el sentimiento en CPU, sin conexión ni coste de API, y construye el informe "
+            f"a partir de los recuentos (requiere 'transformers' y un modelo en '{LOCAL_MODEL_PATH}')"
+        )
+    )
+    backend = ANALYSIS_BACKENDS[backend_label]
+    # get_backend importa el motor local (y transformers/onnxruntime) solo cuando se selecciona
+    if backend == "local" and not get_backend("local").is_available():
+        st.sidebar.warning(f"⚠️ Modelo local no disponible: instala 'transformers' y copia el modelo en '{LOCAL_MODEL_PATH}'")
+    
+    # Identificación para el reparto equitativo entre usuarios del servidor
+    user = st.sidebar.text_input(
+        "👤 Usuario (opcional)",
+        value="",
+        placeholder="Esta sesión",
+        help="Las peticiones a la API se reparten de forma equitativa entre los usuarios con análisis en curso. "
+             "Si lo dejas vacío, esta sesión cuenta como un usuario propio; con un nombre, todas tus sesiones "
+             "comparten su parte"
+    )
+    priority_label = st.sidebar.selectbox(
+        "Prioridad del análisis",
+        options=list(JOB_PRIORITIES.keys()),
+        help="Los análisis con mayor prioridad reciben una parte mayor del presupuesto de peticiones"
+    )
+    
     # Parámetros de procesamiento
     chunk_size = st.sidebar.slider(
         "Tamaño de cada chunk de comentarios", 
@@ -49,6 +102,74 @@ def render_sidebar() -> Dict[str, Any]:
         help="Limita el número total de comentarios a analizar (0 para analizar todos)"
     )
     
+    min_comment_length = st.sidebar.number_input(
+        "Longitud mínima del comentario",
+        min_value=1,
+        value=MIN_COMMENT_LENGTH,
+        help="Descarta los comentarios con menos caracteres (por ejemplo, 'ok' o '👍')"
+    )
+    
+    language_label = st.sidebar.selectbox(
+        "Idioma de los comentarios",
+        options=list(LANGUAGE_FILTERS.keys()),
+        help="Descarta los comentarios que no parecen escritos en el idioma elegido"
+    )
+    
+    topic_clustering = st.sidebar.checkbox(
+        "Agrupar comentarios por temas",
+        value=False,
+        disabled=not SKLEARN_AVAILABLE,
+        help="Agrupa localmente los comentarios similares antes de dividirlos en chunks (requiere scikit-learn)"
+    )
+    
+    hedge_requests = st.sidebar.checkbox(
+        "Duplicar peticiones lentas",
+        value=False,
+        help=(
+            f"Si un chunk tarda más que el {HEDGE_PERCENTILE:.0%} de las peticiones recientes, lanza una copia "
+            f"y usa la primera respuesta (como máximo un {HEDGE_MAX_EXTRA_FRACTION:.0%} de peticiones extra)"
+        )
+    )
+    
+    # Análisis temporal
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### 📅 Análisis temporal")
+    
+    trend_enabled = st.sidebar.checkbox(
+        "Analizar tendencia por periodos",
+        value=False,
+        help="Analiza los comentarios por periodos y reutiliza los periodos ya analizados"
+    )
+    date_column = DEFAULT_DATE_COLUMN
+    period_label = list(PERIOD_FREQUENCIES.keys())[0]
+    if trend_enabled:
+        date_column = st.sidebar.text_input(
+            "Columna de fecha",
+            value=DEFAULT_DATE_COLUMN,
+            help="Nombre de la columna del CSV que contiene la fecha de cada comentario"
+        )
+        period_label = st.sidebar.selectbox(
+            "Periodo",
+            options=list(PERIOD_FREQUENCIES.keys())
+        )
+    
+    # Análisis por producto
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### 📦 Análisis por producto")
+    
+    group_enabled = st.sidebar.checkbox(
+        "Agrupar por columna",
+        value=False,
+        help="Analiza cada producto por separado y en paralelo, y genera un resumen comparativo"
+    )
+    group_column = DEFAULT_GROUP_COLUMN
+    if group_enabled:
+        group_column = st.sidebar.text_input(
+            "Columna de agrupación",
+            value=DEFAULT_GROUP_COLUMN,
+            help="Nombre de la columna del CSV que identifica el producto (por ejemplo, SKU)"
+        )
+    
     # Sistema de instrucciones personalizado
     st.sidebar.markdown("---")
     st.sidebar.markdown("### 📝 Personalizar instrucciones")
@@ -72,17 +193,56 @@ def render_sidebar() -> Dict[str, Any]:
         de clientes y extraer insights accionables.
         """)
     
+    # Opciones de diagnóstico, visibles solo con ?debug=1 en la URL
+    if st.query_params.get("debug") == "1":
+        st.sidebar.checkbox(
+            "Perfilar ejecuciones",
+            key="profile_runs",
+            help="Guarda en logs/profiles un perfil por muestreo (flamegraph y resumen de CPU y esperas) "
+                 "de cada renderizado y de cada análisis que se lance"
+        )
+        
+        # Memoria del almacén compartido: total, por sesión y del proceso
+        with st.sidebar.expander("🧠 Memoria", expanded=False):
+            stats = result_store.stats()
+            usage = result_store.usage_by_owner()
+            rss = process_rss()
+            st.markdown(
+                f"- Esta sesión: **{usage.get(current_session_id(), 0) / 2**20:.1f} MB**\n"
+                f"- Almacén compartido: {stats['bytes'] / 2**20:.1f} de {stats['max_bytes'] / 2**20:.0f} MB "
+                f"({stats['entries']} datos, {stats['evictions']} expulsiones)\n"
+                f"- Sesiones con datos: {len(usage)}\n"
+                + (f"- Proceso (RSS): {rss / 2**20:.0f} MB" if rss else "")
+            )
+    
     # Recopilar todas las opciones en un diccionario usando valores por defecto para opciones avanzadas
     config = {
         "api_key_status": bool(api_key),
+        "user": resolve_user(user),
+        "priority": JOB_PRIORITIES[priority_label],
         "chunk_size": chunk_size,
         "max_comments": max_comments,
+        "min_comment_length": min_comment_length,
+        "language": LANGUAGE_FILTERS[language_label],
+        "backend": backend,
         "model": DEFAULT_MODEL,
         "reasoning_effort": DEFAULT_REASONING_EFFORT,
         "column_name": "Cuerpo",  # Valor fijo
+        "topic_clustering": topic_clustering,
+        "hedge_requests": hedge_requests,
+        "profile": st.session_state.get("profile_runs", False),
+        "trend_enabled": trend_enabled,
+        "date_column": date_column,
+        "period_frequency": PERIOD_FREQUENCIES[period_label],
+        "group_enabled": group_enabled,
+        "group_column": group_column,
         "system_prompt": system_prompt,
         "output_format": "TXT"  # Valor fijo
     }
     
-    logger.info(f"Configuración cargada: {', '.join(f'{k}={v}' for k, v in config.items() if k != 'system_prompt' and k != 'api_key_status')}")
+    # Registrar la configuración solo cuando cambia, no en cada renderizado
+    config_summary = ', '.join(f'{k}={v}' for k, v in config.items() if k != 'system_prompt' and k != 'api_key_status')
+    if st.session_state.get("logged_config") != config_summary:
+        st.session_state.logged_config = config_summary
+        logger.info(f"Configuración cargada: {config_summary}")
     return config
\ No newline at end of file
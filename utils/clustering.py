@@ -0,0 +1,139 @@
+"""
+Utilidades para agrupar comentarios por temas de forma local.
+Vectoriza los comentarios con TF-IDF y los agrupa con mini-batch k-means para formar chunks temáticamente coherentes.
+"""
+import logging
+import math
+from typing import Iterable, List, Tuple, Dict, Any
+
+import numpy as np
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.cluster import MiniBatchKMeans
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+from config.settings import MAX_TOPIC_CLUSTERS, TOPIC_MAX_FEATURES
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Palabras vacías en español que no aportan información temática
+SPANISH_STOP_WORDS = [
+    "a", "al", "algo", "algunas", "algunos", "ante", "antes", "como", "con", "contra", "cual", "cuando",
+    "de", "del", "desde", "donde", "durante", "e", "el", "ella", "ellas", "ellos", "en", "entre", "era",
+    "es", "esa", "esas", "ese", "eso", "esos", "esta", "estaba", "estas", "este", "esto", "estos", "fue",
+    "ha", "hay", "la", "las", "le", "les", "lo", "los", "me", "mi", "mis", "mucho", "muy", "más", "nada",
+    "ni", "no", "nos", "o", "otra", "otro", "para", "pero", "poco", "por", "porque", "que", "qué", "se",
+    "sea", "ser", "si", "sin", "sobre", "son", "su", "sus", "también", "tan", "te", "tiene", "todo",
+    "todos", "tu", "un", "una", "uno", "unos", "y", "ya", "yo", "él", "sí"
+]
+
+def estimate_cluster_count(total_comments: int, chunk_size: int) -> int:
+    """
+    Estima el número de clusters para que cada uno ocupe aproximadamente un chunk.
+
+    Args:
+        total_comments: Número total de comentarios
+        chunk_size: Tamaño de cada chunk
+
+    Returns:
+        Número de clusters a utilizar
+    """
+    return max(2, min(MAX_TOPIC_CLUSTERS, math.ceil(total_comments / chunk_size)))
+
+def cluster_comments(comments: Iterable[str], n_clusters: int, random_state: int = 42) -> Tuple[List[int], List[Dict[str, Any]]]:
+    """
+    Agrupa los comentarios por similitud léxica.
+
+    Args:
+        comments: Comentarios (lista o columna de un DataFrame)
+        n_clusters: Número de clusters deseado
+        random_state: Semilla para obtener resultados reproducibles
+
+    Returns:
+        Tupla con (etiqueta_de_cluster_por_comentario, información_de_cada_cluster).
+        La información incluye el tamaño, el porcentaje y los términos más representativos.
+    """
+    if not SKLEARN_AVAILABLE:
+        raise ImportError("scikit-learn no está instalado; no se puede agrupar por temas")
+
+    vectorizer = TfidfVectorizer(
+        max_features=TOPIC_MAX_FEATURES,
+        stop_words=SPANISH_STOP_WORDS,
+        token_pattern=r"(?u)\b[^\W\d_]{3,}\b",
+        sublinear_tf=True
+    )
+    # Se vectoriza recorriendo los comentarios, sin crear una lista con todos ellos
+    matrix = vectorizer.fit_transform(str(comment) for comment in comments)
+
+    n_clusters = min(n_clusters, matrix.shape[0])
+    model = MiniBatchKMeans(
+        n_clusters=n_clusters,
+        random_state=random_state,
+        batch_size=1024,
+        n_init=3
+    )
+    labels = model.fit_predict(matrix).tolist()
+
+    terms = vectorizer.get_feature_names_out()
+    sizes = [0] * n_clusters
+    for label in labels:
+        sizes[label] += 1
+
+    clusters = []
+    for k in range(n_clusters):
+        top_indices = model.cluster_centers_[k].argsort()[::-1][:5]
+        clusters.append({
+            "cluster": k,
+            "size": sizes[k],
+            "percentage": 100 * sizes[k] / len(labels),
+            "terms": [terms[i] for i in top_indices]
+        })
+
+    logger.info(f"Comentarios agrupados en {n_clusters} clusters temáticos")
+    return labels, clusters
+
+def build_topic_chunk_order(labels: List[int], chunk_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ordena los comentarios por clusters para formar chunks de un mismo tema, sin copiar el texto.
+
+    Los clusters más grandes van primero y, dentro de cada uno, se mantiene el orden del archivo.
+    Los restos de cada cluster que no llenan un chunk se agrupan al final, ordenados por cluster.
+
+    Args:
+        labels: Cluster asignado a cada comentario
+        chunk_size: Tamaño de cada chunk
+
+    Returns:
+        Tupla con (posición_de_cada_comentario_en_el_nuevo_orden, inicio_de_cada_chunk_más_el_total)
+    """
+    labels = np.asarray(labels)
+    clusters, first_seen, inverse, sizes = np.unique(
+        labels, return_index=True, return_inverse=True, return_counts=True
+    )
+    # Los clusters más grandes primero; a igual tamaño, el que aparece antes en el archivo
+    cluster_order = np.lexsort((first_seen, -sizes))
+    rank = np.empty(len(clusters), dtype=np.int64)
+    rank[cluster_order] = np.arange(len(clusters))
+    by_cluster = np.argsort(rank[inverse], kind="stable")
+
+    full_parts = []
+    leftover_parts = []
+    offset = 0
+    for size in sizes[cluster_order]:
+        full = size - size % chunk_size
+        full_parts.append(by_cluster[offset:offset + full])
+        leftover_parts.append(by_cluster[offset + full:offset + size])
+        offset += size
+
+    positions = np.concatenate(full_parts + leftover_parts)
+    total_full = sum(len(part) for part in full_parts)
+    bounds = np.concatenate([
+        np.arange(0, total_full, chunk_size, dtype=np.int64),
+        np.arange(total_full, len(positions), chunk_size, dtype=np.int64),
+        [len(positions)]
+    ])
+    return positions, bounds
@@ -1,20 +1,169 @@
 """
 Utilidades para el procesamiento de datos.
 """
+import os
+import hashlib
+import json
+import numpy as np
 import pandas as pd
 import logging
-from typing import List, Tuple, Optional, Dict, Any
+from collections.abc import Sequence
+from typing import IO, Iterable, Iterator, List, Tuple, Optional, Dict, Any
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from config.settings import MIN_COMMENT_LENGTH
+from utils.clustering import SKLEARN_AVAILABLE, cluster_comments, build_topic_chunk_order, estimate_cluster_count
 
 # Configurar logger
 logger = logging.getLogger(__name__)
 
-def validate_and_prepare_dataframe(df: pd.DataFrame, comment_column: str = 'Cuerpo') -> Tuple[bool, str, pd.DataFrame]:
+def _arrow_string_types(data_type: Any) -> Optional[pd.api.extensions.ExtensionDtype]:
+    """Convierte las columnas de texto de Arrow en `string[pyarrow]` sin pasar por objetos de Python."""
+    if pa.types.is_string(data_type) or pa.types.is_large_string(data_type):
+        return pd.StringDtype("pyarrow")
+    return None
+
+def _read_arrow_table(file: IO, extension: str, columns: List[str]) -> pd.DataFrame:
+    """
+    Lee un archivo Parquet o Arrow/Feather cargando solo las columnas solicitadas que existan.
+
+    Args:
+        file: Archivo abierto en modo binario
+        extension: Extensión del archivo ('parquet', 'feather' o 'arrow')
+        columns: Columnas a cargar
+
+    Returns:
+        DataFrame con las columnas de texto en `string[pyarrow]`
+    """
+    if extension == "parquet":
+        available = pq.ParquetFile(file).schema_arrow.names
+        file.seek(0)
+        projected = [c for c in columns if c in available]
+        table = pq.read_table(file, columns=projected)
+    else:
+        available = pa.ipc.open_file(file).schema.names
+        file.seek(0)
+        projected = [c for c in columns if c in available]
+        table = feather.read_table(file, columns=projected)
+
+    logger.info(f"Leídas {table.num_rows} filas y {len(projected)} de {len(available)} columnas ({extension})")
+    return table.to_pandas(types_mapper=_arrow_string_types)
+
+def load_dataframe(file: IO, filename: str, columns: List[str]) -> pd.DataFrame:
+    """
+    Carga un archivo de comentarios (CSV, Parquet, Arrow/Feather o Excel) leyendo solo las columnas necesarias.
+
+    Los formatos columnares se leen directamente con pyarrow, de modo que las columnas no
+    solicitadas no llegan a cargarse en memoria.
+
+    Args:
+        file: Archivo subido o abierto en modo binario
+        filename: Nombre del archivo, usado para detectar el formato
+        columns: Columnas necesarias (comentarios y, si procede, fecha o agrupación)
+
+    Returns:
+        DataFrame con las columnas solicitadas que existan en el archivo
+    """
+    extension = os.path.splitext(filename)[1].lower().lstrip(".")
+    wanted = set(columns)
+
+    if extension in ("parquet", "feather", "arrow"):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow no está instalado; no se pueden leer archivos Parquet ni Arrow")
+        return _read_arrow_table(file, extension, columns)
+
+    if extension == "xlsx":
+        return pd.read_excel(file, usecols=lambda column: column in wanted)
+
+    return pd.read_csv(file, usecols=lambda column: column in wanted)
+
+# Palabras funcionales frecuentes que delatan el idioma de un comentario
+LANGUAGE_MARKERS = {
+    "es": r"\b(?:de|la|que|el|en|los|las|del|se|por|con|una|para|es|muy|pero|más|mas|lo|al|no|me)\b",
+    "en": r"\b(?:the|and|is|it|to|of|that|this|was|for|with|not|but|very|my|you|are|have)\b"
+}
+
+# Tipo de texto usado en la limpieza: Arrow si está disponible, cadenas de pandas en otro caso
+STRING_DTYPE = "string[pyarrow]" if PYARROW_AVAILABLE else "string"
+
+def clean_comments(
+    df: pd.DataFrame,
+    comment_column: str = 'Cuerpo',
+    min_length: int = MIN_COMMENT_LENGTH,
+    language: Optional[str] = None
+) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Limpia la columna de comentarios con operaciones vectorizadas sobre `string[pyarrow]`.
+
+    Convierte cualquier valor (números incluidos) a texto, recorta los espacios de los extremos
+    y descarta los comentarios vacíos, los más cortos que `min_length` y, si se indica, los que
+    no parecen escritos en `language`. Cada paso es un kernel de Arrow sobre la columna completa,
+    sin crear objetos de Python por fila. Los espacios interiores se normalizan al construir
+    el prompt (ver utils.text_normalization): una sustitución por expresión regular sobre toda
+    la columna cuesta varias veces más que el resto de la limpieza.
+
+    Args:
+        df: DataFrame con la columna de comentarios
+        comment_column: Nombre de la columna que contiene los comentarios
+        min_length: Longitud mínima (en caracteres) de un comentario válido
+        language: Código de idioma a conservar ('es' o 'en'), o None para no filtrar
+
+    Returns:
+        Tupla con (dataframe_limpio, filas_descartadas_por_motivo)
+    """
+    comments = df[comment_column].astype(STRING_DTYPE)
+    comments = comments.str.strip()
+    lengths = comments.str.len()
+
+    removed = {}
+    keep = comments.notna()
+    removed["nulos"] = int((~keep).sum())
+
+    non_empty = lengths > 0
+    removed["vacíos"] = int((keep & ~non_empty.fillna(False)).sum())
+    keep &= non_empty.fillna(False)
+
+    long_enough = lengths >= max(min_length, 1)
+    removed["cortos"] = int((keep & ~long_enough.fillna(False)).sum())
+    keep &= long_enough.fillna(False)
+
+    if language in LANGUAGE_MARKERS:
+        lowered = comments.str.lower()
+        own = lowered.str.count(LANGUAGE_MARKERS[language]).fillna(0)
+        other = sum(
+            lowered.str.count(pattern).fillna(0)
+            for code, pattern in LANGUAGE_MARKERS.items() if code != language
+        )
+        # Los comentarios sin marcadores de ningún idioma (muy cortos) se conservan
+        in_language = own >= other
+        removed["otro idioma"] = int((keep & ~in_language).sum())
+        keep &= in_language
+
+    keep = keep.astype(bool)
+    df_cleaned = df.assign(**{comment_column: comments})[keep.to_numpy()]
+    return df_cleaned, removed
+
+def validate_and_prepare_dataframe(
+    df: pd.DataFrame,
+    comment_column: str = 'Cuerpo',
+    min_length: int = MIN_COMMENT_LENGTH,
+    language: Optional[str] = None
+) -> Tuple[bool, str, pd.DataFrame]:
     """
     Valida y prepara un DataFrame para el análisis.
     
     Args:
         df: DataFrame a validar y preparar
         comment_column: Nombre de la columna que contiene los comentarios
+        min_length: Longitud mínima (en caracteres) de un comentario válido
+        language: Código de idioma a conservar ('es' o 'en'), o None para no filtrar
         
     Returns:
         Tupla con (éxito, mensaje, dataframe_procesado)
@@ -25,34 +174,137 @@ def validate_and_prepare_dataframe(df: pd.DataFrame, comment_column: str = 'Cuer
     
     # Verificar que la columna de comentarios existe
     if comment_column not in df.columns:
-        return False, f"El archivo CSV debe contener una columna '{comment_column}'", None
+        return False, f"El archivo debe contener una columna '{comment_column}'", None
     
     # Limpiar y preparar datos
     try:
-        # Eliminar filas con comentarios vacíos o nulos
-        df_cleaned = df.dropna(subset=[comment_column])
-        df_cleaned = df_cleaned[df_cleaned[comment_column].str.strip() != '']
+        df_cleaned, removed = clean_comments(df, comment_column, min_length=min_length, language=language)
         
         # Verificar que quedan comentarios para analizar
         if len(df_cleaned) == 0:
             return False, f"No hay comentarios válidos en la columna '{comment_column}'", None
         
-        logger.info(f"DataFrame preparado: {len(df_cleaned)} comentarios válidos")
-        return True, f"DataFrame preparado con éxito: {len(df_cleaned)} comentarios válidos", df_cleaned
+        discarded = ", ".join(f"{count} {reason}" for reason, count in removed.items() if count)
+        logger.info(f"DataFrame preparado: {len(df_cleaned)} comentarios válidos (descartados: {discarded or 'ninguno'})")
+        message = f"DataFrame preparado con éxito: {len(df_cleaned)} comentarios válidos"
+        if discarded:
+            message += f" (descartados: {discarded})"
+        return True, message, df_cleaned
     
     except Exception as e:
         logger.error(f"Error al preparar DataFrame: {str(e)}")
         return False, f"Error al preparar los datos: {str(e)}", None
 
+class CommentChunk(Sequence):
+    """
+    Chunk de comentarios que no copia el texto: solo guarda el rango de posiciones sobre la columna original.
+
+    Los comentarios se convierten en cadenas de Python al recorrer el chunk y se liberan después,
+    de modo que solo existen a la vez los de los chunks que se están analizando.
+    """
+
+    __slots__ = ("_comments", "_positions", "_start", "_stop")
+
+    def __init__(self, comments: pd.Series, start: int, stop: int, positions: Optional[np.ndarray] = None):
+        """
+        Inicializa el chunk.
+
+        Args:
+            comments: Columna de comentarios compartida por todos los chunks
+            start: Primera posición del chunk
+            stop: Posición siguiente a la última del chunk
+            positions: Permutación de las filas (chunks temáticos); None para el orden del archivo
+        """
+        self._comments = comments
+        self._positions = positions
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def tolist(self) -> List[str]:
+        """Materializa los comentarios del chunk."""
+        if self._positions is None:
+            return self._comments.iloc[self._start:self._stop].tolist()
+        return self._comments.iloc[self._positions[self._start:self._stop]].tolist()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.tolist())
+
+    def __getitem__(self, index):
+        return self.tolist()[index]
+
+    def __repr__(self) -> str:
+        return f"CommentChunk({len(self)} comentarios)"
+
+class CommentChunks(Sequence):
+    """
+    Secuencia de chunks sobre una única columna de comentarios.
+
+    Cada chunk es un CommentChunk que referencia un rango de filas, así que dividir un archivo
+    no duplica su texto; el orden temático se representa con una permutación de enteros.
+    """
+
+    def __init__(
+        self,
+        comments: pd.Series,
+        chunk_size: int,
+        positions: Optional[np.ndarray] = None,
+        bounds: Optional[np.ndarray] = None
+    ):
+        """
+        Inicializa la secuencia de chunks.
+
+        Args:
+            comments: Columna de comentarios
+            chunk_size: Tamaño de cada chunk
+            positions: Permutación de las filas (chunks temáticos); None para el orden del archivo
+            bounds: Inicio de cada chunk sobre la permutación, más el total al final;
+                por defecto, cortes cada `chunk_size` comentarios
+        """
+        self._comments = comments
+        self._positions = positions
+        total = len(comments)
+        if bounds is None:
+            bounds = np.append(np.arange(0, total, chunk_size, dtype=np.int64), total)
+        self._bounds = bounds
+
+    def __len__(self) -> int:
+        return len(self._bounds) - 1
+
+    def __getitem__(self, index: int) -> CommentChunk:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("índice de chunk fuera de rango")
+        return CommentChunk(self._comments, int(self._bounds[index]), int(self._bounds[index + 1]), self._positions)
+
+    def sizes(self) -> np.ndarray:
+        """Número de comentarios de cada chunk."""
+        return np.diff(self._bounds)
+
+    def ordered_comments(self) -> pd.Series:
+        """Comentarios en el orden de los chunks (la propia columna si se sigue el orden del archivo)."""
+        comments = self._comments if self._positions is None else self._comments.iloc[self._positions]
+        return comments.reset_index(drop=True)
+
+    def __repr__(self) -> str:
+        return f"CommentChunks({len(self)} chunks, {len(self._comments)} comentarios)"
+
 def split_dataframe_into_chunks(
     df: pd.DataFrame, 
     comment_column: str = 'Cuerpo', 
     chunk_size: int = 50,
     max_comments: int = 0
-) -> Tuple[List[List[str]], int]:
+) -> Tuple[CommentChunks, int]:
     """
     Divide un DataFrame en chunks para su procesamiento.
     
+    Los chunks son vistas sobre la columna de comentarios: no se copia el texto.
+    
     Args:
         df: DataFrame a dividir
         comment_column: Nombre de la columna que contiene los comentarios
@@ -60,19 +312,17 @@ def split_dataframe_into_chunks(
         max_comments: Máximo número de comentarios a procesar (0 para todos)
         
     Returns:
-        Tupla con (lista_de_chunks, total_comentarios)
+        Tupla con (chunks, total_comentarios)
     """
     try:
         # Limitar número de comentarios si se especifica
+        comments = df[comment_column]
         if max_comments > 0:
-            df = df.head(max_comments)
-        
-        # Obtener lista de comentarios
-        comments = df[comment_column].tolist()
+            comments = comments.head(max_comments)
         total_comments = len(comments)
         
         # Dividir en chunks
-        chunks = [comments[i:i + chunk_size] for i in range(0, total_comments, chunk_size)]
+        chunks = CommentChunks(comments, chunk_size)
         
         logger.info(f"Datos divididos en {len(chunks)} chunks (total: {total_comments} comentarios)")
         return chunks, total_comments
@@ -81,6 +331,179 @@ def split_dataframe_into_chunks(
         logger.error(f"Error al dividir DataFrame en chunks: {str(e)}")
         raise
 
+def split_dataframe_into_topic_chunks(
+    df: pd.DataFrame, 
+    comment_column: str = 'Cuerpo', 
+    chunk_size: int = 50,
+    max_comments: int = 0
+) -> Tuple[CommentChunks, int, List[Dict[str, Any]]]:
+    """
+    Divide un DataFrame en chunks temáticamente coherentes agrupando antes los comentarios por clusters.
+    
+    Si la agrupación no es posible, se recurre a la división en el orden del archivo.
+    
+    Args:
+        df: DataFrame a dividir
+        comment_column: Nombre de la columna que contiene los comentarios
+        chunk_size: Tamaño de cada chunk
+        max_comments: Máximo número de comentarios a procesar (0 para todos)
+        
+    Returns:
+        Tupla con (chunks, total_comentarios, información_de_clusters)
+    """
+    comments = df[comment_column]
+    if max_comments > 0:
+        comments = comments.head(max_comments)
+    total_comments = len(comments)
+    
+    if not SKLEARN_AVAILABLE or total_comments <= chunk_size:
+        chunks, total_comments = split_dataframe_into_chunks(df, comment_column, chunk_size, max_comments)
+        return chunks, total_comments, []
+    
+    try:
+        labels, clusters = cluster_comments(comments, estimate_cluster_count(total_comments, chunk_size))
+        positions, bounds = build_topic_chunk_order(labels, chunk_size)
+        chunks = CommentChunks(comments, chunk_size, positions, bounds)
+        
+        logger.info(f"Datos divididos en {len(chunks)} chunks temáticos (total: {total_comments} comentarios)")
+        return chunks, total_comments, clusters
+    
+    except Exception as e:
+        logger.warning(f"No se pudo agrupar por temas, se usa el orden del archivo: {str(e)}")
+        chunks, total_comments = split_dataframe_into_chunks(df, comment_column, chunk_size, max_comments)
+        return chunks, total_comments, []
+
+def split_dataframe_by_period(
+    df: pd.DataFrame,
+    date_column: str = 'Fecha',
+    frequency: str = 'M',
+    reference: Optional[pd.Timestamp] = None
+) -> List[Tuple[str, pd.DataFrame, bool]]:
+    """
+    Divide un DataFrame en periodos (semanas o meses) según una columna de fecha.
+    
+    Args:
+        df: DataFrame a dividir
+        date_column: Nombre de la columna que contiene las fechas
+        frequency: Frecuencia del periodo ('W' semanal, 'M' mensual)
+        reference: Fecha de referencia para decidir si un periodo está cerrado (por defecto, ahora)
+        
+    Returns:
+        Lista ordenada de tuplas (etiqueta_periodo, dataframe_periodo, periodo_cerrado)
+    """
+    if reference is None:
+        reference = pd.Timestamp.now()
+    
+    try:
+        dates = pd.to_datetime(df[date_column], errors='coerce')
+        invalid_dates = int(dates.isna().sum())
+        if invalid_dates:
+            logger.warning(f"Se descartan {invalid_dates} comentarios sin fecha válida en '{date_column}'")
+        
+        df_dated = df[dates.notna()]
+        periods = dates[dates.notna()].dt.to_period(frequency)
+        
+        result = []
+        for period, df_period in df_dated.groupby(periods, sort=True):
+            if frequency == 'W':
+                label = period.start_time.strftime("%G-W%V")
+            else:
+                label = str(period)
+            closed = period.end_time < reference
+            result.append((label, df_period, closed))
+        
+        logger.info(f"Datos divididos en {len(result)} periodos (frecuencia: {frequency})")
+        return result
+    
+    except Exception as e:
+        logger.error(f"Error al dividir DataFrame en periodos: {str(e)}")
+        raise
+
+def split_dataframe_by_group(df: pd.DataFrame, group_column: str = 'SKU') -> List[Tuple[str, pd.DataFrame]]:
+    """
+    Divide un DataFrame en grupos (por ejemplo, productos) según el valor de una columna.
+    
+    Args:
+        df: DataFrame a dividir
+        group_column: Nombre de la columna por la que agrupar
+        
+    Returns:
+        Lista de tuplas (nombre_grupo, dataframe_grupo) ordenada por número de comentarios
+    """
+    try:
+        missing = int(df[group_column].isna().sum())
+        if missing:
+            logger.warning(f"Se descartan {missing} comentarios sin valor en '{group_column}'")
+        
+        groups = [
+            (str(name), df_group)
+            for name, df_group in df.dropna(subset=[group_column]).groupby(group_column, sort=False)
+        ]
+        # Procesar primero los grupos más grandes para equilibrar la carga
+        groups.sort(key=lambda item: len(item[1]), reverse=True)
+        
+        logger.info(f"Datos divididos en {len(groups)} grupos por '{group_column}'")
+        return groups
+    
+    except Exception as e:
+        logger.error(f"Error al dividir DataFrame en grupos: {str(e)}")
+        raise
+
+def fingerprint_comments(comments: Iterable[Any]) -> str:
+    """
+    Calcula una huella estable del contenido de una lista de comentarios.
+    
+    Args:
+        comments: Comentarios en orden (lista o columna de un DataFrame)
+        
+    Returns:
+        Hash hexadecimal SHA-256 del contenido
+    """
+    digest = hashlib.sha256()
+    for comment in comments:
+        digest.update(str(comment).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+def fingerprint_report(report_text: str, metrics: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Calcula la huella de un informe, usada como clave de la caché de renderizado.
+    
+    Args:
+        report_text: Texto del informe
+        metrics: Métricas mostradas junto al informe (se incluye la distribución de sentimientos)
+        
+    Returns:
+        Hash hexadecimal corto del informe
+    """
+    digest = hashlib.sha256(report_text.encode("utf-8"))
+    if metrics:
+        digest.update(json.dumps(metrics.get("sentiment_distribution"), sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def build_config_fingerprint(config: Dict[str, Any], instructions: str = "") -> str:
+    """
+    Calcula una huella de las opciones de configuración que afectan al resultado del análisis.
+    
+    Args:
+        config: Diccionario de configuración de la barra lateral
+        instructions: Instrucciones fijas del motor de análisis (AnalysisBackend.instructions_signature)
+        
+    Returns:
+        Hash hexadecimal corto de la configuración relevante
+    """
+    relevant = {
+        "model": config.get("model"),
+        "reasoning_effort": config.get("reasoning_effort"),
+        "system_prompt": config.get("system_prompt"),
+        "chunk_size": config.get("chunk_size"),
+        "topic_clustering": bool(config.get("topic_clustering", False)),
+        "backend": config.get("backend", "openai"),
+        "instructions": hashlib.sha256(instructions.encode("utf-8")).hexdigest()
+    }
+    payload = json.dumps(relevant, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
 def calculate_total_tokens(analyses: List[Dict[str, Any]]) -> Dict[str, int]:
     """
     Calcula el total de tokens utilizados en el análisis.
@@ -94,11 +517,24 @@ def calculate_total_tokens(analyses: List[Dict[str, Any]]) -> Dict[str, int]:
     try:
         tokens_reasoning = sum(a.get("tokens_razonamiento", 0) for a in analyses if not a.get("error", False))
         total_tokens = sum(a.get("total_tokens", 0) for a in analyses if not a.get("error", False))
+        input_tokens_saved = sum(a.get("input_tokens_saved", 0) for a in analyses if not a.get("error", False))
+        input_tokens = sum(a.get("input_tokens", 0) for a in analyses if not a.get("error", False))
+        cached_tokens = sum(a.get("cached_tokens", 0) for a in analyses if not a.get("error", False))
+        hedged_requests = sum(1 for a in analyses if a.get("hedged", False))
+        hedge_wins = sum(1 for a in analyses if a.get("hedge_won", False))
         
         return {
             "tokens_reasoning": tokens_reasoning,
-            "total_tokens": total_tokens
+            "total_tokens": total_tokens,
+            "input_tokens_saved": input_tokens_saved,
+            "input_tokens": input_tokens,
+            "cached_tokens": cached_tokens,
+            "hedged_requests": hedged_requests,
+            "hedge_wins": hedge_wins
         }
     except Exception as e:
         logger.error(f"Error al calcular tokens: {str(e)}")
-        return {"tokens_reasoning": 0, "total_tokens": 0}
\ No newline at end of file
+        return {
+            "tokens_reasoning": 0, "total_tokens": 0, "input_tokens_saved": 0,
+            "input_tokens": 0, "cached_tokens": 0, "hedged_requests": 0, "hedge_wins": 0
+        }
\ No newline at end of file
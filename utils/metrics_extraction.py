@@ -2,12 +2,244 @@
 Utilidades para extraer métricas de los análisis.
 """
 import re
+import json
 import logging
-from typing import Dict, List, Any
+from collections import Counter
+from typing import Dict, List, Any, Optional
 
 # Configurar logger
 logger = logging.getLogger(__name__)
 
+def extract_sentiment_distribution(analysis_text: str) -> Optional[Dict[str, float]]:
+    """
+    Extrae la distribución de sentimientos (en porcentaje) de un texto de análisis.
+    
+    Args:
+        analysis_text: Texto del análisis
+        
+    Returns:
+        Diccionario con los porcentajes normalizados a 100% o None si no se encontraron porcentajes
+    """
+    distribution = {
+        "Positivo": 0.0,
+        "Neutral": 0.0,
+        "Negativo": 0.0
+    }
+    
+    # Buscar porcentajes positivos
+    positive_matches = re.findall(r'(?:positiv[oa]s?|favorables?)\D*?(\d+(?:\.\d+)?)%', analysis_text, re.IGNORECASE)
+    if positive_matches:
+        distribution["Positivo"] = float(positive_matches[0])
+    
+    # Buscar porcentajes negativos
+    negative_matches = re.findall(r'(?:negativ[oa]s?|desfavorables?)\D*?(\d+(?:\.\d+)?)%', analysis_text, re.IGNORECASE)
+    if negative_matches:
+        distribution["Negativo"] = float(negative_matches[0])
+    
+    # Buscar porcentajes neutrales
+    neutral_matches = re.findall(r'(?:neutral(?:es)?)\D*?(\d+(?:\.\d+)?)%', analysis_text, re.IGNORECASE)
+    if neutral_matches:
+        distribution["Neutral"] = float(neutral_matches[0])
+    
+    total = sum(distribution.values())
+    if total == 0:
+        return None
+    
+    if total != 100:
+        # Normalizar a 100%
+        logger.info(f"Normalizando porcentajes de sentimiento (total actual: {total}%)")
+        factor = 100 / total
+        for key in distribution:
+            distribution[key] *= factor
+    
+    return distribution
+
+def extract_theme_names(analysis_text: str, max_themes: int = 10) -> List[str]:
+    """
+    Extrae los nombres de los temas listados en la sección de temas de un análisis.
+    
+    Args:
+        analysis_text: Texto del análisis (de un chunk o final)
+        max_themes: Número máximo de temas a devolver
+        
+    Returns:
+        Lista de nombres de temas en minúsculas
+    """
+    # La sección termina en el siguiente apartado numerado (3.) o en el de patrones
+    section = re.search(r'temas[^\n]*\n(.*?)(?:\n\s*(?:#+\s*)?(?:\*\*)?3[\.\)]|\n[^\n]*patrones|\Z)',
+                        analysis_text, re.IGNORECASE | re.DOTALL)
+    if not section:
+        return []
+    
+    themes = []
+    for point in extract_numbered_points(section.group(1), max_points=max_themes):
+        # Quedarse con el nombre del tema (antes de ':' o de un paréntesis)
+        name = re.sub(r'^\d+\)\s*', '', point)
+        name = re.split(r'[:(\-–]', name, maxsplit=1)[0]
+        name = name.strip(' *"\'.').lower()
+        if 2 < len(name) <= 60:
+            themes.append(name)
+    
+    return themes
+
+def parse_chunk_statistics(analysis_text: str, comments_count: int) -> Optional[Dict[str, Any]]:
+    """
+    Extrae el bloque de estadísticas numéricas que el modelo añade al final del análisis de un chunk.
+    
+    El bloque tiene el formato:
+    ESTADISTICAS: {"positivos": 30, "neutrales": 10, "negativos": 10, "temas": {"sabor": 25, "precio": 8}}
+    
+    Args:
+        analysis_text: Texto del análisis del chunk
+        comments_count: Número de comentarios del chunk
+        
+    Returns:
+        Diccionario con los recuentos ({"comments", "sentiment", "themes"}) o None si no hay bloque válido.
+        Si los recuentos de sentimiento no suman `comments_count` se reescalan para que lo hagan;
+        los de temas se limitan a `comments_count`.
+    """
+    matches = re.findall(r'ESTAD[IÍ]STICAS\s*:\s*(\{.*\})', analysis_text, re.IGNORECASE)
+    if not matches:
+        return None
+    
+    try:
+        raw = json.loads(matches[-1])
+        sentiment = {
+            "Positivo": int(raw.get("positivos", 0)),
+            "Neutral": int(raw.get("neutrales", 0)),
+            "Negativo": int(raw.get("negativos", 0))
+        }
+        themes = {
+            # Un tema no puede aparecer en más comentarios de los que tiene el chunk
+            str(name).strip().lower(): min(int(count), comments_count)
+            for name, count in (raw.get("temas") or {}).items()
+            if str(name).strip() and int(count) > 0
+        }
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Bloque de estadísticas no válido: {str(e)}")
+        return None
+    
+    classified = sum(sentiment.values())
+    if classified == 0:
+        return None
+    
+    if classified != comments_count:
+        # El análisis cualitativo sigue siendo válido: se ajustan los recuentos al tamaño del chunk
+        logger.warning(f"Las estadísticas del chunk clasifican {classified} de {comments_count} comentarios, se reescalan")
+        sentiment = _scale_counts(sentiment, comments_count)
+    
+    return {"comments": comments_count, "sentiment": sentiment, "themes": themes}
+
+def _scale_counts(counts: Dict[str, int], total: int) -> Dict[str, int]:
+    """
+    Reescala unos recuentos para que sumen `total`, repartiendo el redondeo por mayor resto.
+    
+    Args:
+        counts: Recuentos originales (con suma mayor que cero)
+        total: Suma deseada
+        
+    Returns:
+        Recuentos reescalados
+    """
+    current = sum(counts.values())
+    exact = {key: value * total / current for key, value in counts.items()}
+    scaled = {key: int(value) for key, value in exact.items()}
+    by_remainder = sorted(exact, key=lambda key: exact[key] - scaled[key], reverse=True)
+    for key in by_remainder[:total - sum(scaled.values())]:
+        scaled[key] += 1
+    return scaled
+
+def strip_chunk_statistics(analysis_text: str) -> str:
+    """
+    Elimina el bloque de estadísticas del texto de un análisis.
+    
+    Args:
+        analysis_text: Texto del análisis del chunk
+        
+    Returns:
+        Texto sin la línea de estadísticas
+    """
+    return re.sub(r'\n?[^\n]*ESTAD[IÍ]STICAS\s*:\s*\{.*\}[^\n]*', '', analysis_text, flags=re.IGNORECASE).strip()
+
+def aggregate_chunk_statistics(statistics: List[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """
+    Suma de forma exacta los recuentos de varios chunks (o de agregados previos).
+    
+    Args:
+        statistics: Lista de estadísticas por chunk (los elementos None se ignoran)
+        
+    Returns:
+        Estadísticas agregadas con porcentajes o None si no había estadísticas
+    """
+    valid = [stat for stat in statistics if stat]
+    if not valid:
+        return None
+    
+    sentiment = Counter()
+    themes = Counter()
+    comments = 0
+    for stat in valid:
+        sentiment.update(stat["sentiment"])
+        themes.update(stat["themes"])
+        comments += stat["comments"]
+    
+    classified = sum(sentiment.values())
+    return {
+        "comments": comments,
+        "sentiment": {key: sentiment.get(key, 0) for key in ("Positivo", "Neutral", "Negativo")},
+        "themes": dict(themes.most_common()),
+        "sentiment_percentages": {
+            key: 100 * sentiment.get(key, 0) / classified
+            for key in ("Positivo", "Neutral", "Negativo")
+        }
+    }
+
+def format_statistics_table(statistics: Dict[str, Any], total_comments: int, max_themes: int = 15) -> str:
+    """
+    Formatea las estadísticas agregadas como tablas compactas para el prompt final.
+    
+    Args:
+        statistics: Estadísticas agregadas
+        total_comments: Número total de comentarios del análisis
+        max_themes: Número máximo de temas a incluir
+        
+    Returns:
+        Texto con las tablas de sentimiento y temas
+    """
+    lines = [
+        f"Recuentos exactos calculados sobre {statistics['comments']} de {total_comments} comentarios:",
+        "",
+        "| Sentimiento | Comentarios | % |",
+        "|---|---|---|"
+    ]
+    for key, count in statistics["sentiment"].items():
+        lines.append(f"| {key} | {count} | {statistics['sentiment_percentages'][key]:.1f}% |")
+    
+    if statistics["themes"]:
+        lines += ["", "| Tema | Menciones | % de comentarios |", "|---|---|---|"]
+        for name, count in list(statistics["themes"].items())[:max_themes]:
+            lines.append(f"| {name} | {count} | {100 * count / statistics['comments']:.1f}% |")
+    
+    return "\n".join(lines)
+
+def format_coverage_note(coverage: Dict[str, int]) -> str:
+    """
+    Redacta una nota con la cobertura real del análisis.
+    
+    Args:
+        coverage: Cobertura con comentarios y chunks analizados y totales
+        
+    Returns:
+        Nota en texto plano
+    """
+    total = coverage["comments_total"]
+    percentage = 100 * coverage["comments_analyzed"] / total if total else 0.0
+    failed = coverage["chunks_total"] - coverage["chunks_analyzed"]
+    return (
+        f"Cobertura: {coverage['comments_analyzed']} de {total} comentarios analizados ({percentage:.1f}%); "
+        f"{failed} de {coverage['chunks_total']} grupos no pudieron analizarse."
+    )
+
 def extract_metrics_from_analysis(analysis_text: str) -> Dict[str, Any]:
     """
     Extrae métricas clave del texto de análisis para visualización.
@@ -34,33 +266,14 @@ def extract_metrics_from_analysis(analysis_text: str) -> Dict[str, Any]:
     
     try:
         # Extraer distribución de sentimiento usando expresiones regulares
-        
-        # Buscar porcentajes positivos
-        positive_matches = re.findall(r'(?:positiv[oa]s?|favorables?)\D*?(\d+(?:\.\d+)?)%', analysis_text, re.IGNORECASE)
-        if positive_matches:
-            metrics["sentiment_distribution"]["Positivo"] = float(positive_matches[0])
-        
-        # Buscar porcentajes negativos
-        negative_matches = re.findall(r'(?:negativ[oa]s?|desfavorables?)\D*?(\d+(?:\.\d+)?)%', analysis_text, re.IGNORECASE)
-        if negative_matches:
-            metrics["sentiment_distribution"]["Negativo"] = float(negative_matches[0])
-        
-        # Buscar porcentajes neutrales
-        neutral_matches = re.findall(r'(?:neutral(?:es)?)\D*?(\d+(?:\.\d+)?)%', analysis_text, re.IGNORECASE)
-        if neutral_matches:
-            metrics["sentiment_distribution"]["Neutral"] = float(neutral_matches[0])
+        distribution = extract_sentiment_distribution(analysis_text)
         
         # Si no hay coincidencias, usar valores predeterminados
-        total = sum(metrics["sentiment_distribution"].values())
-        if total == 0:
+        if distribution is None:
             logger.warning("No se encontraron porcentajes de sentimiento, usando valores predeterminados")
             metrics["sentiment_distribution"] = {"Positivo": 60, "Neutral": 25, "Negativo": 15}
-        elif total != 100:
-            # Normalizar a 100%
-            logger.info(f"Normalizando porcentajes de sentimiento (total actual: {total}%)")
-            factor = 100 / total
-            for key in metrics["sentiment_distribution"]:
-                metrics["sentiment_distribution"][key] *= factor
+        else:
+            metrics["sentiment_distribution"] = distribution
         
         # Intentar extraer temas principales
         # Ejemplo de patrón: "Los temas principales son: calidad (45%), precio (30%), servicio (25%)"
@@ -0,0 +1,92 @@
+"""
+Agregación incremental de resultados parciales mientras el análisis está en curso.
+"""
+import threading
+from collections import Counter, deque
+from typing import Any, Dict, Optional
+
+from utils.metrics_extraction import extract_sentiment_distribution, extract_theme_names
+
+# Número de insights recientes que se conservan para mostrar
+MAX_RECENT_INSIGHTS = 3
+
+class PartialResultsAggregator:
+    """Acumula la distribución de sentimientos y los temas a medida que llegan resultados de chunks."""
+
+    def __init__(self):
+        """Inicializa el agregador vacío."""
+        self._lock = threading.Lock()
+        self._sentiment_sums = {"Positivo": 0.0, "Neutral": 0.0, "Negativo": 0.0}
+        self._weighted_comments = 0
+        # Comentarios por tema según los recuentos exactos; chunks que citan el tema cuando no los hay
+        self._theme_comments: Counter = Counter()
+        self._theme_chunks: Counter = Counter()
+        self._recent = deque(maxlen=MAX_RECENT_INSIGHTS)
+        self.completed = 0
+
+    def add(
+        self,
+        label: str,
+        comments_count: int,
+        analysis_text: str,
+        statistics: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Incorpora el resultado de un chunk (o de un grupo/periodo) al agregado.
+
+        Si el resultado incluye recuentos numéricos se usan directamente (los temas cuentan
+        comentarios); si no, se extraen del texto y cada tema citado cuenta un chunk.
+
+        Args:
+            label: Etiqueta del resultado (por ejemplo, "Grupo 3")
+            comments_count: Número de comentarios que cubre el resultado, usado como peso
+            analysis_text: Texto del análisis devuelto por el modelo
+            statistics: Recuentos de sentimiento y temas del resultado, si los hay
+        """
+        if statistics:
+            classified = sum(statistics["sentiment"].values())
+            distribution = {key: 100 * value / classified for key, value in statistics["sentiment"].items()}
+            theme_comments = statistics["themes"]
+            theme_chunks = []
+        else:
+            distribution = extract_sentiment_distribution(analysis_text)
+            theme_comments = {}
+            theme_chunks = extract_theme_names(analysis_text)
+
+        with self._lock:
+            self.completed += 1
+            if distribution is not None:
+                for key, value in distribution.items():
+                    self._sentiment_sums[key] += value * comments_count
+                self._weighted_comments += comments_count
+            self._theme_comments.update(theme_comments)
+            self._theme_chunks.update(theme_chunks)
+            self._recent.appendleft({"label": label, "analysis": analysis_text})
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Devuelve el estado provisional actual.
+
+        Returns:
+            Diccionario con la distribución provisional, los temas más citados (con los comentarios
+            que los mencionan según los recuentos exactos y los chunks sin recuento que los citan)
+            y los insights recientes
+        """
+        with self._lock:
+            distribution = None
+            if self._weighted_comments:
+                distribution = {
+                    key: value / self._weighted_comments
+                    for key, value in self._sentiment_sums.items()
+                }
+            names = set(self._theme_comments) | set(self._theme_chunks)
+            top = sorted(names, key=lambda name: (-self._theme_comments[name], -self._theme_chunks[name], name))[:10]
+            return {
+                "completed": self.completed,
+                "sentiment_distribution": distribution,
+                "themes": [
+                    {"name": name, "comments": self._theme_comments[name], "chunks": self._theme_chunks[name]}
+                    for name in top
+                ],
+                "recent_insights": list(self._recent)
+            }
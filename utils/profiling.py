@@ -0,0 +1,256 @@
+"""
+Perfilado por muestreo de ejecuciones completas (renderizado de la página o trabajos de análisis).
+Genera un perfil en formato de pilas colapsadas (compatible con flamegraph.pl y speedscope) y un
+resumen de tiempo de pared y CPU por función, separando la espera de red del tiempo de CPU local.
+"""
+import os
+import sys
+import time
+import threading
+import contextvars
+import logging
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from config.settings import PROFILE_DIR, PROFILE_INTERVAL, PROFILE_TOP_FUNCTIONS, PROFILE_MAX_RUNS
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Perfil activo en el contexto actual; las tareas enviadas con _submit lo heredan
+_current_profiler: contextvars.ContextVar = contextvars.ContextVar("current_profiler", default=None)
+
+# Módulos cuya presencia en la pila indica espera de red o de la cola de peticiones
+_NETWORK_MODULES = ("socket.py", "ssl.py", "selectors.py", "httpcore", "httpx", "h11", "anyio")
+_QUEUE_MODULES = ("rate_limiter.py", "scheduler.py")
+
+def _frame_label(code) -> str:
+    """Etiqueta legible de una función: nombre (archivo:línea)."""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+def _thread_cpu_time(ident: int) -> Optional[float]:
+    """Tiempo de CPU consumido por un hilo, o None si la plataforma no lo permite."""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError):
+        return None
+
+def prune_profiles(output_dir: str = PROFILE_DIR, keep: int = PROFILE_MAX_RUNS) -> int:
+    """
+    Elimina los perfiles más antiguos para que el directorio no crezca sin límite.
+
+    Args:
+        output_dir: Directorio de los perfiles
+        keep: Número de ejecuciones (perfil y resumen) que se conservan
+
+    Returns:
+        Número de ejecuciones eliminadas
+    """
+    try:
+        collapsed = [entry for entry in os.scandir(output_dir) if entry.name.endswith(".collapsed")]
+    except FileNotFoundError:
+        return 0
+
+    collapsed.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    removed = 0
+    for entry in collapsed[keep:]:
+        run_id = entry.name[:-len(".collapsed")]
+        for path in (entry.path, os.path.join(output_dir, f"{run_id}.summary.txt")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        removed += 1
+    return removed
+
+class SamplingProfiler:
+    """
+    Muestrea periódicamente la pila de los hilos asociados a una ejecución.
+
+    Cada muestra se atribuye con el tiempo de pared transcurrido desde la anterior y con el tiempo
+    de CPU que consumió el hilo en ese intervalo, de modo que la diferencia es tiempo de espera.
+    """
+
+    def __init__(self, run_id: str, interval: float = PROFILE_INTERVAL, output_dir: str = PROFILE_DIR):
+        """
+        Inicializa el perfilador.
+
+        Args:
+            run_id: Identificador de la ejecución (se usa en el nombre de los archivos)
+            interval: Segundos entre muestras
+            output_dir: Directorio donde se guardan los perfiles
+        """
+        self.run_id = run_id
+        self.interval = interval
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+        self._threads: Dict[int, int] = {}
+        self._cpu: Dict[int, Optional[float]] = {}
+        self._stacks: Counter = Counter()
+        self._functions = defaultdict(lambda: {"self_wall": 0.0, "self_cpu": 0.0, "total_wall": 0.0, "total_cpu": 0.0})
+        self._totals = {"wall": 0.0, "cpu": 0.0, "network_wait": 0.0, "queue_wait": 0.0, "other_wait": 0.0}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def attach(self) -> None:
+        """Asocia el hilo actual a la ejecución (admite llamadas anidadas)."""
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = self._threads.get(ident, 0) + 1
+            if ident not in self._cpu:
+                self._cpu[ident] = _thread_cpu_time(ident)
+
+    def detach(self) -> None:
+        """Deja de muestrear el hilo actual."""
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] -= 1
+            if not self._threads[ident]:
+                del self._threads[ident]
+                del self._cpu[ident]
+
+    def start(self) -> None:
+        """Arranca el hilo de muestreo."""
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.run_id}", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Bucle de muestreo."""
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(now - last)
+            last = now
+
+    def _sample(self, elapsed: float) -> None:
+        """Registra la pila de cada hilo asociado."""
+        frames = sys._current_frames()
+        with self._lock:
+            for ident in list(self._threads):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+
+                cpu_now = _thread_cpu_time(ident)
+                cpu_before = self._cpu.get(ident)
+                self._cpu[ident] = cpu_now
+                cpu = min(elapsed, max(0.0, cpu_now - cpu_before)) if cpu_now is not None and cpu_before is not None else 0.0
+
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                self._stacks[";".join(stack)] += 1
+
+                leaf = self._functions[stack[-1]]
+                leaf["self_wall"] += elapsed
+                leaf["self_cpu"] += cpu
+                for label in set(stack):
+                    self._functions[label]["total_wall"] += elapsed
+                    self._functions[label]["total_cpu"] += cpu
+
+                self._totals["wall"] += elapsed
+                self._totals["cpu"] += cpu
+                wait = elapsed - cpu
+                if any(module in label for label in stack[-8:] for module in _NETWORK_MODULES):
+                    self._totals["network_wait"] += wait
+                elif any(module in label for label in stack[-8:] for module in _QUEUE_MODULES):
+                    self._totals["queue_wait"] += wait
+                else:
+                    self._totals["other_wait"] += wait
+
+    def stop(self) -> Dict[str, Any]:
+        """
+        Detiene el muestreo y guarda el perfil y el resumen.
+
+        Returns:
+            Diccionario con los totales y las rutas de los archivos generados
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        collapsed_path = os.path.join(self.output_dir, f"{self.run_id}.collapsed")
+        summary_path = os.path.join(self.output_dir, f"{self.run_id}.summary.txt")
+
+        with self._lock:
+            with open(collapsed_path, "w", encoding="utf-8") as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            totals = dict(self._totals)
+            functions = sorted(self._functions.items(), key=lambda item: item[1]["total_wall"], reverse=True)
+
+        duration = time.perf_counter() - self._started
+        lines = [
+            f"Perfil de la ejecución {self.run_id}",
+            f"Duración: {duration:.2f}s | Tiempo de hilos muestreado: {totals['wall']:.2f}s",
+            f"CPU local: {totals['cpu']:.2f}s | Espera de red: {totals['network_wait']:.2f}s | "
+            f"Espera en cola de peticiones: {totals['queue_wait']:.2f}s | Otras esperas: {totals['other_wait']:.2f}s",
+            "",
+            f"{'Pared total':>12}{'CPU total':>12}{'Pared propia':>14}{'CPU propia':>12}  Función"
+        ]
+        for label, stats in functions[:PROFILE_TOP_FUNCTIONS]:
+            lines.append(
+                f"{stats['total_wall']:>12.3f}{stats['total_cpu']:>12.3f}"
+                f"{stats['self_wall']:>14.3f}{stats['self_cpu']:>12.3f}  {label}"
+            )
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        prune_profiles(self.output_dir)
+
+        logger.info(
+            f"Perfil {self.run_id} guardado en {summary_path}: CPU local {totals['cpu']:.2f}s, "
+            f"espera de red {totals['network_wait']:.2f}s"
+        )
+        return {**totals, "duration": duration, "collapsed_path": collapsed_path, "summary_path": summary_path}
+
+@contextmanager
+def profile_run(run_id: str, enabled: bool = True) -> Iterator[Optional[SamplingProfiler]]:
+    """
+    Perfila el bloque y las tareas que lance mediante run_in_profile.
+
+    Args:
+        run_id: Identificador de la ejecución
+        enabled: Si es False el bloque se ejecuta sin perfilar
+
+    Yields:
+        El perfilador activo o None si está desactivado
+    """
+    if not enabled:
+        yield None
+        return
+
+    profiler = SamplingProfiler(run_id)
+    token = _current_profiler.set(profiler)
+    profiler.attach()
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.detach()
+        _current_profiler.reset(token)
+        try:
+            profiler.stop()
+        except Exception as e:
+            logger.error(f"No se pudo guardar el perfil {run_id}: {str(e)}")
+
+def run_in_profile(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Ejecuta una función asociando el hilo actual al perfil del contexto, si lo hay.
+
+    Se usa al enviar tareas a executors con el contexto copiado, para que los hilos de
+    trabajo se muestreen solo mientras ejecutan tareas de la ejecución perfilada.
+    """
+    profiler = _current_profiler.get()
+    if profiler is None:
+        return fn(*args, **kwargs)
+    profiler.attach()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.detach()
@@ -0,0 +1,108 @@
+"""
+Utilidades para normalizar y compactar comentarios antes de enviarlos al modelo.
+"""
+import re
+import html
+import logging
+from typing import Iterable, List, Sequence, Tuple
+
+from config.settings import CHARS_PER_TOKEN, MAX_COMMENT_TOKENS
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Emojis y pictogramas (incluye modificadores y uniones de secuencias)
+_EMOJI = r'[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF][\uFE0F\u200D\U0001F3FB-\U0001F3FF]*'
+_EMOJI_RUN_PATTERN = re.compile(rf'((?:{_EMOJI}){{3}})(?:{_EMOJI})+')
+_HTML_TAG_PATTERN = re.compile(r'<[^>]{1,200}>')
+_REPEATED_PUNCTUATION_PATTERN = re.compile(r'([!?.¡¿])\1{3,}')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Marcador que sustituye la parte central de los comentarios recortados
+TRIM_MARKER = " […] "
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estima el número de tokens de un texto a partir de su longitud.
+
+    Args:
+        text: Texto a medir
+
+    Returns:
+        Número aproximado de tokens
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def normalize_comment(comment: str) -> str:
+    """
+    Limpia un comentario: restos de HTML, rachas de emojis y signos repetidos, y espacios redundantes.
+
+    Args:
+        comment: Comentario original
+
+    Returns:
+        Comentario normalizado
+    """
+    text = html.unescape(str(comment))
+    text = _HTML_TAG_PATTERN.sub(' ', text)
+    text = _EMOJI_RUN_PATTERN.sub(r'\1', text)
+    text = _REPEATED_PUNCTUATION_PATTERN.sub(r'\1\1\1', text)
+    return _WHITESPACE_PATTERN.sub(' ', text).strip()
+
+def trim_comment(comment: str, max_tokens: int = MAX_COMMENT_TOKENS) -> str:
+    """
+    Recorta los comentarios que superan el límite de tokens conservando el principio y el final,
+    que suelen concentrar el veredicto del cliente.
+
+    Args:
+        comment: Comentario normalizado
+        max_tokens: Límite aproximado de tokens por comentario
+
+    Returns:
+        Comentario dentro del límite
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(comment) <= max_chars:
+        return comment
+
+    head = (max_chars * 2) // 3
+    tail = max_chars - head - len(TRIM_MARKER)
+    return comment[:head].rstrip() + TRIM_MARKER + comment[-tail:].lstrip()
+
+def build_compact_comments_block(comments: Iterable[str], max_tokens: int = MAX_COMMENT_TOKENS) -> Tuple[str, int, int]:
+    """
+    Construye el bloque de comentarios del prompt con identificadores compactos ("[1] ...").
+
+    Args:
+        comments: Lista de comentarios originales
+        max_tokens: Límite aproximado de tokens por comentario
+
+    Returns:
+        Tupla con (bloque_de_texto, tokens_estimados_formato_original, tokens_estimados_compactados)
+    """
+    lines = []
+    raw_chars = 0
+    for i, comment in enumerate(comments, 1):
+        # Longitud con el formato anterior: "Comentario N: <texto>" separado por líneas en blanco
+        raw_chars += len(str(comment)) + len(f"Comentario {i}: ") + 2
+        lines.append(f"[{i}] {trim_comment(normalize_comment(comment), max_tokens)}")
+
+    block = "\n".join(lines)
+    return block, raw_chars // CHARS_PER_TOKEN + 1, estimate_tokens(block)
+
+def build_chunk_prompt(comments: Sequence[str], max_tokens: int = MAX_COMMENT_TOKENS) -> Tuple[str, int, int]:
+    """
+    Construye el prompt de un chunk justo antes de enviarlo.
+
+    Los comentarios se leen de la vista del chunk en ese momento y el bloque intermedio se descarta,
+    así que el texto del chunk solo existe en el prompt mientras dura la petición.
+
+    Args:
+        comments: Comentarios del chunk (lista o CommentChunk)
+        max_tokens: Límite aproximado de tokens por comentario
+
+    Returns:
+        Tupla con (prompt, tokens_estimados_formato_original, tokens_estimados_compactados)
+    """
+    block, raw_tokens, compact_tokens = build_compact_comments_block(comments, max_tokens)
+    return f"Número de comentarios: {len(comments)}\n\nComentarios:\n{block}", raw_tokens, compact_tokens
@@ -0,0 +1,250 @@
+"""
+Índice invertido de los comentarios de un análisis para localizar, sin llamar al modelo,
+los comentarios que hay detrás de cada tema del informe.
+"""
+import re
+import logging
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from config.settings import THEME_SYNONYMS
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Palabras vacías que no identifican un tema
+STOPWORDS = {
+    "a", "al", "ante", "con", "de", "del", "el", "en", "entre", "la", "las", "lo", "los", "o", "para",
+    "por", "que", "se", "sin", "sobre", "su", "sus", "un", "una", "uno", "unos", "unas", "y", "e", "u",
+    "muy", "mas", "otro", "otros", "tema", "temas", "aspecto", "aspectos", "general", "producto", "productos"
+}
+
+# Longitud mínima de un token indexado y del prefijo usado para buscar variantes
+MIN_TOKEN_LENGTH = 2
+MIN_STEM_LENGTH = 4
+
+_TOKEN_SPLIT = re.compile(r'[^\w]+')
+
+def normalize_for_index(text: str) -> str:
+    """
+    Normaliza un texto para el índice: minúsculas y sin tildes.
+
+    Args:
+        text: Texto original
+
+    Returns:
+        Texto normalizado
+    """
+    decomposed = unicodedata.normalize("NFD", str(text).lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+def _stem(word: str) -> str:
+    """Prefijo de búsqueda que cubre plural y género ("envíos" -> "envi")."""
+    for suffix in ("es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            word = word[:-len(suffix)]
+            break
+    if len(word) > MIN_STEM_LENGTH and word[-1] in "aeo":
+        word = word[:-1]
+    return word
+
+def theme_keywords(name: str, extra_terms: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Obtiene las palabras clave de un tema: las palabras significativas de su nombre, los términos
+    adicionales (por ejemplo, los de un cluster) y sus sinónimos configurados.
+
+    Args:
+        name: Nombre del tema
+        extra_terms: Términos adicionales asociados al tema
+
+    Returns:
+        Lista de palabras clave normalizadas; las de varias palabras se buscan como conjunto
+    """
+    words = [
+        word for word in _TOKEN_SPLIT.split(normalize_for_index(name))
+        if len(word) > 2 and word not in STOPWORDS and not word.isdigit()
+    ]
+    keywords = list(dict.fromkeys(words + [normalize_for_index(term) for term in extra_terms or []]))
+
+    for keyword in list(keywords):
+        for key, synonyms in THEME_SYNONYMS.items():
+            if _stem(keyword).startswith(_stem(key)) or _stem(key).startswith(_stem(keyword)):
+                keywords.extend(normalize_for_index(synonym) for synonym in synonyms if normalize_for_index(synonym) not in keywords)
+    return keywords
+
+class CommentIndex:
+    """
+    Índice invertido (vocabulario ordenado y listas de comentarios por token) de los comentarios
+    de un análisis.
+
+    Las palabras clave se resuelven por prefijo sobre el vocabulario ordenado, de modo que todas
+    las variantes de una palabra ("azúcar", "azúcares") se obtienen con una búsqueda binaria.
+    """
+
+    def __init__(self, comments: Iterable[Any]):
+        """
+        Construye el índice.
+
+        Args:
+            comments: Comentarios del análisis, en orden
+        """
+        if isinstance(comments, pd.Series):
+            self.comments = comments.reset_index(drop=True)
+        else:
+            self.comments = pd.Series(list(comments), dtype=object)
+        self.size = len(self.comments)
+
+        if PYARROW_AVAILABLE:
+            vocabulary, codes, documents = self._tokenize_arrow()
+        else:
+            vocabulary, codes, documents = self._tokenize_python()
+
+        # Vocabulario ordenado y, por cada token, sus comentarios (sin repetir) en orden
+        order = np.argsort(vocabulary, kind="stable")
+        rank = np.empty(len(order), dtype=np.int32)
+        rank[order] = np.arange(len(order), dtype=np.int32)
+        self.vocabulary = vocabulary[order]
+        codes = rank[codes]
+
+        # Los comentarios ya vienen en orden: basta una ordenación estable por token
+        by_token = np.argsort(codes, kind="stable")
+        codes, documents = codes[by_token], documents[by_token]
+        keep = np.ones(len(codes), dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (documents[1:] != documents[:-1])
+        self.postings = documents[keep].astype(np.int32)
+        self.offsets = np.searchsorted(codes[keep], np.arange(len(self.vocabulary) + 1))
+        logger.debug(f"Índice de comentarios construido: {self.size} comentarios, {len(self.vocabulary)} términos")
+
+    def _tokenize_arrow(self):
+        """
+        Separa por espacios con kernels de Arrow y normaliza solo las palabras distintas.
+
+        La normalización (tildes, signos de puntuación) se aplica al diccionario de palabras, que
+        es mucho menor que el texto; una palabra puede dar varios tokens ("calidad-precio").
+
+        Returns:
+            Tupla con (vocabulario_sin_ordenar, código_de_cada_token, comentario_de_cada_token)
+        """
+        try:
+            array = pa.array(self.comments, type=pa.string(), from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            array = pa.array(self.comments.astype(str), type=pa.string())
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+
+        split = pc.utf8_split_whitespace(pc.utf8_lower(array))
+        encoded = pc.dictionary_encode(pc.list_flatten(split))
+        raw_codes = encoded.indices.to_numpy().astype(np.int64)
+        raw_documents = pc.list_parent_indices(split).to_numpy().astype(np.int64)
+
+        # Tokens normalizados de cada palabra distinta
+        vocabulary: Dict[str, int] = {}
+        word_tokens = []
+        for word in encoded.dictionary.to_pylist():
+            word_tokens.append([
+                vocabulary.setdefault(token, len(vocabulary))
+                for token in _TOKEN_SPLIT.split(normalize_for_index(word)) if len(token) >= MIN_TOKEN_LENGTH
+            ])
+        lengths = np.array([len(tokens) for tokens in word_tokens], dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(lengths) else lengths
+        flat_tokens = np.array([token for tokens in word_tokens for token in tokens], dtype=np.int32)
+
+        # Expandir cada aparición de una palabra en sus tokens
+        occurrence_lengths = lengths[raw_codes]
+        total = int(occurrence_lengths.sum())
+        occurrence_starts = np.cumsum(occurrence_lengths) - occurrence_lengths
+        positions = np.arange(total) - np.repeat(occurrence_starts, occurrence_lengths) + np.repeat(starts[raw_codes], occurrence_lengths)
+        return (
+            np.array(list(vocabulary), dtype=object),
+            flat_tokens[positions] if total else np.empty(0, dtype=np.int32),
+            np.repeat(raw_documents, occurrence_lengths)
+        )
+
+    def _tokenize_python(self):
+        """Tokeniza comentario a comentario (sin pyarrow), con la misma salida que _tokenize_arrow."""
+        vocabulary: Dict[str, int] = {}
+        codes, documents = [], []
+        for position, comment in enumerate(self.comments):
+            # Los valores ausentes no tienen tokens, igual que los nulos de Arrow
+            if pd.isna(comment):
+                continue
+            for token in _TOKEN_SPLIT.split(normalize_for_index(comment)):
+                if len(token) >= MIN_TOKEN_LENGTH:
+                    codes.append(vocabulary.setdefault(token, len(vocabulary)))
+                    documents.append(position)
+        return (
+            np.array(list(vocabulary), dtype=object),
+            np.array(codes, dtype=np.int32),
+            np.array(documents, dtype=np.int64)
+        )
+
+    def _lookup_prefix(self, prefix: str) -> np.ndarray:
+        """Comentarios que contienen algún token que empieza por el prefijo."""
+        start, end = np.searchsorted(self.vocabulary, [prefix, prefix + "\uffff"])
+        if start == end:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(self.postings[self.offsets[start]:self.offsets[end]])
+
+    def match(self, keywords: List[str]) -> np.ndarray:
+        """
+        Comentarios que mencionan alguna de las palabras clave.
+
+        Una palabra clave de varias palabras ("aceite de coco") exige que aparezcan todas sus
+        palabras significativas en el comentario.
+
+        Args:
+            keywords: Palabras clave normalizadas
+
+        Returns:
+            Posiciones de los comentarios, ordenadas
+        """
+        matches = []
+        for keyword in keywords:
+            words = [word for word in _TOKEN_SPLIT.split(keyword) if len(word) >= MIN_TOKEN_LENGTH and word not in STOPWORDS]
+            if not words:
+                continue
+            documents = self._lookup_prefix(_stem(words[0]))
+            for word in words[1:]:
+                documents = np.intersect1d(documents, self._lookup_prefix(_stem(word)), assume_unique=True)
+            matches.append(documents)
+        if not matches:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(matches))
+
+    def drilldown(self, name: str, extra_terms: Optional[Iterable[str]] = None, limit: int = 50) -> Dict[str, Any]:
+        """
+        Localiza los comentarios de un tema.
+
+        Args:
+            name: Nombre del tema
+            extra_terms: Términos adicionales asociados al tema
+            limit: Número máximo de comentarios de ejemplo
+
+        Returns:
+            Diccionario con las palabras clave, el número y porcentaje de comentarios y los ejemplos
+        """
+        keywords = theme_keywords(name, extra_terms)
+        documents = self.match(keywords)
+        return {
+            "keywords": keywords,
+            "count": len(documents),
+            "percentage": 100 * len(documents) / self.size if self.size else 0.0,
+            "comments": self.comments.iloc[documents[:limit]].astype(str).tolist()
+        }
+
+    def memory_usage(self) -> int:
+        """Bytes que ocupan el índice y los comentarios referenciados."""
+        return int(
+            self.postings.nbytes + self.offsets.nbytes
+            + sum(len(token) for token in self.vocabulary) + self.comments.memory_usage(deep=True)
+        )
@@ -121,6 +121,61 @@ def create_sentiment_pie_chart(sentiment_data: Dict[str, float], title: str = 'D
         fig.add_annotation(text="Error al crear visualización", showarrow=False, font=dict(size=20, color="red"))
         return fig
 
+def create_sentiment_trend_chart(period_results: List[Dict[str, Any]], title: str = 'Evolución del Sentimiento') -> Optional[go.Figure]:
+    """
+    Crea un gráfico de líneas con la evolución de la distribución de sentimientos por periodo.
+    
+    Args:
+        period_results: Lista de resultados por periodo con sus métricas extraídas
+        title: Título del gráfico
+        
+    Returns:
+        Figura de Plotly con el gráfico o None si no hay datos suficientes
+    """
+    logger.info(f"Creando gráfico de tendencia de sentimientos con {len(period_results)} periodos")
+    
+    if not period_results:
+        logger.warning("Datos insuficientes para crear gráfico de tendencia")
+        return None
+    
+    try:
+        # Convertir datos a formato largo (periodo, sentimiento, porcentaje)
+        rows = [
+            {
+                'Periodo': result['period'],
+                'Sentimiento': sentiment,
+                'Porcentaje': percentage
+            }
+            for result in period_results
+            for sentiment, percentage in result['metrics']['sentiment_distribution'].items()
+        ]
+        df = pd.DataFrame(rows)
+        
+        fig = px.line(
+            df,
+            x='Periodo',
+            y='Porcentaje',
+            color='Sentimiento',
+            color_discrete_map=SENTIMENT_COLORS,
+            markers=True,
+            title=title
+        )
+        
+        fig.update_layout(
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5),
+            title=dict(font=dict(size=24), x=0.5),
+            yaxis=dict(range=[0, 100]),
+            xaxis_title='Periodo',
+            yaxis_title='Porcentaje (%)',
+            height=400
+        )
+        
+        return fig
+    
+    except Exception as e:
+        logger.error(f"Error al crear gráfico de tendencia: {str(e)}")
+        return None
+
 def create_themes_bar_chart(themes_data: List[Dict[str, Any]], title: str = 'Temas Principales Mencionados') -> Optional[go.Figure]:
     """
     Crea un gráfico de barras para los temas principales.